@@ -0,0 +1,190 @@
+"""
+ASGI serving mode for the NEPSE Floor Sheet REST API
+Serves the same routes and responses as api_server. GitHub fetches run on one
+event loop over a shared httpx connection pool: the files a request needs are
+downloaded concurrently, identical in-flight fetches are coalesced into one
+upstream call, and every fetch is bounded by a per-request timeout.
+
+Run with:
+    uvicorn api_async:app --host 0.0.0.0 --port $PORT
+"""
+
+import asyncio
+import io
+import logging
+import os
+import threading
+
+import httpx
+import pandas as pd
+from a2wsgi import WSGIMiddleware
+
+import api_server
+
+API_UPSTREAM_CONNECTIONS = int(os.environ.get('API_UPSTREAM_CONNECTIONS', 20))  # pooled GitHub connections
+API_REQUEST_TIMEOUT = float(os.environ.get('API_REQUEST_TIMEOUT', 20))  # seconds a request waits on GitHub
+API_ASYNC_WORKERS = int(os.environ.get('API_ASYNC_WORKERS', 32))  # threads running route handlers
+
+# One line per upstream request is too chatty at INFO
+logging.getLogger('httpx').setLevel(logging.WARNING)
+
+
+class AsyncGitHubDataSource(api_server.GitHubDataSource):
+    """GitHub contents API source whose fetches share one event loop and connection pool
+
+    The loop runs on a daemon thread, so the synchronous source interface works
+    from any handler thread; callers block only on their own fetches. A fetch
+    or parse already in flight for the same file is awaited rather than
+    repeated, and a caller that gives up after ``request_timeout`` leaves it
+    running for the others. Parsed frames are shared and must not be modified.
+    """
+    name = 'github-async'
+
+    def __init__(self, base_url=None, timeout=api_server.API_UPSTREAM_TIMEOUT,
+                 request_timeout=API_REQUEST_TIMEOUT, max_connections=API_UPSTREAM_CONNECTIONS):
+        super().__init__(base_url, timeout)
+        self.request_timeout = request_timeout
+        self.max_connections = max_connections
+        self._loop = None
+        self._client = None
+        self._inflight = {}
+        self._start_lock = threading.Lock()
+        self.upstream_requests = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='github-fetch', daemon=True).start()
+                limits = httpx.Limits(max_connections=self.max_connections,
+                                      max_keepalive_connections=self.max_connections)
+                self._client = httpx.AsyncClient(headers=self.headers, timeout=self.timeout, limits=limits)
+                self._loop = loop
+        return self._loop
+
+    def _run(self, coro):
+        """Run a coroutine on the fetch loop and wait for it, at most ``request_timeout`` seconds"""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(asyncio.wait_for(coro, self.request_timeout), loop)
+        try:
+            return future.result()
+        except (asyncio.TimeoutError, TimeoutError):
+            self.timeouts += 1
+            raise TimeoutError(f"GitHub did not answer within {self.request_timeout}s")
+
+    async def _shared(self, key, make_coro):
+        """Await the in-flight task for ``key``, starting it with ``make_coro()`` if there is none"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(make_coro())
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        # A caller that times out must not cancel the fetch for the others
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Waiters see the error themselves; this keeps one nobody waited out for from being logged as lost
+        if not task.cancelled():
+            task.exception()
+
+    async def _fetch(self, url, required=False):
+        """The JSON at ``url``, or None if it does not answer 200 (raising instead when ``required``)"""
+        self.upstream_requests += 1
+        response = await self._client.get(url)
+        if required:
+            response.raise_for_status()
+        if response.status_code != 200:
+            return None
+        return response.json()
+
+    async def _list_files(self):
+        entries = await self._shared(self.base_url, lambda: self._fetch(self.base_url, required=True))
+        return self._csv_listing(entries)
+
+    async def _read_text(self, filename):
+        if not self._is_file_name(filename):
+            return None
+        url = f"{self.base_url}/{filename}"
+        file_info = await self._shared(url, lambda: self._fetch(url))
+        return None if file_info is None else self._decode(file_info)
+
+    async def _parse(self, filename):
+        text = await self._read_text(filename)
+        if text is None:
+            return None
+        return await asyncio.get_running_loop().run_in_executor(None, pd.read_csv, io.StringIO(text))
+
+    async def _read_dataframes(self, filenames):
+        frames = await asyncio.gather(*(self._shared(('frame', filename), lambda f=filename: self._parse(f))
+                                        for filename in filenames))
+        return dict(zip(filenames, frames))
+
+    def list_files(self):
+        """List CSV files; each entry's 'version' is the git blob sha"""
+        return self._run(self._list_files())
+
+    def read_text(self, filename):
+        return self._run(self._read_text(filename))
+
+    def read_dataframe(self, filename):
+        return self.read_dataframes([filename])[filename]
+
+    def read_dataframes(self, filenames):
+        """{filename: frame or None} of several files, downloaded concurrently and each parsed once"""
+        return self._run(self._read_dataframes(list(filenames)))
+
+    def stats(self):
+        return {
+            'requests': self.upstream_requests,
+            'coalesced': self.coalesced,
+            'in_flight': len(self._inflight),
+            'timeouts': self.timeouts,
+            'max_connections': self.max_connections,
+            'request_timeout': self.request_timeout,
+        }
+
+    async def _shutdown(self):
+        for task in list(self._inflight.values()):
+            task.cancel()
+        await self._client.aclose()
+
+    def close(self):
+        with self._start_lock:
+            if self._loop is None:
+                return
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = self._client = None
+
+
+def make_async_data_source(kind=None, data_dir=None):
+    """The configured data source, with GitHub fetches moved onto the shared event loop"""
+    source = api_server.make_data_source(kind, data_dir)
+    if isinstance(source, api_server.GitHubDataSource):
+        return AsyncGitHubDataSource()
+    return source
+
+
+def create_app(source=None, workers=API_ASYNC_WORKERS):
+    """ASGI application running api_server's routes over ``source`` (default: the configured one)
+
+    Route handlers run on a pool of ``workers`` threads; their GitHub fetches
+    all go through the source's single event loop and connection pool.
+    """
+    api_server.nepse_api = api_server.NEPSEDataAPI(source or make_async_data_source())
+    return WSGIMiddleware(api_server.app, workers=workers)
+
+
+app = create_app()
+
+if __name__ == '__main__':
+    import uvicorn
+
+    port = int(os.environ.get('PORT', 5000))
+    logging.info(f"Starting ASGI server on port {port}")
+    uvicorn.run(app, host='0.0.0.0', port=port)
@@ -1,18 +1,34 @@
 """
 NEPSE Floor Sheet REST API
-A simple Flask API to serve CSV data from the /data folder using GitHub API
+A simple Flask API to serve CSV data from the /data folder, read from disk or through the GitHub API
 Optimized for deployment on Render
 """
 
-from flask import Flask, jsonify, request, render_template_string
+from flask import Flask, Response, g, has_request_context, jsonify, request, render_template_string, send_file, stream_with_context
 import pandas as pd
 import requests
 import base64
+import gzip
+import hashlib
+import io
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import json
 import sys
 import logging
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import floorsheet_store
+import floorsheet_summary
+from floorsheet_query import FloorsheetQuery, QueryError
+from floorsheet_schema import FLOORSHEET_COLUMNS
 
 # Configure logging
 logging.basicConfig(
@@ -33,38 +49,660 @@ if IS_RENDER:
 GITHUB_REPO_OWNER = os.environ.get('GITHUB_REPO_OWNER', "whytofear")  # Replace with your GitHub username
 GITHUB_REPO_NAME = os.environ.get('GITHUB_REPO_NAME', "nepse-data-main")  # Replace with your repo name
 GITHUB_TOKEN = os.environ.get('GITHUB_TOKEN')  # Set this in Render config vars
+NEPSE_DATA_SOURCE = os.environ.get('NEPSE_DATA_SOURCE', 'auto')  # 'local', 'github' or 'auto'
+NEPSE_DATA_DIR = os.environ.get('NEPSE_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+API_CACHE_BYTES = int(os.environ.get('API_CACHE_BYTES', 256 * 2**20))  # parsed frames kept in memory
+API_LISTING_TTL = float(os.environ.get('API_LISTING_TTL', 60))  # seconds a file listing is reused
+API_LISTING_STALE = float(os.environ.get('API_LISTING_STALE', 300))  # seconds past the TTL it is served while refreshing
+STREAM_BATCH_ROWS = int(os.environ.get('STREAM_BATCH_ROWS', 5000))  # rows serialized per streamed chunk
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))  # smaller bodies are sent as-is
+API_UPSTREAM_TIMEOUT = float(os.environ.get('API_UPSTREAM_TIMEOUT', 30))  # seconds per GitHub request
+API_MAX_AGE_PAST = int(os.environ.get('API_MAX_AGE_PAST', 365 * 24 * 3600))  # Cache-Control for finished days
+API_MAX_AGE_CURRENT = int(os.environ.get('API_MAX_AGE_CURRENT', 60))  # Cache-Control for today and listings
 
-class NEPSEDataAPI:
-    def __init__(self):
-        self.base_url = f"https://api.github.com/repos/{GITHUB_REPO_OWNER}/{GITHUB_REPO_NAME}/contents/data"
+# Binary response formats, by ``format`` parameter and by Accept mimetype
+BINARY_FORMATS = {
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+    'csv': 'text/csv',
+}
+
+class GitHubDataSource:
+    """Reads CSV files through the GitHub contents API"""
+    name = 'github'
+
+    def __init__(self, base_url=None, timeout=API_UPSTREAM_TIMEOUT):
+        self.base_url = base_url or f"https://api.github.com/repos/{GITHUB_REPO_OWNER}/{GITHUB_REPO_NAME}/contents/data"
         self.headers = {'Authorization': f'token {GITHUB_TOKEN}'} if GITHUB_TOKEN else {}
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    @staticmethod
+    def _csv_listing(entries):
+        files = [f for f in entries if f['name'].endswith('.csv')]
+        for f in files:
+            f['version'] = f.get('sha')
+        return files
+
+    @staticmethod
+    def _decode(file_info):
+        return base64.b64decode(file_info['content']).decode('utf-8')
+
+    def list_files(self):
+        """List CSV files; each entry's 'version' is the git blob sha. Raises if GitHub does not answer 200"""
+        response = self.session.get(self.base_url, headers=self.headers, timeout=self.timeout)
+        response.raise_for_status()
+        return self._csv_listing(response.json())
+
+    @staticmethod
+    def _is_file_name(filename):
+        """Whether ``filename`` is one path segment; anything else could reach outside the data directory"""
+        if filename and '/' not in filename and '\\' not in filename and filename not in ('.', '..'):
+            return True
+        logging.warning(f"Refusing to fetch '{filename}' from GitHub")
+        return False
+
+    def read_text(self, filename):
+        if not self._is_file_name(filename):
+            return None
+        file_url = f"{self.base_url}/{filename}"
+        response = self.session.get(file_url, headers=self.headers, timeout=self.timeout)
+        if response.status_code != 200:
+            return None
+        return self._decode(response.json())
+
+    def read_dataframe(self, filename):
+        content = self.read_text(filename)
+        if content is None:
+            return None
+        return pd.read_csv(io.StringIO(content))
+
+class LocalDataSource:
+    """Reads CSV files straight from a data directory on disk, and indexed queries from its Parquet store"""
+    name = 'local'
+
+    def __init__(self, data_dir=None, parquet_root=None):
+        self.data_dir = data_dir or NEPSE_DATA_DIR
+        self.parquet_root = parquet_root or os.environ.get('FLOORSHEET_PARQUET_ROOT') or \
+            os.path.join(self.data_dir, 'parquet')
+
+    def _path(self, filename):
+        # Only plain file names inside the data directory
+        if os.path.basename(filename) != filename or not filename.endswith('.csv'):
+            return None
+        path = os.path.join(self.data_dir, filename)
+        return path if os.path.isfile(path) else None
+
+    def list_files(self):
+        """List CSV files; each entry's 'version' changes whenever the file is rewritten"""
+        if not os.path.isdir(self.data_dir):
+            return []
+        files = []
+        for entry in os.scandir(self.data_dir):
+            if entry.is_file() and entry.name.endswith('.csv'):
+                stat = entry.stat()
+                files.append({
+                    'name': entry.name,
+                    'path': f"data/{entry.name}",
+                    'size': stat.st_size,
+                    'type': 'file',
+                    'version': f"{stat.st_mtime_ns:x}-{stat.st_size:x}",
+                    'last_modified': int(stat.st_mtime),
+                })
+        # Same alphabetical order as the GitHub contents API
+        return sorted(files, key=lambda f: f['name'])
+
+    def csv_path(self, filename):
+        """Path of a stored CSV file, for serving its bytes as they are"""
+        return self._path(filename)
+
+    def content_hash(self, filename):
+        """Git blob sha of a stored CSV file, the same value GitHub lists for it"""
+        path = self._path(filename)
+        if path is None:
+            return None
+        digest = hashlib.sha1(b'blob %d\0' % os.path.getsize(path))
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(2**20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def store_version(self):
+        """Changes whenever a day is ingested into the Parquet store; None without summaries"""
+        try:
+            return f"{os.stat(os.path.join(self.parquet_root, floorsheet_summary.STATS_FILE)).st_mtime_ns:x}"
+        except FileNotFoundError:
+            return None
+
+    def read_text(self, filename):
+        path = self._path(filename)
+        if path is None:
+            return None
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+
+    def read_dataframe(self, filename):
+        path = self._path(filename)
+        if path is None:
+            return None
+        return pd.read_csv(path, memory_map=True)
+
+    def _default_start(self, start, end, last_days):
+        if not start and not end and last_days:
+            dates = floorsheet_store.list_dates(self.parquet_root)
+            return dates[-last_days:][0] if dates else None
+        return start
+
+    def query_day(self, filename, query):
+        """Rows of a day file matching ``query``, read from its Parquet partition instead of parsing the CSV
+
+        Returns None when the store does not have the day or is older than the file.
+        """
+        date = floorsheet_store.date_from_filename(filename)
+        path = self._path(filename)
+        partition = floorsheet_store.partition_path(date, self.parquet_root) if date else None
+        if path is None or partition is None or not os.path.exists(partition) or \
+                os.path.getmtime(partition) < os.path.getmtime(path):
+            return None
+        index_key = query.index_key()
+        if index_key and floorsheet_store.has_index(index_key[0], self.parquet_root) and \
+                floorsheet_store.index_dir(*index_key, self.parquet_root) is not None:
+            # One symbol's or broker's rows come from its index without touching the rest of the day
+            df = floorsheet_store.read_index(*index_key, date, date, root=self.parquet_root, rupees=True,
+                                             filter=query.arrow_filter())
+        else:
+            df = floorsheet_store.read_partition(date, self.parquet_root, filter=query.arrow_filter(), rupees=True)
+            df = df.assign(date=date)
+        df = self._published(df).drop(columns='Date')
+        # Partitions are clustered by symbol; the file lists trades by serial number
+        return query.apply(df.sort_values('SN', kind='stable'), filtered=True).reset_index(drop=True)
+
+    @staticmethod
+    def _published(df):
+        """Stored rows in the published CSV layout plus 'Date', with brokers typed as the CSV reader types them"""
+        df = df.rename(columns={'date': 'Date'})
+        df = df[[*FLOORSHEET_COLUMNS, 'Date']]
+        for column in ('Stock Symbol', 'Buyer', 'Seller'):
+            df[column] = df[column].astype(str)
+        for column in ('Buyer', 'Seller'):
+            try:
+                df[column] = df[column].astype('int64')
+            except ValueError:
+                pass
+        # Newest day first, like the file-by-file path
+        return df.sort_values(['Date', 'SN'], ascending=[False, True]).reset_index(drop=True)
+
+    def read_symbol(self, symbol, start=None, end=None, last_days=None):
+        """One symbol's trades in the published layout plus 'Date', or None without a symbol index"""
+        if not floorsheet_store.has_index('symbol', self.parquet_root):
+            return None
+        start = self._default_start(start, end, last_days)
+        return self._published(floorsheet_store.read_symbol(symbol, start, end, root=self.parquet_root, rupees=True))
+
+    def read_stats(self):
+        """Whole-history totals from the ingest-time summary, or None if there is none"""
+        return floorsheet_summary.load_stats(self.parquet_root)
+
+    def read_ohlc(self, symbol, start=None, end=None):
+        """Daily bars of one symbol in rupees, or None if the store has no bars"""
+        return floorsheet_summary.read_ohlc(symbol, start, end, root=self.parquet_root)
+
+    def read_positions(self, broker=None, symbols=None, date=None):
+        """Net positions per broker and symbol as of ``date`` from the position ledger, or None without one"""
+        return floorsheet_summary.read_positions(broker, symbols, date, root=self.parquet_root)
+
+    def read_broker(self, broker, start=None, end=None, side=None, symbol=None, last_days=None):
+        """(trades, per-day summaries) for one broker, or None without the broker index and summaries"""
+        if not floorsheet_store.has_index('broker', self.parquet_root):
+            return None
+        start = self._default_start(start, end, last_days)
+        symbols = [symbol] if symbol else None
+        summary = floorsheet_store.read_broker_summary(broker, start, end, side, symbols, root=self.parquet_root)
+        if summary is None:
+            return None
+        trades = floorsheet_store.read_broker(broker, start, end, side, symbols, root=self.parquet_root, rupees=True)
+        return self._published(trades), summary
+
+def make_data_source(kind=None, data_dir=None):
+    """Build the configured data source; 'auto' prefers local files when the data directory has CSVs"""
+    kind = (kind or NEPSE_DATA_SOURCE).lower()
+    if kind == 'auto':
+        data_dir = data_dir or NEPSE_DATA_DIR
+        has_csv = os.path.isdir(data_dir) and any(name.endswith('.csv') for name in os.listdir(data_dir))
+        kind = 'local' if has_csv else 'github'
+    if kind == 'local':
+        return LocalDataSource(data_dir)
+    if kind == 'github':
+        return GitHubDataSource()
+    raise ValueError(f"Unknown data source '{kind}'. Use 'local', 'github' or 'auto'.")
+
+class FrameCache:
+    """Thread-safe LRU cache of parsed DataFrames, bounded by their in-memory size
+
+    Keys include the file version, so a rewritten file is simply a new entry and
+    the stale one ages out. Cached frames are shared: callers must not modify them.
+    """
+
+    def __init__(self, max_bytes=API_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._frames.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, key):
+        """The cached frame without counting a lookup or refreshing its recency"""
+        with self._lock:
+            entry = self._frames.get(key)
+            return entry[0] if entry is not None else None
+
+    def put(self, key, frame):
+        size = int(frame.memory_usage(index=True, deep=True).sum())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._frames:
+                self.bytes -= self._frames.pop(key)[1]
+            self._frames[key] = (frame, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self._frames.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._frames),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one
+
+    The first caller for a key (the leader) does the work; callers arriving
+    while it runs wait for and share its result, or its exception.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+
+    def join(self, key):
+        """(future, leader): a leader must settle the key with finish(), others wait on the future"""
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                self.followers += 1
+                return future, False
+            future = self._flights[key] = Future()
+            self.leaders += 1
+            return future, True
+
+    def finish(self, key, result=None, error=None):
+        with self._lock:
+            future = self._flights.pop(key)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, func):
+        """func() once for all concurrent callers with this key"""
+        future, leader = self.join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = func()
+        except Exception as e:
+            self.finish(key, error=e)
+            raise
+        self.finish(key, result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {'in_flight': len(self._flights), 'leaders': self.leaders, 'followers': self.followers}
+
+class NEPSEDataAPI:
+    def __init__(self, source=None, cache_bytes=API_CACHE_BYTES, listing_ttl=API_LISTING_TTL,
+                 listing_stale=API_LISTING_STALE):
+        self.source = source or make_data_source()
+        self.frames = FrameCache(cache_bytes)
+        self.flights = SingleFlight()
+        self.listing_ttl = listing_ttl
+        self.listing_stale = listing_stale
+        self._listing = None
+        self._listing_at = 0.0
+        self._listing_lock = threading.Lock()
+        self.listing_hits = 0
+        self.listing_stale_hits = 0
+        self.listing_misses = 0
+        self._hashes = {}
+        logging.info(f"Serving data from the '{self.source.name}' data source")
     
     def get_csv_files(self):
-        """Get list of all CSV files from GitHub repo"""
+        """Get list of all CSV files from the data source
+
+        A listing is reused for ``listing_ttl`` seconds. For ``listing_stale``
+        seconds after that it is still returned at once while a single
+        background refresh fetches the new one; past both, callers wait for
+        one shared fetch. Within a request the first answer is reused, so a
+        slow upstream is waited on once however many lookups the request makes.
+        """
+        if not has_request_context():
+            return self._current_listing()
+        if 'listing' not in g:
+            g.listing = self._current_listing()
+        return g.listing
+    
+    def _current_listing(self):
+        with self._listing_lock:
+            listing = self._listing
+            age = time.monotonic() - self._listing_at
+            if listing is not None and age < self.listing_ttl:
+                self.listing_hits += 1
+                return listing
+            stale = listing is not None and age < self.listing_ttl + self.listing_stale
+            if stale:
+                self.listing_stale_hits += 1
+            else:
+                self.listing_misses += 1
+        if stale:
+            _, leader = self.flights.join('listing')
+            if leader:
+                threading.Thread(target=self._refresh_listing, name='listing-refresh', daemon=True).start()
+            return listing
+        return self.flights.do('listing', self._fetch_listing)
+    
+    def _fetch_listing(self):
         try:
-            response = requests.get(self.base_url, headers=self.headers)
-            if response.status_code == 200:
-                files = response.json()
-                csv_files = [f for f in files if f['name'].endswith('.csv')]
-                return csv_files
-            return []
+            files = self.source.list_files()
+        except TimeoutError:
+            raise
         except Exception as e:
             logging.error(f"Error fetching CSV files: {str(e)}")
-            return []
+            # Keep serving the last good listing; leaving its age alone retries on a later lookup
+            with self._listing_lock:
+                return self._listing if self._listing is not None else []
+        with self._listing_lock:
+            self._listing = files
+            self._listing_at = time.monotonic()
+        return files
+    
+    def _refresh_listing(self):
+        try:
+            self.flights.finish('listing', self._fetch_listing())
+        except TimeoutError as e:
+            self.flights.finish('listing', error=e)
+    
+    def get_file_info(self, filename):
+        """A file's entry in the (cached) listing, or None if it is not listed"""
+        for file_info in self.get_csv_files():
+            if file_info['name'] == filename:
+                return file_info
+        return None
+    
+    def get_file_version(self, filename):
+        """Version token of a file from the (cached) listing, or None if it is not listed"""
+        file_info = self.get_file_info(filename)
+        return file_info.get('version') if file_info is not None else None
+    
+    def get_content_hash(self, filename):
+        """Hash of a listed file's bytes (its git blob sha), or None if it is not listed
+
+        Taken from the listing when the source provides it, otherwise computed
+        once per file version.
+        """
+        file_info = self.get_file_info(filename)
+        if file_info is None:
+            return None
+        if file_info.get('sha'):
+            return file_info['sha']
+        content_hash = getattr(self.source, 'content_hash', None)
+        if content_hash is None:
+            return file_info.get('version')
+        key = (filename, file_info.get('version'))
+        with self._listing_lock:
+            cached = self._hashes.get(key)
+        if cached is None:
+            cached = self.flights.do(('hash',) + key, lambda: content_hash(filename))
+            with self._listing_lock:
+                self._hashes[key] = cached
+        return cached
+    
+    def get_store_version(self):
+        """Token that changes whenever the source's summary store does, or None if it has none"""
+        store_version = getattr(self.source, 'store_version', None)
+        return store_version() if store_version is not None else None
+    
+    def get_dataset_version(self):
+        """Token that changes whenever any listed file or the source's summary store changes"""
+        digest = hashlib.blake2b(digest_size=16)
+        for file_info in self.get_csv_files():
+            digest.update(f"{file_info['name']}:{file_info.get('version')}\n".encode())
+        digest.update(str(self.get_store_version()).encode())
+        return digest.hexdigest()
+    
+    def get_last_modified(self, files=None):
+        """Newest modification time (epoch seconds) among listed files, or None if the source has none"""
+        times = [f['last_modified'] for f in (files if files is not None else self.get_csv_files())
+                 if f.get('last_modified') is not None]
+        return max(times) if times else None
     
     def get_csv_content(self, filename):
-        """Get content of a specific CSV file"""
+        """Get content of a specific CSV file; concurrent requests for the same file share one download"""
+        def fetch():
+            try:
+                return self.source.read_text(filename)
+            except Exception as e:
+                logging.error(f"Error fetching CSV content: {str(e)}")
+                return None
+        return self.flights.do(('text', filename, self.get_file_version(filename)), fetch)
+    
+    def get_csv_path(self, filename):
+        """Local path of a CSV file when the source has one, otherwise None"""
+        csv_path = getattr(self.source, 'csv_path', None)
+        return csv_path(filename) if csv_path else None
+    
+    def _store(self, filename, version, df):
+        if df is not None and version is not None:
+            self.frames.put((filename, version), df)
+    
+    def get_dataframe(self, filename):
+        """Get a specific CSV file parsed into a DataFrame, or None if it does not exist
+
+        Frames of listed files are cached by (filename, version); the returned
+        frame may be shared with other requests and must not be modified.
+        Concurrent misses for the same file share one read and parse. A
+        source that gives up waiting raises TimeoutError rather than "not found".
+        """
+        version = self.get_file_version(filename)
+        key = (filename, version)
+        if version is not None:
+            df = self.frames.get(key)
+            if df is not None:
+                return df
+        
+        def load():
+            # The previous leader may have cached it between our miss and this flight
+            df = self.frames.peek(key) if version is not None else None
+            if df is not None:
+                return df
+            try:
+                df = self.source.read_dataframe(filename)
+            except TimeoutError:
+                raise
+            except Exception as e:
+                logging.error(f"Error reading '{filename}': {str(e)}")
+                return None
+            self._store(filename, version, df)
+            return df
+        return self.flights.do(('frame', filename, version), load)
+    
+    def get_dataframes(self, filenames):
+        """Parsed frames of several files as {filename: frame or None}
+
+        Cached frames are reused and files another request is already loading
+        are waited for; the rest are fetched together when the source can read
+        several files concurrently, otherwise one at a time.
+        """
+        read_many = getattr(self.source, 'read_dataframes', None)
+        if read_many is None:
+            return {filename: self.get_dataframe(filename) for filename in filenames}
+        frames, versions, led, waiting = {}, {}, [], {}
+        for filename in filenames:
+            version = versions[filename] = self.get_file_version(filename)
+            frames[filename] = self.frames.get((filename, version)) if version is not None else None
+            if frames[filename] is None:
+                future, leader = self.flights.join(('frame', filename, version))
+                if leader:
+                    led.append(filename)
+                else:
+                    waiting[filename] = future
+        if led:
+            # Files a previous leader cached between our miss and this flight need no read
+            loaded = {filename: self.frames.peek((filename, versions[filename])) for filename in led
+                      if versions[filename] is not None}
+            unread = [filename for filename in led if loaded.get(filename) is None]
+            try:
+                if unread:
+                    loaded.update(read_many(unread))
+            except TimeoutError as e:
+                for filename in led:
+                    self.flights.finish(('frame', filename, versions[filename]), error=e)
+                raise
+            except Exception as e:
+                logging.error(f"Error reading {len(unread)} files: {str(e)}")
+            for filename in led:
+                frames[filename] = loaded.get(filename)
+                self._store(filename, versions[filename], frames[filename])
+                self.flights.finish(('frame', filename, versions[filename]), frames[filename])
+        for filename, future in waiting.items():
+            frames[filename] = future.result()
+        return frames
+    
+    def query_dataframe(self, filename, query):
+        """A file's rows matching a FloorsheetQuery, or None if the file does not exist
+
+        A cached frame is filtered in memory; otherwise a filtering query is
+        pushed down into the source's columnar store when it has the day, so
+        the file is never parsed. An empty query returns the shared frame.
+        """
+        if query.is_empty():
+            return self.get_dataframe(filename)
+        version = self.get_file_version(filename)
+        query_day = getattr(self.source, 'query_day', None)
+        if query.filters and query_day is not None and (version is None or
+                                                        self.frames.peek((filename, version)) is None):
+            try:
+                df = query_day(filename, query)
+            except QueryError:
+                raise
+            except Exception as e:
+                logging.error(f"Error querying '{filename}' in the store: {str(e)}")
+                df = None
+            if df is not None:
+                return df
+        df = self.get_dataframe(filename)
+        return query.apply(df) if df is not None else None
+    
+    def get_symbol_data(self, symbol, start=None, end=None, last_days=None):
+        """One symbol's trades from the source's symbol index, or None if the source has none"""
+        read_symbol = getattr(self.source, 'read_symbol', None)
+        if read_symbol is None:
+            return None
         try:
-            file_url = f"{self.base_url}/{filename}"
-            response = requests.get(file_url, headers=self.headers)
-            if response.status_code == 200:
-                file_info = response.json()
-                content = base64.b64decode(file_info['content']).decode('utf-8')
-                return content
+            return read_symbol(symbol, start, end, last_days)
+        except Exception as e:
+            logging.error(f"Error reading symbol '{symbol}' from the index: {str(e)}")
             return None
+    
+    def get_stats(self):
+        """Whole-history totals from the source's summary store, or None if the source has none"""
+        read_stats = getattr(self.source, 'read_stats', None)
+        if read_stats is None:
+            return None
+        try:
+            return read_stats()
+        except Exception as e:
+            logging.error(f"Error reading the summary store: {str(e)}")
+            return None
+    
+    def get_ohlc(self, symbol, start=None, end=None):
+        """Daily bars of one symbol from the source's summary store, or None if the source has none"""
+        read_ohlc = getattr(self.source, 'read_ohlc', None)
+        if read_ohlc is None:
+            return None
+        try:
+            return read_ohlc(symbol, start, end)
         except Exception as e:
-            logging.error(f"Error fetching CSV content: {str(e)}")
+            logging.error(f"Error reading bars for '{symbol}': {str(e)}")
             return None
+    
+    def get_broker_data(self, broker, start=None, end=None, side=None, symbol=None, last_days=None):
+        """(trades, per-day summaries) for one broker from the source's broker index, or None"""
+        read_broker = getattr(self.source, 'read_broker', None)
+        if read_broker is None:
+            return None
+        try:
+            return read_broker(broker, start, end, side, symbol, last_days)
+        except Exception as e:
+            logging.error(f"Error reading broker '{broker}' from the index: {str(e)}")
+            return None
+    
+    def get_positions(self, broker=None, symbols=None, date=None):
+        """Net positions as of ``date`` from the source's position ledger, or None if the source has none"""
+        read_positions = getattr(self.source, 'read_positions', None)
+        if read_positions is None:
+            return None
+        try:
+            return read_positions(broker, symbols, date)
+        except Exception as e:
+            logging.error(f"Error reading positions for broker '{broker}': {str(e)}")
+            return None
+    
+    def metrics(self):
+        with self._listing_lock:
+            listing = {
+                'ttl': self.listing_ttl,
+                'stale_window': self.listing_stale,
+                'hits': self.listing_hits,
+                'stale_hits': self.listing_stale_hits,
+                'misses': self.listing_misses,
+                'age': round(time.monotonic() - self._listing_at, 3) if self._listing is not None else None,
+            }
+        metrics = {'source': self.source.name, 'frame_cache': self.frames.stats(), 'listing_cache': listing,
+                   'single_flight': self.flights.stats()}
+        upstream_stats = getattr(self.source, 'stats', None)
+        if upstream_stats is not None:
+            metrics['upstream'] = upstream_stats()
+        return metrics
 
 # Initialize API
 nepse_api = NEPSEDataAPI()
@@ -245,6 +883,30 @@ HTML_TEMPLATE = """
                 <strong>/api/stock/&lt;symbol&gt;</strong> - Get data for specific stock
                 <code>curl {{ base_url }}/api/stock/ALBSL</code>
             </div>
+
+            <div class="endpoint">
+                <span class="method get">GET</span>
+                <strong>/api/ohlc/&lt;symbol&gt;</strong> - Daily OHLC, VWAP, volume and turnover bars (start, end)
+                <code>curl {{ base_url }}/api/ohlc/ALBSL?start=2025-01-01</code>
+            </div>
+
+            <div class="endpoint">
+                <span class="method get">GET</span>
+                <strong>/api/broker/&lt;id&gt;</strong> - Trades and buy/sell totals for a broker (side, symbol, start, end)
+                <code>curl {{ base_url }}/api/broker/58?side=buy&amp;start=2025-06-01</code>
+            </div>
+
+            <div class="endpoint">
+                <span class="method get">GET</span>
+                <strong>/api/positions/&lt;id&gt;</strong> - A broker's net position per symbol as of a date (symbol, date)
+                <code>curl {{ base_url }}/api/positions/58?symbol=ALBSL&amp;date=2025-06-01</code>
+            </div>
+
+            <div class="endpoint">
+                <span class="method get">GET</span>
+                <strong>/api/metrics</strong> - Cache hit/miss/eviction counters and memory usage
+                <code>curl {{ base_url }}/api/metrics</code>
+            </div>
         </div>
 
         <div class="api-section">
@@ -332,91 +994,408 @@ def index():
     base_url = request.url_root.rstrip('/')
     return render_template_string(HTML_TEMPLATE, base_url=base_url)
 
+def upstream_timeout(e):
+    """504 for a request that gave up waiting on the upstream data source"""
+    logging.error(f"Upstream timeout in {request.path}: {str(e)}")
+    return jsonify({'success': False, 'error': 'Upstream data source timed out'}), 504
+
 @app.route('/api/files')
 def list_files():
     """List all available CSV files"""
     try:
+        not_modified = dataset_conditional()
+        if not_modified is not None:
+            return not_modified
         files = nepse_api.get_csv_files()
         return jsonify({
             'success': True,
             'files': files,
             'count': len(files)
         })
+    except TimeoutError as e:
+        return upstream_timeout(e)
     except Exception as e:
         logging.error(f"Error in list_files: {str(e)}")
         return jsonify({'success': False, 'error': 'Internal Server Error'}), 500
 
+def encode_cursor(filename, offset):
+    """Opaque pagination cursor pinning the file as well as the position"""
+    return base64.urlsafe_b64encode(f"{filename}:{offset}".encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """(filename, offset) from a cursor; raises ValueError for anything malformed"""
+    try:
+        filename, offset = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').rsplit(':', 1)
+        offset = int(offset)
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if offset < 0:
+        raise ValueError('Invalid cursor')
+    return filename, offset
+
+def stream_mode():
+    """'ndjson' or 'json' when the client asked for a streamed response, otherwise None"""
+    fmt = request.args.get('format', '').lower()
+    if fmt == 'ndjson' or request.accept_mimetypes.best == 'application/x-ndjson':
+        return 'ndjson'
+    if fmt == 'json-stream' or request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return 'json'
+    return None
+
+def paginate(df, filename, offset=0, limit=None):
+    """Slice a page out of ``df`` and describe it: (page, envelope fields)"""
+    total = len(df)
+    page = df.iloc[offset:offset + limit] if limit else df.iloc[offset:]
+    end = offset + len(page)
+    return page, {
+        'records': len(page),
+        'total_records': total,
+        'offset': offset,
+        'next_cursor': encode_cursor(filename, end) if end < total else None,
+    }
+
+def iter_record_batches(df, ndjson=False):
+    """Serialize ``df`` a batch of rows at a time, so no full list of dicts or JSON string is ever built"""
+    for start in range(0, len(df), STREAM_BATCH_ROWS):
+        batch = df.iloc[start:start + STREAM_BATCH_ROWS]
+        if ndjson:
+            yield batch.to_json(orient='records', lines=True).rstrip('\n') + '\n'
+        else:
+            yield ('' if start == 0 else ',') + batch.to_json(orient='records')[1:-1]
+
+def binary_format():
+    """'arrow', 'parquet' or 'csv' when negotiated through ``format`` or the Accept header, otherwise None"""
+    fmt = request.args.get('format', '').lower()
+    if fmt in BINARY_FORMATS:
+        return fmt
+    best = request.accept_mimetypes.best_match(list(BINARY_FORMATS.values()) + ['application/json'])
+    if best and best != 'application/json' and request.accept_mimetypes[best] > request.accept_mimetypes['application/json']:
+        return next(name for name, mimetype in BINARY_FORMATS.items() if mimetype == best)
+    return None
+
+def serialize_frame(df, fmt):
+    """Encode a frame as an Arrow IPC stream, a Parquet file or CSV bytes"""
+    if fmt == 'csv':
+        return df.to_csv(index=False, float_format='%.2f').encode('utf-8')
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    if fmt == 'arrow':
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pq.write_table(table, sink, compression='zstd')
+    return sink.getvalue().to_pybytes()
+
+def binary_response(body, fmt, download_name, envelope=None):
+    response = Response(body, mimetype=BINARY_FORMATS[fmt])
+    extension = {'arrow': 'arrows', 'parquet': 'parquet', 'csv': 'csv'}[fmt]
+    stem = download_name[:-len('.csv')] if download_name.endswith('.csv') else download_name
+    response.headers['Content-Disposition'] = f'attachment; filename="{stem}.{extension}"'
+    if envelope is not None:
+        response.headers['X-Total-Records'] = str(envelope['total_records'])
+        if envelope.get('next_cursor'):
+            response.headers['X-Next-Cursor'] = envelope['next_cursor']
+    return response
+
+def records_response(envelope, page, download_name='floorsheet'):
+    """The page as JSON, streamed NDJSON/JSON, or Arrow/Parquet/CSV, whichever the client negotiated"""
+    fmt = binary_format()
+    if fmt is not None:
+        return binary_response(serialize_frame(page, fmt), fmt, download_name, envelope)
+    
+    mode = stream_mode()
+    if mode is None:
+        return jsonify({**envelope, 'data': page.to_dict('records')})
+    
+    if mode == 'ndjson':
+        response = Response(stream_with_context(iter_record_batches(page, ndjson=True)),
+                            mimetype='application/x-ndjson')
+        response.headers['X-Total-Records'] = str(envelope['total_records'])
+        if envelope['next_cursor']:
+            response.headers['X-Next-Cursor'] = envelope['next_cursor']
+        return response
+    
+    def generate():
+        yield json.dumps(envelope)[:-1] + ', "data": ['
+        yield from iter_record_batches(page)
+        yield ']}'
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+def csv_passthrough(filename):
+    """The stored CSV file as it is, without parsing; None if the source cannot serve raw bytes"""
+    path = nepse_api.get_csv_path(filename)
+    if path is not None:
+        if preferred_encoding() is None:
+            # Zero-copy: the file goes out through sendfile where the server supports it
+            response = send_file(path, mimetype=BINARY_FORMATS['csv'], conditional=False)
+            response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
+        with open(path, 'rb') as f:
+            return binary_response(f.read(), 'csv', filename)
+    content = nepse_api.get_csv_content(filename)
+    if content is None:
+        return None
+    return binary_response(content.encode('utf-8'), 'csv', filename)
+
+def preferred_encoding():
+    """'zstd' or 'gzip' if the client accepts one of them"""
+    return request.accept_encodings.best_match(['zstd', 'gzip'])
+
+def gzip_stream(chunks):
+    """Gzip a streamed body chunk by chunk, keeping it streamed"""
+    compressor = zlib.compressobj(5, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def encoded_etag(response, encoding):
+    """A strong ETag names one byte sequence, so the compressed body gets its own"""
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{encoding}', weak)
+
+@app.after_request
+def compress_response(response):
+    """Compress responses with zstd or gzip when the client accepts it (streamed ones with gzip)"""
+    if response.direct_passthrough or response.status_code != 200 or 'Content-Encoding' in response.headers:
+        return response
+    if response.is_streamed:
+        if request.accept_encodings['gzip']:
+            response.response = gzip_stream(response.response)
+            response.headers['Content-Encoding'] = 'gzip'
+            response.vary.add('Accept-Encoding')
+            encoded_etag(response, 'gzip')
+        return response
+    encoding = preferred_encoding()
+    if encoding is None or (response.content_length or 0) < COMPRESS_MIN_BYTES:
+        return response
+    body = response.get_data()
+    if encoding == 'zstd':
+        body = pa.compress(body, codec='zstd', asbytes=True)
+    else:
+        body = gzip.compress(body, compresslevel=5)
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    encoded_etag(response, encoding)
+    return response
+
+@app.after_request
+def cache_headers(response):
+    """Add the validators and Cache-Control chosen by conditional() to a full response"""
+    validators = g.get('http_cache')
+    if validators is None or response.status_code != 200:
+        return response
+    etag, last_modified, cache_control = validators
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = datetime.fromtimestamp(last_modified, timezone.utc)
+    response.headers['Cache-Control'] = cache_control
+    response.vary.add('Accept')
+    return response
+
+def file_date(filename):
+    """'YYYY-MM-DD' of a day file name"""
+    return filename.replace('nepal_stock_floorsheet_', '').replace('.csv', '')
+
+def day_cache_control(date):
+    """Cache-Control for data running up to ``date``
+
+    Long-lived only once that day is over and stored (it is at or before the
+    newest listed day); short for today, for days not ingested yet and for
+    anything that is not a YYYY-MM-DD date.
+    """
+    try:
+        date = datetime.strptime(date, '%Y-%m-%d').strftime('%Y-%m-%d')
+    except (TypeError, ValueError):
+        date = None
+    newest = max((file_date(f['name']) for f in nepse_api.get_csv_files()), default=None)
+    if date and newest and date <= newest and date < datetime.now().strftime('%Y-%m-%d'):
+        return f'public, max-age={API_MAX_AGE_PAST}, immutable'
+    return f'public, max-age={API_MAX_AGE_CURRENT}'
+
+def conditional(validator, last_modified=None, cache_control=None):
+    """Set up HTTP caching for this request; a 304 response if the client's copy is still current, else None
+
+    The strong ETag hashes ``validator`` (content hash or dataset version)
+    with the path, query and negotiated format; compressed bodies carry it
+    with the encoding appended. ``If-None-Match`` wins over ``If-Modified-Since``.
+    """
+    key = repr((validator, request.path, sorted(request.args.items(multi=True)), binary_format(), stream_mode()))
+    etag = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+    cache_control = cache_control or f'public, max-age={API_MAX_AGE_CURRENT}'
+    g.http_cache = (etag, last_modified, cache_control)
+    if request.if_none_match:
+        tags = [etag] + [f'{etag}-{encoding}' for encoding in ('gzip', 'zstd') if request.accept_encodings[encoding]]
+        matched = next((tag for tag in tags if request.if_none_match.contains(tag)), None)
+        if matched is None and request.if_none_match.star_tag:
+            matched = etag
+    elif request.if_modified_since and last_modified is not None:
+        matched = etag if int(last_modified) <= request.if_modified_since.timestamp() else None
+    else:
+        matched = None
+    if matched is None:
+        return None
+    response = Response(status=304)
+    response.set_etag(matched)
+    response.headers['Cache-Control'] = cache_control
+    response.vary.update(['Accept', 'Accept-Encoding'])
+    return response
+
+def dataset_conditional(end=None):
+    """conditional() for answers drawn from the whole data set; long-lived only when ``end`` is a finished day"""
+    return conditional(nepse_api.get_dataset_version(), nepse_api.get_last_modified(),
+                       day_cache_control(end) if end else None)
+
+def page_args(filename=None):
+    """(filename, offset, limit) from the cursor/offset/limit query parameters"""
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    cursor = request.args.get('cursor')
+    if cursor:
+        cursor_file, offset = decode_cursor(cursor)
+        if filename is not None and cursor_file != filename:
+            raise ValueError('Cursor belongs to another file')
+        # A cursor is client input: it may only name a listed day file
+        date = floorsheet_store.date_from_filename(cursor_file)
+        if cursor_file != f'nepal_stock_floorsheet_{date}.csv' or nepse_api.get_file_info(cursor_file) is None:
+            raise ValueError('Invalid cursor')
+        filename = cursor_file
+    return filename, offset, request.args.get('limit', type=int)
+
 @app.route('/api/data/<filename>')
 def get_data(filename):
-    """Get data from a specific CSV file"""
+    """Get data from a specific CSV file
+
+    Takes the floorsheet_query parameters (``columns``, ``stock``, ``buyer``,
+    ``seller``, ``broker``, ``min_``/``max_`` quantity, rate and amount,
+    ``sort``), evaluated before serialization, and ``limit``/``offset`` or
+    ``cursor`` paging over the matching rows (send the same query with a cursor);
+    ``format=ndjson`` (or ``Accept: application/x-ndjson``) and ``stream=1``
+    stream the rows instead of building the whole response in memory.
+    ``format=arrow|parquet|csv`` (or the matching Accept type) returns the rows
+    in that format; an unfiltered CSV request is served from the stored file.
+    """
     try:
         if not filename.endswith('.csv'):
             filename += '.csv'
         
-        content = nepse_api.get_csv_content(filename)
-        if content is None:
-            return jsonify({'success': False, 'error': 'File not found'}), 404
-        
-        # Convert CSV to JSON
-        import io
-        df = pd.read_csv(io.StringIO(content))
+        try:
+            filename, offset, limit = page_args(filename)
+            query = FloorsheetQuery.from_args(request.args)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
-        # Add query parameters support
-        limit = request.args.get('limit', type=int)
-        stock_symbol = request.args.get('stock')
+        file_info = nepse_api.get_file_info(filename)
+        if file_info is not None:
+            not_modified = conditional(nepse_api.get_content_hash(filename), file_info.get('last_modified'),
+                                       day_cache_control(file_date(filename)))
+            if not_modified is not None:
+                return not_modified
         
-        if stock_symbol:
-            df = df[df['Stock Symbol'].str.upper() == stock_symbol.upper()]
+        if binary_format() == 'csv' and query.is_empty() and not offset and not limit:
+            response = csv_passthrough(filename)
+            if response is None:
+                return jsonify({'success': False, 'error': 'File not found'}), 404
+            return response
         
-        if limit:
-            df = df.head(limit)
+        df = nepse_api.query_dataframe(filename, query)
+        if df is None:
+            return jsonify({'success': False, 'error': 'File not found'}), 404
         
-        return jsonify({
-            'success': True,
-            'filename': filename,
-            'records': len(df),
-            'data': df.to_dict('records')
-        })
+        page, envelope = paginate(df, filename, offset, limit)
+        return records_response({'success': True, 'filename': filename, **envelope}, page, filename)
+    except QueryError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except TimeoutError as e:
+        return upstream_timeout(e)
     except Exception as e:
         logging.error(f"Error in get_data('{filename}'): {str(e)}")
         return jsonify({'success': False, 'error': 'Internal Server Error'}), 500
 
 @app.route('/api/latest')
 def get_latest():
-    """Get the most recent floor sheet data"""
+    """Get the most recent floor sheet data
+
+    Pages with ``limit`` (default 50) and ``offset``; the returned ``cursor``
+    stays on the same day even after a newer file appears. Filters, projects,
+    sorts and streams like /api/data.
+    """
     try:
-        files = nepse_api.get_csv_files()
-        if not files:
-            return jsonify({'success': False, 'error': 'No files found'}), 404
-        
-        # Sort files by date (assuming filename format includes date)
-        latest_file = sorted(files, key=lambda x: x['name'], reverse=True)[0]
+        try:
+            cursor_file, offset, limit = page_args()
+            query = FloorsheetQuery.from_args(request.args)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
-        content = nepse_api.get_csv_content(latest_file['name'])
-        if content is None:
-            return jsonify({'success': False, 'error': 'Could not read latest file'}), 500
+        if cursor_file:
+            latest_name = cursor_file
+        else:
+            files = nepse_api.get_csv_files()
+            if not files:
+                return jsonify({'success': False, 'error': 'No files found'}), 404
+            
+            # Sort files by date (assuming filename format includes date)
+            latest_name = sorted(files, key=lambda x: x['name'], reverse=True)[0]['name']
         
-        import io
-        df = pd.read_csv(io.StringIO(content))
+        # Which day is latest can change, so only a cursor-pinned day is long-lived
+        file_info = nepse_api.get_file_info(latest_name)
+        if file_info is not None:
+            not_modified = conditional(nepse_api.get_content_hash(latest_name), file_info.get('last_modified'),
+                                       day_cache_control(file_date(latest_name)) if cursor_file else None)
+            if not_modified is not None:
+                return not_modified
         
-        limit = request.args.get('limit', 50, type=int)
-        df = df.head(limit)
+        df = nepse_api.query_dataframe(latest_name, query)
+        if df is None:
+            return jsonify({'success': False, 'error': 'Could not read latest file'}), 500
         
-        return jsonify({
+        page, envelope = paginate(df, latest_name, offset, limit if limit is not None else 50)
+        return records_response({
             'success': True,
-            'filename': latest_file['name'],
-            'date': latest_file['name'].replace('nepal_stock_floorsheet_', '').replace('.csv', ''),
-            'records': len(df),
-            'data': df.to_dict('records')
-        })
+            'filename': latest_name,
+            'date': file_date(latest_name),
+            **envelope
+        }, page, latest_name)
+    except QueryError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except TimeoutError as e:
+        return upstream_timeout(e)
     except Exception as e:
         logging.error(f"Error in get_latest: {str(e)}")
         return jsonify({'success': False, 'error': 'Internal Server Error'}), 500
 
 @app.route('/api/stats')
 def get_stats():
-    """Get statistics about the data"""
+    """Get statistics about the data
+
+    Answered from the ingest-time summary store when the data source has one
+    (whole history, no files read); otherwise sampled from the 5 newest files.
+    """
     try:
+        # Summary answers depend on the summary store alone
+        store_version = nepse_api.get_store_version()
+        not_modified = conditional(store_version) if store_version is not None else dataset_conditional()
+        if not_modified is not None:
+            return not_modified
+        
+        summary = nepse_api.get_stats()
+        if summary is not None:
+            return jsonify({
+                'success': True,
+                'source': 'summary',
+                'total_files': summary['days'],
+                'total_records': summary['total_records'],
+                'total_turnover': summary['total_turnover'],
+                'latest_date': summary['last_date'],
+                'oldest_date': summary['first_date'],
+                'unique_stocks': summary['unique_stocks'],
+                'unique_brokers': summary['unique_brokers'],
+                'sample_stocks': summary['stocks'][:10],
+                'updated': summary.get('updated')
+            })
+        
         files = nepse_api.get_csv_files()
         if not files:
             return jsonify({'success': False, 'error': 'No files found'}), 404
@@ -427,16 +1406,15 @@ def get_stats():
         
         # Sample a few files to get stats (to avoid loading all data)
         sample_files = sorted(files, key=lambda x: x['name'], reverse=True)[:5]
+        sample_frames = nepse_api.get_dataframes([f['name'] for f in sample_files])
         
         for file_info in sample_files:
-            content = nepse_api.get_csv_content(file_info['name'])
-            if content:
-                import io
-                df = pd.read_csv(io.StringIO(content))
+            df = sample_frames[file_info['name']]
+            if df is not None:
                 total_records += len(df)
                 
                 # Extract date from filename
-                date_part = file_info['name'].replace('nepal_stock_floorsheet_', '').replace('.csv', '')
+                date_part = file_date(file_info['name'])
                 dates.append(date_part)
                 
                 # Get unique stocks
@@ -445,6 +1423,7 @@ def get_stats():
         
         return jsonify({
             'success': True,
+            'source': 'sample',
             'total_files': len(files),
             'total_records': total_records,
             'latest_date': max(dates) if dates else None,
@@ -452,46 +1431,250 @@ def get_stats():
             'unique_stocks': len(stocks),
             'sample_stocks': list(stocks)[:10]  # First 10 stocks
         })
+    except TimeoutError as e:
+        return upstream_timeout(e)
     except Exception as e:
         logging.error(f"Error in get_stats: {str(e)}")
         return jsonify({'success': False, 'error': 'Internal Server Error'}), 500
 
 @app.route('/api/stock/<symbol>')
 def get_stock_data(symbol):
-    """Get data for a specific stock symbol"""
+    """Get data for a specific stock symbol
+
+    Optional ``start``/``end`` (YYYY-MM-DD) select a date range; without them
+    the 10 most recent days are returned. Served from the symbol index when the
+    data source has one, otherwise by scanning the day files. Negotiates
+    Arrow/Parquet/CSV and takes the same broker, range, ``columns`` and
+    ``sort`` parameters as /api/data.
+    """
     try:
-        files = nepse_api.get_csv_files()
-        if not files:
-            return jsonify({'success': False, 'error': 'No files found'}), 404
-        
-        all_stock_data = []
+        start = request.args.get('start')
+        end = request.args.get('end')
+        try:
+            query = FloorsheetQuery.from_args(request.args)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
-        # Get data from recent files
-        recent_files = sorted(files, key=lambda x: x['name'], reverse=True)[:10]
+        not_modified = dataset_conditional(end)
+        if not_modified is not None:
+            return not_modified
         
-        for file_info in recent_files:
-            content = nepse_api.get_csv_content(file_info['name'])
-            if content:
-                import io
-                df = pd.read_csv(io.StringIO(content))
-                
-                # Filter for the specific stock
-                stock_data = df[df['Stock Symbol'].str.upper() == symbol.upper()]
-                
-                if not stock_data.empty:
-                    stock_data['Date'] = file_info['name'].replace('nepal_stock_floorsheet_', '').replace('.csv', '')
-                    all_stock_data.extend(stock_data.to_dict('records'))
+        stock_frame = nepse_api.get_symbol_data(symbol, start, end, last_days=10)
+        if stock_frame is None:
+            files = nepse_api.get_csv_files()
+            if not files:
+                return jsonify({'success': False, 'error': 'No files found'}), 404
+            
+            frames = []
+            
+            # Get data from recent files, or from every file in the requested range
+            recent_files = sorted(files, key=lambda x: x['name'], reverse=True)
+            if start or end:
+                recent_files = [f for f in recent_files
+                                if (not start or file_date(f['name']) >= start)
+                                and (not end or file_date(f['name']) <= end)]
+            else:
+                recent_files = recent_files[:10]
+            
+            recent_frames = nepse_api.get_dataframes([f['name'] for f in recent_files])
+            for file_info in recent_files:
+                df = recent_frames[file_info['name']]
+                if df is not None:
+                    # Filter for the specific stock
+                    stock_data = df[df['Stock Symbol'].str.upper() == symbol.upper()]
+                    
+                    if not stock_data.empty:
+                        frames.append(stock_data.assign(Date=file_date(file_info['name'])))
+            stock_frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        if not stock_frame.empty:
+            stock_frame = query.apply(stock_frame)
         
+        fmt = binary_format()
+        if fmt is not None:
+            return binary_response(serialize_frame(stock_frame, fmt), fmt, symbol.upper())
         return jsonify({
             'success': True,
             'stock_symbol': symbol.upper(),
-            'records': len(all_stock_data),
-            'data': all_stock_data
+            'records': len(stock_frame),
+            'data': stock_frame.to_dict('records')
         })
+    except QueryError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except TimeoutError as e:
+        return upstream_timeout(e)
     except Exception as e:
         logging.error(f"Error in get_stock_data('{symbol}'): {str(e)}")
         return jsonify({'success': False, 'error': 'Internal Server Error'}), 500
 
+@app.route('/api/ohlc/<symbol>')
+def get_ohlc(symbol):
+    """Get daily open/high/low/close, VWAP, volume, turnover and trade count bars for a symbol
+
+    Optional ``start``/``end`` (YYYY-MM-DD); the full history otherwise. Bars
+    come precomputed from ingest, oldest first. Negotiates Arrow/Parquet/CSV.
+    """
+    try:
+        not_modified = dataset_conditional(request.args.get('end'))
+        if not_modified is not None:
+            return not_modified
+        
+        bars = nepse_api.get_ohlc(symbol, request.args.get('start'), request.args.get('end'))
+        if bars is None:
+            return jsonify({'success': False, 'error': 'OHLC bars not available'}), 404
+        
+        fmt = binary_format()
+        if fmt is not None:
+            return binary_response(serialize_frame(bars, fmt), fmt, f"{symbol.upper()}_ohlc")
+        return jsonify({
+            'success': True,
+            'stock_symbol': symbol.upper(),
+            'records': len(bars),
+            'data': bars.to_dict('records')
+        })
+    except TimeoutError as e:
+        return upstream_timeout(e)
+    except Exception as e:
+        logging.error(f"Error in get_ohlc('{symbol}'): {str(e)}")
+        return jsonify({'success': False, 'error': 'Internal Server Error'}), 500
+
+def broker_totals(summary):
+    """Buy/sell/net totals overall and per symbol from per-day broker summaries"""
+    def side_totals(rows):
+        return {
+            'trades': int(rows['trades'].sum()),
+            'quantity': int(rows['quantity'].sum()),
+            'amount': round(int(rows['amount'].sum()) / 100, 2),
+        }
+    
+    buy = summary[summary['side'] == 'buy']
+    sell = summary[summary['side'] == 'sell']
+    totals = {'buy': side_totals(buy), 'sell': side_totals(sell)}
+    totals['net_quantity'] = totals['buy']['quantity'] - totals['sell']['quantity']
+    totals['net_amount'] = round(totals['buy']['amount'] - totals['sell']['amount'], 2)
+    
+    per_symbol = summary.pivot_table(index='symbol', columns='side', values=['trades', 'quantity', 'amount'],
+                                     aggfunc='sum', fill_value=0)
+    by_symbol = []
+    for symbol in per_symbol.index:
+        row = {'symbol': symbol}
+        for side in ('buy', 'sell'):
+            for field in ('trades', 'quantity', 'amount'):
+                value = int(per_symbol[(field, side)][symbol]) if (field, side) in per_symbol.columns else 0
+                row[f'{side}_{field}'] = round(value / 100, 2) if field == 'amount' else value
+        row['net_quantity'] = row['buy_quantity'] - row['sell_quantity']
+        row['net_amount'] = round(row['buy_amount'] - row['sell_amount'], 2)
+        by_symbol.append(row)
+    by_symbol.sort(key=lambda r: r['buy_amount'] + r['sell_amount'], reverse=True)
+    return totals, by_symbol
+
+@app.route('/api/broker/<broker_id>')
+def get_broker_data(broker_id):
+    """Get trades and buy/sell totals for one broker
+
+    Optional ``side`` (buy or sell), ``symbol``, ``start``/``end`` (YYYY-MM-DD;
+    without them the 10 most recent days) and ``limit`` (trades returned,
+    default 500). Totals always cover the whole selection and come from the
+    per-day broker summaries, not from the raw trades.
+    """
+    try:
+        side = request.args.get('side')
+        if side not in (None, 'buy', 'sell'):
+            return jsonify({'success': False, 'error': "side must be 'buy' or 'sell'"}), 400
+        symbol = request.args.get('symbol')
+        start = request.args.get('start')
+        end = request.args.get('end')
+        limit = request.args.get('limit', 500, type=int)
+        
+        not_modified = dataset_conditional(end)
+        if not_modified is not None:
+            return not_modified
+        
+        result = nepse_api.get_broker_data(broker_id, start, end, side, symbol, last_days=10)
+        if result is None:
+            return jsonify({'success': False, 'error': 'Broker index not available'}), 404
+        trades, summary = result
+        totals, by_symbol = broker_totals(summary)
+        
+        return jsonify({
+            'success': True,
+            'broker': broker_id,
+            'side': side,
+            'stock_symbol': symbol.upper() if symbol else None,
+            'first_date': summary['date'].min() if len(summary) else None,
+            'last_date': summary['date'].max() if len(summary) else None,
+            'totals': totals,
+            'by_symbol': by_symbol,
+            'total_records': len(trades),
+            'records': min(len(trades), limit),
+            'data': trades.head(limit).to_dict('records')
+        })
+    except TimeoutError as e:
+        return upstream_timeout(e)
+    except Exception as e:
+        logging.error(f"Error in get_broker_data('{broker_id}'): {str(e)}")
+        return jsonify({'success': False, 'error': 'Internal Server Error'}), 500
+
+@app.route('/api/positions')
+@app.route('/api/positions/<broker_id>')
+def get_positions(broker_id=None):
+    """Get net positions per broker and symbol as of a date
+
+    ``/api/positions/<id>`` covers one broker's symbols (optionally narrowed by
+    ``symbol``, comma-separated); ``/api/positions?symbol=X`` covers every
+    broker in X. ``date`` (YYYY-MM-DD, default: latest) picks the day the
+    totals run through. Answered from the ingest-time position ledger; no
+    trades are read. Negotiates Arrow/Parquet/CSV.
+    """
+    try:
+        symbols = [s.strip().upper() for s in request.args.get('symbol', '').split(',') if s.strip()]
+        if broker_id is None and not symbols:
+            return jsonify({'success': False, 'error': 'Give a broker id or a symbol'}), 400
+        date = request.args.get('date')
+        if date:
+            try:
+                date = datetime.strptime(date, '%Y-%m-%d').strftime('%Y-%m-%d')
+            except ValueError:
+                return jsonify({'success': False, 'error': 'date must be YYYY-MM-DD'}), 400
+        
+        store_version = nepse_api.get_store_version()
+        not_modified = conditional(store_version) if store_version is not None else dataset_conditional()
+        if not_modified is not None:
+            return not_modified
+        
+        positions = nepse_api.get_positions(broker_id, symbols, date)
+        if positions is None:
+            return jsonify({'success': False, 'error': 'Position ledger not available'}), 404
+        positions = positions.rename(columns={'date': 'last_trade_date'})
+        # Most actively traded positions first
+        positions = positions.iloc[(-(positions['buy_amount'] + positions['sell_amount'])).argsort(kind='stable')]
+        positions = positions.reset_index(drop=True)
+        
+        fmt = binary_format()
+        if fmt is not None:
+            return binary_response(serialize_frame(positions, fmt), fmt, f"positions_{broker_id or symbols[0]}")
+        return jsonify({
+            'success': True,
+            'broker': broker_id,
+            'stock_symbols': symbols or None,
+            'as_of': date,
+            'totals': {
+                'net_quantity': int(positions['net_quantity'].sum()),
+                'net_amount': round(float(positions['net_amount'].sum()), 2),
+            },
+            'records': len(positions),
+            'data': positions.astype(object).where(positions.notna(), None).to_dict('records')
+        })
+    except TimeoutError as e:
+        return upstream_timeout(e)
+    except Exception as e:
+        logging.error(f"Error in get_positions('{broker_id}'): {str(e)}")
+        return jsonify({'success': False, 'error': 'Internal Server Error'}), 500
+
+@app.route('/api/metrics')
+def get_metrics():
+    """Cache counters and memory usage"""
+    return jsonify({'success': True, **nepse_api.metrics()})
+
 @app.route('/health')
 def health():
     """Health check endpoint"""
@@ -510,7 +1693,7 @@ def home():
         HTML_TEMPLATE, 
         files=len(files), 
         api_url=request.host_url, 
-        latest=files[0]['name'].replace('nepal_stock_floorsheet_', '').replace('.csv', '') if files else "N/A"
+        latest=file_date(files[0]['name']) if files else "N/A"
     )
 
 if __name__ == '__main__':
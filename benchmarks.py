@@ -0,0 +1,735 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the floor sheet scraper and API
+Run a single benchmark with: python benchmarks.py <name>
+"""
+
+import sys
+import time
+
+import pandas as pd
+
+
+def synthetic_page(page_index, rows_per_page=10):
+    """Build one page of raw floor sheet cells the way the scraper sees them"""
+    rows = []
+    for i in range(rows_per_page):
+        sn = page_index * rows_per_page + i + 1
+        rows.append([
+            str(sn),
+            f"2025062401{sn:06d}",
+            f"SYM{sn % 250}",
+            str(sn % 90 + 1),
+            str((sn * 7) % 90 + 1),
+            f"{(sn % 500) + 10:,}",
+            f"{(sn % 900) + 100:,}.00",
+            f"{((sn % 500) + 10) * ((sn % 900) + 100):,}.00",
+        ])
+    return rows
+
+
+def bench_sink(page_counts=(500, 1000, 2000, 4000)):
+    """Compare per-page pd.concat accumulation with the streaming row sink"""
+    import os
+    import tempfile
+    from scrape_floorsheet import CsvSpoolSink, RowBufferSink
+
+    print(f"{'pages':>8} {'concat (s)':>12} {'sink (s)':>10} {'spool (s)':>10} {'speedup':>8}")
+    for pages in page_counts:
+        replay = [synthetic_page(i) for i in range(pages)]
+
+        start = time.perf_counter()
+        all_data = pd.DataFrame()
+        for rows in replay:
+            all_data = pd.concat([all_data, pd.DataFrame(rows)], ignore_index=True)
+        concat_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sink = RowBufferSink()
+        for rows in replay:
+            sink.add_rows(rows)
+        sink_frame = sink.to_frame()
+        sink_time = time.perf_counter() - start
+
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            spool = CsvSpoolSink(os.path.join(tmp, 'spool.csv'))
+            for rows in replay:
+                spool.add_rows(rows)
+            spool_frame = spool.to_frame()
+            spool_time = time.perf_counter() - start
+
+        assert len(sink_frame) == len(spool_frame) == len(all_data)
+        print(f"{pages:>8} {concat_time:>12.3f} {sink_time:>10.3f} {spool_time:>10.3f} "
+              f"{concat_time / sink_time:>7.1f}x")
+
+
+def synthetic_api_page(page_index, total_pages, rows_per_page=500):
+    """Build one floor sheet JSON API page shaped like the NEPSE endpoint response"""
+    content = []
+    for row in synthetic_page(page_index, rows_per_page):
+        content.append({
+            'contractId': int(row[1]), 'stockSymbol': row[2],
+            'buyerMemberId': row[3], 'sellerMemberId': row[4],
+            'contractQuantity': int(row[5].replace(',', '')),
+            'contractRate': float(row[6].replace(',', '')),
+            'contractAmount': float(row[7].replace(',', '')),
+        })
+    return {'floorsheets': {'content': content, 'number': page_index,
+                            'totalPages': total_pages, 'last': page_index == total_pages - 1}}
+
+
+def bench_http(contracts=60000, page_size=500, latency=0.05):
+    """Time a full synthetic day through the HTTP backend against a local stub server"""
+    from fixture_server import FixtureServer
+    from floorsheet_http import HttpFetcher
+    from scrape_floorsheet import scrape_with_backends
+
+    total_pages = contracts // page_size
+    pages = [synthetic_api_page(i, total_pages, page_size) for i in range(total_pages)]
+    # The Selenium backend shows 10 rows per page and sleeps 3 s after every "Next" click
+    selenium_floor = (contracts // 10) * 3
+    print(f"{total_pages} pages of {page_size}, {latency * 1000:.0f} ms simulated latency per request")
+    for workers in (1, 4, 8, 16):
+        with FixtureServer(pages, latency=latency) as server:
+            fetcher = HttpFetcher(base_url=server.url, page_size=page_size, workers=workers)
+            start = time.perf_counter()
+            data = scrape_with_backends([fetcher])
+            elapsed = time.perf_counter() - start
+        assert len(data) == contracts
+        print(f"workers={workers:<3} {elapsed:>7.2f}s  "
+              f"(selenium sleep floor alone: {selenium_floor}s, {selenium_floor / elapsed:.0f}x)")
+
+
+def bench_extract(repeat=30):
+    """Compare table extractors on saved floor sheet HTML: rows/second and allocations"""
+    import glob
+    import os
+    import tracemalloc
+    from floorsheet_extract import HTML_EXTRACTORS
+
+    fixtures = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                             'fixtures', 'floorsheet_html', '*.html')))
+    for path in fixtures:
+        with open(path, encoding='utf-8') as f:
+            page_html = f.read()
+        reference = HTML_EXTRACTORS['bs4'](page_html)
+        print(f"\n{os.path.basename(path)} ({len(page_html) / 1024:.0f} KiB, {len(reference)} rows)")
+        print(f"{'extractor':>10} {'rows/s':>12} {'ms/page':>9} {'peak KiB':>9} {'result KiB':>11}")
+        for name, extract in HTML_EXTRACTORS.items():
+            assert extract(page_html) == reference, f"{name} disagrees with bs4"
+            start = time.perf_counter()
+            for _ in range(repeat):
+                extract(page_html)
+            per_page = (time.perf_counter() - start) / repeat
+
+            # Peak traced memory during one extraction, and what the returned rows keep alive
+            tracemalloc.start()
+            rows = extract(page_html)
+            retained, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del rows
+            rows_per_second = len(reference) / per_page if per_page else float('inf')
+            print(f"{name:>10} {rows_per_second:>12,.0f} {per_page * 1000:>9.2f} "
+                  f"{peak / 1024:>9.0f} {retained / 1024:>11.0f}")
+
+
+def bench_parse(total_rows=1_000_000):
+    """Compare clean_data's string round-trips with the typed schema parser on synthetic rows"""
+    import gc
+    from floorsheet_schema import ParseStats, parse_rows
+    from scrape_floorsheet import clean_data
+
+    rows = [row for i in range(total_rows // 100) for row in synthetic_page(i, 100)]
+    print(f"{len(rows):,} rows")
+
+    def measure(label, func):
+        gc.collect()
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        size = result.memory_usage(deep=True).sum()
+        print(f"{label:>14} {elapsed:>8.2f}s  result {size / 2**20:>6.0f} MiB")
+        return result
+
+    legacy = measure('clean_data', lambda: clean_data(pd.DataFrame(rows)))
+    stats = ParseStats()
+    typed = measure('typed schema', lambda: parse_rows(rows, stats))
+    print(stats.summary())
+    assert len(legacy) == len(typed)
+    assert (typed['Amount (paisa)'].to_numpy() == (legacy['Amount (Rs)'] * 100).round().to_numpy()).all()
+
+
+def synthetic_days(days=60, rows_per_day=20000, start='2025-01-01'):
+    """Yield (date, typed frame) for consecutive synthetic trading days"""
+    from floorsheet_schema import parse_rows
+
+    pages_per_day = rows_per_day // 100
+    for index, date in enumerate(pd.bdate_range(start, periods=days)):
+        rows = [row for page in range(index * pages_per_day, (index + 1) * pages_per_day)
+                for row in synthetic_page(page, 100)]
+        yield date.strftime('%Y-%m-%d'), parse_rows(rows)
+
+
+def synthetic_trades(days=250, rows_per_day=20000, symbols=250, brokers=90, start='2025-01-01', seed=0):
+    """Trades for consecutive synthetic trading days in the published layout, with a datetime Date column
+
+    Symbol and broker activity is skewed the way a real floor sheet is: a few
+    symbols take most trades and thin symbols are dominated by a few brokers.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=days)
+    rows = days * rows_per_day
+    symbol = np.minimum(rng.zipf(1.3, rows) - 1, symbols - 1)
+    # Each symbol favours its own pair of brokers part of the time
+    favourite = (symbol * 7) % brokers
+    buyer = np.where(rng.random(rows) < 0.3, favourite, rng.integers(0, brokers, rows)) + 1
+    seller = np.where(rng.random(rows) < 0.2, (favourite + 11) % brokers, rng.integers(0, brokers, rows)) + 1
+    quantity = rng.integers(10, 1000, rows)
+    rate = (rng.integers(10000, 200000, rows) // 10) / 10
+    day = np.repeat(np.arange(days), rows_per_day)
+    return pd.DataFrame({
+        'SN': np.tile(np.arange(1, rows_per_day + 1), days),
+        'Contract No.': (dates.strftime('%Y%m%d').astype(np.int64).to_numpy()[day] * 10**8
+                         + np.tile(np.arange(rows_per_day), days)),
+        'Stock Symbol': np.char.add('SYM', symbol.astype(str)),
+        'Buyer': buyer,
+        'Seller': seller,
+        'Quantity': quantity,
+        'Rate (Rs)': rate,
+        'Amount (Rs)': (quantity * rate).round(2),
+        'Date': dates.to_numpy()[day],
+    })
+
+
+def write_daily_csvs(trades, directory):
+    """Write ``trades`` as one published nepal_stock_floorsheet_<date>.csv per day; returns the paths"""
+    import os
+
+    paths = []
+    for date, day in trades.groupby('Date', sort=True):
+        path = os.path.join(directory, f"nepal_stock_floorsheet_{date:%Y-%m-%d}.csv")
+        day.drop(columns='Date').to_csv(path, index=False, float_format='%.2f')
+        paths.append(path)
+    return paths
+
+
+def notebook_functions(path=None):
+    """Namespace holding the functions defined in floorsheet_analysis.ipynb, without running its cells"""
+    import ast
+    import glob
+    import json
+    import os
+    from datetime import datetime, timedelta
+    import numpy as np
+
+    path = path or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'floorsheet_analysis.ipynb')
+    with open(path, encoding='utf-8') as f:
+        cells = json.load(f)['cells']
+    namespace = {'pd': pd, 'np': np, 'glob': glob, 'os': os, 'datetime': datetime, 'timedelta': timedelta,
+                 'print': lambda *a, **k: None}
+    for cell in cells:
+        if cell['cell_type'] != 'code':
+            continue
+        tree = ast.parse(''.join(cell['source']))
+        tree.body = [node for node in tree.body if isinstance(node, ast.FunctionDef)]
+        exec(compile(tree, path, 'exec'), namespace)
+    return namespace
+
+
+def bench_storage(days=60, rows_per_day=20000):
+    """Daily CSV vs date-partitioned Parquet: disk footprint, full loads and pushed-down queries"""
+    import glob
+    import os
+    import tempfile
+    import floorsheet_store
+    from floorsheet_schema import to_rupees
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, 'parquet')
+        for date, frame in synthetic_days(days, rows_per_day):
+            to_rupees(frame).to_csv(os.path.join(tmp, f'nepal_stock_floorsheet_{date}.csv'),
+                                    index=False, float_format='%.2f')
+            floorsheet_store.write_day(frame, date, root)
+        csv_files = sorted(glob.glob(os.path.join(tmp, '*.csv')))
+        csv_size = sum(os.path.getsize(f) for f in csv_files)
+        parquet_size = sum(os.path.getsize(f) for f in glob.glob(os.path.join(root, '*', '*.parquet')))
+        print(f"{days} days x {rows_per_day:,} rows: CSV {csv_size / 2**20:.1f} MiB, "
+              f"Parquet {parquet_size / 2**20:.1f} MiB")
+
+        def timed(label, func):
+            start = time.perf_counter()
+            result = func()
+            print(f"{label:<44} {time.perf_counter() - start:>7.3f}s  {len(result):>10,} rows")
+
+        timed('CSV: read every file', lambda: pd.concat([pd.read_csv(f) for f in csv_files]))
+        timed('Parquet: read everything', lambda: floorsheet_store.read_floorsheet(root))
+        timed('CSV: one symbol, all days', lambda: pd.concat(
+            [df[df['Stock Symbol'] == 'SYM7'] for df in (pd.read_csv(f) for f in csv_files)]))
+        timed('Parquet: one symbol, all days, 3 columns', lambda: floorsheet_store.read_floorsheet(
+            root, columns=['date', 'Quantity', 'Rate (paisa)'], symbols=['SYM7']))
+        last_week = floorsheet_store.list_dates(root)[-5]
+        timed('CSV: last 5 days', lambda: pd.concat([pd.read_csv(f) for f in csv_files[-5:]]))
+        timed('Parquet: last 5 days', lambda: floorsheet_store.read_floorsheet(root, start=last_week))
+
+
+def bench_symbol_index(years=3, rows_per_day=5000):
+    """Symbol queries over a multi-year store: pushed-down scan vs the symbol index"""
+    import os
+    import tempfile
+    import floorsheet_store
+
+    days = years * 250
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, 'parquet')
+        for date, frame in synthetic_days(days, rows_per_day, start='2022-01-03'):
+            floorsheet_store.write_day(frame, date, root)
+        start = time.perf_counter()
+        floorsheet_store.rebuild_index('symbol', root)
+        print(f"Full index rebuild: {time.perf_counter() - start:.2f}s")
+        dates = floorsheet_store.list_dates(root)
+        start = time.perf_counter()
+        floorsheet_store.update_index('symbol', dates[-1], root)
+        print(f"Incremental update for one day: {(time.perf_counter() - start) * 1000:.0f}ms")
+
+        def timed(label, func, repeat=3):
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = func()
+                best = min(best, time.perf_counter() - start)
+            print(f"{label:<44} {best * 1000:>9.1f}ms  {len(result):>8,} rows")
+
+        last_month = dates[-21]
+        print(f"{days} days x {rows_per_day:,} rows ({days * rows_per_day:,} trades)")
+        timed('Scan: one symbol, all history', lambda: floorsheet_store.read_floorsheet(root, symbols=['SYM7']))
+        timed('Index: one symbol, all history', lambda: floorsheet_store.read_symbol('SYM7', root=root))
+        timed('Scan: one symbol, last 20 days', lambda: floorsheet_store.read_floorsheet(
+            root, start=last_month, symbols=['SYM7']))
+        timed('Index: one symbol, last 20 days', lambda: floorsheet_store.read_symbol('SYM7', last_month, root=root))
+
+
+def bench_api_stream(rows=300000):
+    """Full-day /api/data response: jsonify vs streamed NDJSON / JSON, peak Python memory and first byte"""
+    import os
+    import tempfile
+    import tracemalloc
+    import api_server
+    from floorsheet_schema import parse_rows, to_rupees
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = 'nepal_stock_floorsheet_2025-06-24.csv'
+        day = parse_rows([row for page in range(rows // 100) for row in synthetic_page(page, 100)])
+        to_rupees(day).to_csv(os.path.join(tmp, filename), index=False, float_format='%.2f')
+        api_server.nepse_api = api_server.NEPSEDataAPI(api_server.LocalDataSource(tmp))
+        client = api_server.app.test_client()
+        client.get(f'/api/data/{filename}?limit=1')  # parse once; the frame is cached from here on
+
+        for label, query in (('jsonify', ''), ('NDJSON stream', '?format=ndjson'), ('JSON stream', '?stream=1')):
+            tracemalloc.start()
+            start = time.perf_counter()
+            response = client.get(f'/api/data/{filename}{query}', buffered=False)
+            chunks = iter(response.response)
+            size = len(next(chunks))
+            first_byte = time.perf_counter() - start
+            size += sum(len(chunk) for chunk in chunks)
+            total = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            response.close()
+            print(f"{label:<14} first byte {first_byte * 1000:>8.1f}ms  total {total:>6.2f}s  "
+                  f"peak {peak / 2**20:>7.1f} MiB  body {size / 2**20:>6.1f} MiB")
+
+
+def bench_api_formats(rows=300000):
+    """Full-day /api/data in each response format and encoding: server time and payload size"""
+    import os
+    import tempfile
+    import api_server
+    from floorsheet_schema import parse_rows, to_rupees
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = 'nepal_stock_floorsheet_2025-06-24.csv'
+        day = parse_rows([row for page in range(rows // 100) for row in synthetic_page(page, 100)])
+        to_rupees(day).to_csv(os.path.join(tmp, filename), index=False, float_format='%.2f')
+        api_server.nepse_api = api_server.NEPSEDataAPI(api_server.LocalDataSource(tmp))
+        client = api_server.app.test_client()
+        client.get(f'/api/data/{filename}?limit=1')  # parse once; the frame is cached from here on
+
+        formats = (('JSON', ''), ('NDJSON', '?format=ndjson'), ('Arrow IPC', '?format=arrow'),
+                   ('Parquet', '?format=parquet'), ('CSV passthrough', '?format=csv'),
+                   ('CSV re-serialized', f'?format=csv&limit={rows}'))
+        print(f"{'format':<18} {'encoding':<9} {'time':>8} {'size':>10}")
+        for label, query in formats:
+            for encoding in ('identity', 'gzip', 'zstd'):
+                start = time.perf_counter()
+                response = client.get(f'/api/data/{filename}{query}', headers={'Accept-Encoding': encoding})
+                size = len(response.get_data())
+                elapsed = time.perf_counter() - start
+                print(f"{label:<18} {response.headers.get('Content-Encoding', 'identity'):<9} "
+                      f"{elapsed:>7.2f}s {size / 2**20:>7.1f} MiB")
+
+
+def bench_api_query(rows=300000):
+    """Selective /api/data queries (store pushdown and in-memory mask) vs downloading the whole day"""
+    import os
+    import tempfile
+    import api_server
+    import floorsheet_store
+    from floorsheet_schema import parse_rows, to_rupees
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = 'nepal_stock_floorsheet_2025-06-24.csv'
+        day = parse_rows([row for page in range(rows // 100) for row in synthetic_page(page, 100)])
+        to_rupees(day).to_csv(os.path.join(tmp, filename), index=False, float_format='%.2f')
+        floorsheet_store.ingest_day(day, '2025-06-24', os.path.join(tmp, 'parquet'))
+        api = api_server.NEPSEDataAPI(api_server.LocalDataSource(tmp))
+        api_server.nepse_api = api
+        client = api_server.app.test_client()
+
+        def timed(label, query, cached):
+            """Cold: nothing in memory, so filters are answered by the Parquet store; cached: the parsed day is"""
+            api.frames.clear()
+            if cached:
+                api.get_dataframe(filename)
+            start = time.perf_counter()
+            response = client.get(f'/api/data/{filename}?{query}')
+            size = len(response.get_data())
+            elapsed = time.perf_counter() - start
+            records = response.headers.get('X-Total-Records') or (response.get_json() or {}).get('total_records', '-')
+            print(f"{label:<32} {'cached' if cached else 'cold':<6} {elapsed * 1000:>8.1f}ms "
+                  f"{size / 2**10:>10.1f} KiB  {records:>7} rows")
+
+        timed('Full day, CSV passthrough', 'format=csv', cached=False)
+        timed('Full day, JSON', '', cached=False)
+        timed('Full day, JSON', '', cached=True)
+        queries = (('One symbol, 3 columns', 'stock=SYM7&columns=contract,quantity,rate'),
+                   ('One buyer, big trades, sorted', 'buyer=12&min_amount=300000&sort=-amount'),
+                   ('Broker pair', 'buyer=12&seller=78'),
+                   ('Rate band, Arrow', 'min_rate=500&max_rate=510&format=arrow'))
+        for label, query in queries:
+            timed(label, query, cached=False)
+            timed(label, query, cached=True)
+
+
+def bench_ohlc(years=3, rows_per_day=2000):
+    """Daily bars for one symbol: regrouping raw trades vs the precomputed bar table"""
+    import tempfile
+    import pyarrow as pa
+    import floorsheet_summary
+
+    days = years * 250
+    trades, bars = [], []
+    for date, frame in synthetic_days(days, rows_per_day, start='2022-01-03'):
+        trades.append(frame.assign(date=date))
+        bars.append(floorsheet_summary.summarize_day(frame, date)[1])
+    trades = pd.concat(trades, ignore_index=True)
+    with tempfile.TemporaryDirectory() as root:
+        floorsheet_summary._write(pa.Table.from_pandas(pd.concat(bars, ignore_index=True),
+                                                        schema=floorsheet_summary.SYMBOL_DAILY_SCHEMA,
+                                                        preserve_index=False),
+                                  floorsheet_summary.SYMBOL_DAILY_FILE, root)
+        start = time.perf_counter()
+        floorsheet_summary.load_bar_index(root)
+        print(f"{days} days, {len(trades):,} trades; bar index load {(time.perf_counter() - start) * 1000:.1f}ms")
+
+        def timed(label, func, repeat=20):
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = func()
+                best = min(best, time.perf_counter() - start)
+            print(f"{label:<44} {best * 1000:>9.3f}ms  {len(result):>6} bars")
+
+        def from_trades():
+            rows = trades[trades['Stock Symbol'] == 'SYM7'].sort_values('Contract No.')
+            return rows.groupby('date').agg(open=('Rate (paisa)', 'first'), high=('Rate (paisa)', 'max'),
+                                            low=('Rate (paisa)', 'min'), close=('Rate (paisa)', 'last'),
+                                            volume=('Quantity', 'sum'))
+
+        index = floorsheet_summary.load_bar_index(root)
+        timed('Raw trades: filter + groupby', from_trades, repeat=3)
+        timed('Bar table: one symbol, all history', lambda: floorsheet_summary.read_ohlc('SYM7', root=root))
+        timed('Bar index lookup: all history', lambda: index.bars('SYM7')['date'])
+        timed('Bar index lookup: current month',
+              lambda: index.bars('SYM7', start=trades['date'].iloc[-1][:8] + '01')['date'])
+
+
+def bench_api_async(days=10, rows_per_day=5000, clients=50, latency=0.1):
+    """Cold /api/stock load against a stub GitHub: threaded WSGI with requests vs the ASGI mode"""
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    import httpx
+    import api_async
+    import api_server
+    from fixture_server import GitHubStub
+    from floorsheet_schema import to_rupees
+
+    files = {f'nepal_stock_floorsheet_{date}.csv': to_rupees(frame).to_csv(index=False, float_format='%.2f')
+             for date, frame in synthetic_days(days, rows_per_day)}
+    print(f"{clients} concurrent clients, {days} day files, {latency * 1000:.0f} ms upstream latency")
+
+    def report(label, elapsed, stub):
+        print(f"{label:<30} {elapsed:>6.2f}s  upstream calls {sum(stub.requests.values()):>5}  "
+              f"max in flight {stub.max_in_flight:>3}")
+
+    for workers in (1, 8, clients):
+        with GitHubStub(files, latency=latency) as stub:
+            api_server.nepse_api = api_server.NEPSEDataAPI(api_server.GitHubDataSource(stub.base_url))
+            client = api_server.app.test_client()
+            start = time.perf_counter()
+            with ThreadPoolExecutor(workers) as pool:
+                list(pool.map(lambda _: client.get('/api/stock/SYM7'), range(clients)))
+            report(f"WSGI, {workers} threads", time.perf_counter() - start, stub)
+
+    with GitHubStub(files, latency=latency) as stub:
+        source = api_async.AsyncGitHubDataSource(stub.base_url)
+        app = api_async.create_app(source)
+
+        async def load():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=None) as client:
+                await asyncio.gather(*(client.get('/api/stock/SYM7') for _ in range(clients)))
+
+        start = time.perf_counter()
+        asyncio.run(load())
+        report('ASGI', time.perf_counter() - start, stub)
+        source.close()
+
+
+def bench_stampede(clients=50, rows_per_day=20000, latency=0.2):
+    """A new day lands and every client asks for /api/latest at once: upstream calls with and without single-flight"""
+    from concurrent.futures import Future, ThreadPoolExecutor
+    import api_server
+    from fixture_server import GitHubStub
+    from floorsheet_schema import to_rupees
+
+    class NoFlight(api_server.SingleFlight):
+        def join(self, key):
+            return Future(), True
+
+        def finish(self, key, result=None, error=None):
+            pass
+
+        def do(self, key, func):
+            return func()
+
+    days = dict(synthetic_days(6, rows_per_day))
+    files = {f'nepal_stock_floorsheet_{date}.csv': to_rupees(frame).to_csv(index=False, float_format='%.2f')
+             for date, frame in days.items()}
+    new_day = sorted(files)[-1]
+    print(f"{clients} clients, {rows_per_day} rows per day, {latency * 1000:.0f} ms upstream latency")
+    for label, flights in (('per-request fetch', NoFlight()), ('single-flight', None)):
+        with GitHubStub({name: text for name, text in files.items() if name != new_day}, latency=latency) as stub:
+            api = api_server.NEPSEDataAPI(api_server.GitHubDataSource(stub.base_url), listing_ttl=0, listing_stale=0)
+            api.flights = flights or api.flights
+            api_server.nepse_api = api
+            client = api_server.app.test_client()
+            client.get('/api/latest?limit=1')
+            stub.files[new_day] = files[new_day]
+            stub.requests.clear()
+            start = time.perf_counter()
+            with ThreadPoolExecutor(clients) as pool:
+                list(pool.map(lambda _: client.get('/api/latest?limit=50'), range(clients)))
+            elapsed = time.perf_counter() - start
+        print(f"{label:<18} {elapsed:>6.2f}s  listing calls {stub.requests.get('', 0):>3}  "
+              f"new day downloads {stub.requests.get(new_day, 0):>3}")
+
+
+def bench_broker_dominance(days=250, rows_per_day=20000):
+    """Broker dominance over a year of trades: the notebook's per-symbol loop vs one grouped pass"""
+    import floorsheet_analytics
+
+    trades = synthetic_trades(days, rows_per_day)
+    notebook = notebook_functions()
+    print(f"{len(trades):,} trades, {trades['Stock Symbol'].nunique()} symbols")
+    for timeframe in ('daily', 'monthly', 'yearly'):
+        start = time.perf_counter()
+        expected, expected_summary = notebook['analyze_broker_dominance'](trades, timeframe=timeframe)
+        loop_time = time.perf_counter() - start
+        start = time.perf_counter()
+        results, summary = floorsheet_analytics.broker_dominance(trades, timeframe=timeframe)
+        grouped_time = time.perf_counter() - start
+        assert len(results) == len(expected) and summary['suspicious_brokers'] == expected_summary['suspicious_brokers']
+        print(f"{timeframe:<8} notebook {loop_time:>7.2f}s  grouped {grouped_time:>6.3f}s  "
+              f"{loop_time / grouped_time:>6.1f}x  {len(results):>7,} rows")
+
+
+def bench_wash_trading(days=250, rows_per_day=20000):
+    """Wash-trade detection over a year of trades: the notebook's row-wise pair labels vs integer pair keys"""
+    import floorsheet_analytics
+
+    trades = synthetic_trades(days, rows_per_day)
+    notebook = notebook_functions()
+    print(f"{len(trades):,} trades, {trades['Stock Symbol'].nunique()} symbols")
+    for timeframe in ('daily', 'monthly', 'yearly'):
+        start = time.perf_counter()
+        _, expected, _ = notebook['detect_wash_trading'](trades.copy(), timeframe=timeframe)
+        apply_time = time.perf_counter() - start
+        start = time.perf_counter()
+        _, pairs, _ = floorsheet_analytics.wash_trading(trades, timeframe=timeframe)
+        keyed_time = time.perf_counter() - start
+        assert len(pairs) == len(expected)
+        print(f"{timeframe:<8} notebook {apply_time:>7.2f}s  pair keys {keyed_time:>6.3f}s  "
+              f"{apply_time / keyed_time:>6.1f}x  {len(pairs):>7,} suspicious pairs")
+    start = time.perf_counter()
+    recurring = floorsheet_analytics.recurring_pairs(trades, window=5, min_days=4)
+    print(f"pairs active on 4 of any 5 days over the year: {time.perf_counter() - start:.3f}s, {len(recurring):,} pairs")
+
+
+def bench_volume_surge(days=250, rows_per_day=20000):
+    """Volume surges over a year: one day's incremental update vs recomputing the whole history"""
+    import floorsheet_analytics
+
+    trades = synthetic_trades(days, rows_per_day)
+    history = list(floorsheet_analytics.trading_days(trades))
+    notebook = notebook_functions()
+    print(f"{len(trades):,} trades over {len(history)} days, {trades['Stock Symbol'].nunique()} symbols")
+
+    engine = floorsheet_analytics.VolumeSurgeEngine()
+    start = time.perf_counter()
+    for date, day in history[:-1]:
+        engine.update(day, date)
+    print(f"{'engine: first ' + str(len(history) - 1) + ' days':<34} {time.perf_counter() - start:>8.3f}s")
+    date, day = history[-1]
+    start = time.perf_counter()
+    events = engine.update(day, date)
+    update_time = time.perf_counter() - start
+    print(f"{'engine: add the last day':<34} {update_time * 1000:>7.1f}ms  {len(events):>6,} events")
+
+    for label, recompute in (('full recompute, vectorized', floorsheet_analytics.volume_surge),
+                             ('full recompute, notebook', notebook['analyze_volume_surge'])):
+        start = time.perf_counter()
+        results, _ = recompute(trades)
+        elapsed = time.perf_counter() - start
+        assert (results['Date'] == date).sum() == len(events)
+        print(f"{label:<34} {elapsed:>8.3f}s  {elapsed / update_time:>8.0f}x the daily update")
+
+
+def bench_positions(days=250, rows_per_day=20000):
+    """Net position of a broker in a symbol as of a date: position ledger vs regrouping a year of trades"""
+    import os
+    import tempfile
+    import floorsheet_analytics
+    import floorsheet_summary
+
+    trades = synthetic_trades(days, rows_per_day)
+    trades['Amount (paisa)'] = (trades['Amount (Rs)'] * 100).round().astype('int64')
+    for column in ('Buyer', 'Seller'):
+        trades[column] = trades[column].astype(str)
+    history = [(date.strftime('%Y-%m-%d'), day) for date, day in floorsheet_analytics.trading_days(trades)]
+    changes = [floorsheet_summary.position_changes(day, date) for date, day in history]
+    as_of = history[len(history) // 2][0]
+    notebook = notebook_functions()
+    print(f"{len(trades):,} trades over {len(history)} days")
+
+    with tempfile.TemporaryDirectory() as root:
+        start = time.perf_counter()
+        ledger = floorsheet_summary.accumulate_positions(pd.concat(changes[:-1], ignore_index=True))
+        floorsheet_summary._write(floorsheet_summary._positions_table(ledger), floorsheet_summary.POSITIONS_FILE, root)
+        print(f"{'ledger: build ' + str(len(history) - 1) + ' days':<40} {time.perf_counter() - start:>8.3f}s  "
+              f"{len(ledger):,} rows, {os.path.getsize(os.path.join(root, floorsheet_summary.POSITIONS_FILE)) / 2**20:.1f} MiB")
+        start = time.perf_counter()
+        floorsheet_summary.update_positions(changes[-1], history[-1][0], root)
+        print(f"{'ledger: add the last day':<40} {time.perf_counter() - start:>8.3f}s")
+        start = time.perf_counter()
+        floorsheet_summary.load_position_index(root)
+        print(f"{'ledger: load the index':<40} {time.perf_counter() - start:>8.3f}s")
+
+        def timed(label, func, repeat=5):
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = func()
+                best = min(best, time.perf_counter() - start)
+            print(f"{label:<40} {best * 1000:>9.3f}ms  {len(result):>6} rows")
+            return result
+
+        def from_trades():
+            rows = trades[(trades['Date'] <= as_of) & (trades['Stock Symbol'] == 'SYM7')]
+            bought = rows.loc[rows['Buyer'] == '12', ['Quantity', 'Amount (paisa)']].sum()
+            sold = rows.loc[rows['Seller'] == '12', ['Quantity', 'Amount (paisa)']].sum()
+            return [bought['Quantity'] - sold['Quantity'], bought['Amount (paisa)'] - sold['Amount (paisa)']]
+
+        expected = timed(f'Trades: filter to {as_of} + sum', from_trades, repeat=3)
+        position = timed('Ledger: broker 12 in SYM7', lambda: floorsheet_summary.read_positions(
+            '12', ['SYM7'], as_of, root=root, rupees=False))
+        assert position[['net_quantity', 'net_amount']].iloc[0].tolist() == expected
+        timed('Ledger: broker 12, every symbol',
+              lambda: floorsheet_summary.read_positions('12', date=as_of, root=root))
+        timed('Ledger: every broker in SYM7',
+              lambda: floorsheet_summary.read_positions(symbols=['SYM7'], date=as_of, root=root))
+        history_so_far = trades[trades['Date'] <= as_of]
+        timed('Notebook: analyze_net_holdings, SYM7', lambda: notebook['analyze_net_holdings'](
+            history_so_far, 'SYM7', 'all')[0], repeat=1)
+
+
+def bench_loader(days=250, rows_per_day=20000):
+    """A year of daily CSVs: the notebook's load_floorsheet_data + preprocess_data vs the compact loader"""
+    import gc
+    import os
+    import tempfile
+    import tracemalloc
+    import floorsheet_loader
+
+    notebook = notebook_functions()
+    with tempfile.TemporaryDirectory() as tmp:
+        trades = synthetic_trades(days, rows_per_day)
+        write_daily_csvs(trades, tmp)
+        dates = sorted(trades['Date'].dt.strftime('%Y-%m-%d').unique())
+        print(f"{len(trades):,} trades in {days} CSV files")
+        del trades
+
+        def measure(label, load):
+            gc.collect()
+            tracemalloc.start()
+            start = time.perf_counter()
+            frame = load()
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            size = frame.memory_usage(deep=True).sum()
+            print(f"{label:<38} {elapsed:>7.2f}s  peak {peak / 2**20:>6.0f} MiB  "
+                  f"result {size / 2**20:>6.0f} MiB  {len(frame):>9,} rows")
+
+        measure('notebook load + preprocess', lambda: notebook['preprocess_data'](notebook['load_floorsheet_data'](tmp)))
+        measure('load_trades', lambda: floorsheet_loader.load_trades(tmp))
+        measure('load_trades + calendar columns',
+                lambda: floorsheet_loader.add_calendar_columns(floorsheet_loader.load_trades(tmp)))
+        workers = max(2, min(4, os.cpu_count() or 1))
+        measure(f'load_trades, {workers} processes', lambda: floorsheet_loader.load_trades(tmp, workers=workers))
+        measure('load_trades, last quarter, 2 symbols',
+                lambda: floorsheet_loader.load_trades(tmp, start=dates[-63], symbols=['SYM0', 'SYM7']))
+
+
+BENCHMARKS = {
+    'sink': bench_sink,
+    'http': bench_http,
+    'extract': bench_extract,
+    'parse': bench_parse,
+    'storage': bench_storage,
+    'symbol_index': bench_symbol_index,
+    'api_stream': bench_api_stream,
+    'api_formats': bench_api_formats,
+    'ohlc': bench_ohlc,
+    'api_query': bench_api_query,
+    'api_async': bench_api_async,
+    'stampede': bench_stampede,
+    'broker_dominance': bench_broker_dominance,
+    'wash_trading': bench_wash_trading,
+    'volume_surge': bench_volume_surge,
+    'positions': bench_positions,
+    'loader': bench_loader,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark '{name}'. Available: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        print(f"\n=== {name} ===")
+        BENCHMARKS[name]()
@@ -0,0 +1,35 @@
+"""
+Shared helpers for the offline tests: three days of synthetic floor sheet trades,
+written as daily CSVs or ingested into a store
+"""
+
+import os
+
+from benchmarks import synthetic_page
+from floorsheet_schema import parse_rows, to_rupees
+import floorsheet_store
+
+DATES = ['2025-06-22', '2025-06-23', '2025-06-24']
+
+
+def make_day(index, pages=30):
+    """The ``index``th day's parsed trades: ``pages`` synthetic pages, none shared with another day"""
+    return parse_rows([row for page in range(index * pages, (index + 1) * pages) for row in synthetic_page(page)])
+
+
+def write_csv_days(directory, pages=30):
+    """Write each of DATES as a published daily CSV in ``directory`` and return {date: rupee frame}"""
+    days = {}
+    for index, date in enumerate(DATES):
+        days[date] = to_rupees(make_day(index, pages))
+        days[date].to_csv(os.path.join(directory, f'nepal_stock_floorsheet_{date}.csv'),
+                          index=False, float_format='%.2f')
+    return days
+
+
+def ingest_days(root):
+    """Ingest each of DATES into the store at ``root`` and return {date: parsed frame}"""
+    days = {date: make_day(index) for index, date in enumerate(DATES)}
+    for date, day in days.items():
+        floorsheet_store.ingest_day(day, date, root)
+    return days
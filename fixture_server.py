@@ -0,0 +1,195 @@
+"""
+Local stubs of the NEPSE floor sheet endpoints and the GitHub contents API for offline tests
+Serves recorded JSON page fixtures from fixtures/ on an ephemeral localhost port.
+"""
+
+import base64
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+API_PATH = '/api/nots/nepse-data/floorsheet'
+CONTENTS_PATH = '/repos/stub/nepse-data/contents/data'
+HTML_PATH = '/floor-sheet'
+HTML_FIXTURE = os.path.join(FIXTURES_DIR, 'floorsheet_html', 'floor-sheet.html')
+
+
+def load_api_fixtures(directory=os.path.join(FIXTURES_DIR, 'floorsheet_api')):
+    """Load recorded API pages (page_0.json, page_1.json, ...) in page order"""
+    files = glob.glob(os.path.join(directory, 'page_*.json'))
+    files.sort(key=lambda path: int(os.path.basename(path)[5:-5]))
+    pages = []
+    for path in files:
+        with open(path, encoding='utf-8') as f:
+            pages.append(json.load(f))
+    return pages
+
+
+class FixtureServer:
+    """Serve floor sheet API pages from memory on localhost
+
+    Use as a context manager; ``url`` is the API endpoint to point a fetcher at
+    and ``requests`` counts how many times each page was requested.
+    ``latency`` delays every response and ``failures`` maps a page index to the
+    number of times that page answers with a 500 before succeeding.
+    """
+
+    def __init__(self, pages=None, latency=0.0, failures=None):
+        self.pages = load_api_fixtures() if pages is None else pages
+        self.latency = latency
+        self.failures = dict(failures or {})
+        self.requests = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{API_PATH}"
+
+    def html_url(self, delay_ms=0, rows=None):
+        """URL of the static floor sheet page fixture, re-rendering ``delay_ms`` after each click"""
+        host, port = self._server.server_address[:2]
+        query = f"?delay={delay_ms}" + (f"&rows={rows}" if rows is not None else '')
+        return f"http://{host}:{port}{HTML_PATH}{query}"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fixture._handle(self)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                self.rfile.read(length)
+                fixture._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _handle(self, handler):
+        parsed = urlparse(handler.path)
+        if parsed.path == HTML_PATH:
+            with open(HTML_FIXTURE, 'rb') as f:
+                body = f.read()
+            handler.send_response(200)
+            handler.send_header('Content-Type', 'text/html; charset=utf-8')
+            handler.send_header('Content-Length', str(len(body)))
+            handler.end_headers()
+            handler.wfile.write(body)
+            return
+        if parsed.path != API_PATH:
+            self._send(handler, 404, {'error': 'not found'})
+            return
+        page_index = int(parse_qs(parsed.query).get('page', ['0'])[0])
+        with self._lock:
+            self.requests[page_index] = self.requests.get(page_index, 0) + 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            fail = self.failures.get(page_index, 0) > 0
+            if fail:
+                self.failures[page_index] -= 1
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            if fail:
+                self._send(handler, 500, {'error': 'injected failure'})
+            else:
+                self._send(handler, 200, self.page_payload(page_index))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def page_payload(self, page_index):
+        """Return the recorded page, or an empty last page past the end"""
+        if 0 <= page_index < len(self.pages):
+            return self.pages[page_index]
+        return {'floorsheets': {'content': [], 'number': page_index,
+                                'totalPages': len(self.pages), 'last': True}}
+
+    def _send(self, handler, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+
+class GitHubStub(FixtureServer):
+    """Serve a data directory through the GitHub contents API shape on localhost
+
+    ``files`` maps file names to CSV text; ``base_url`` is the contents URL to
+    point a GitHub data source at. ``requests`` counts calls per file name,
+    with the directory listing counted under ''. Setting ``listing_status``
+    answers the listing with that error status instead, as a rate limit would.
+    """
+
+    def __init__(self, files, latency=0.0):
+        super().__init__(pages=[], latency=latency)
+        self.files = dict(files)
+        self.listing_status = 200
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{CONTENTS_PATH}"
+
+    def _handle(self, handler):
+        path = urlparse(handler.path).path
+        if path != CONTENTS_PATH and not path.startswith(CONTENTS_PATH + '/'):
+            self._send(handler, 404, {'message': 'Not Found'})
+            return
+        name = path[len(CONTENTS_PATH) + 1:]
+        with self._lock:
+            self.requests[name] = self.requests.get(name, 0) + 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            if not name and self.listing_status != 200:
+                self._send(handler, self.listing_status, {'message': 'API rate limit exceeded'})
+            elif not name:
+                self._send(handler, 200, [self.entry(n) for n in sorted(self.files)])
+            elif name in self.files:
+                self._send(handler, 200, dict(self.entry(name), encoding='base64',
+                                              content=base64.b64encode(self.files[name].encode('utf-8')).decode()))
+            else:
+                self._send(handler, 404, {'message': 'Not Found'})
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def entry(self, name):
+        data = self.files[name].encode('utf-8')
+        return {'name': name, 'path': f"data/{name}", 'size': len(data), 'type': 'file',
+                'sha': hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()}
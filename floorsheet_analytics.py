@@ -0,0 +1,489 @@
+"""
+Floor sheet analytics
+Vectorized versions of the market-manipulation analyses in floorsheet_analysis.ipynb.
+Each one takes trades in the published layout (Stock Symbol, Buyer, Seller,
+Quantity, Rate (Rs), Amount (Rs) and a Date column) and returns the same
+result schema as its notebook counterpart, computed for every symbol in one
+grouped pass instead of a Python loop over symbols.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+
+# Window lengths accepted by select_timeframe; any other value keeps every row
+TIMEFRAMES = ['daily', '15days', 'weekly', 'monthly', 'quarterly', 'yearly']
+
+
+def trade_dates(df):
+    """The Date column as datetimes, converting only when it holds strings"""
+    dates = df['Date']
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates
+    if isinstance(dates.dtype, pd.CategoricalDtype):
+        # Convert each distinct date once, then spread by code
+        days = dates.cat.categories
+        if not pd.api.types.is_datetime64_any_dtype(days):
+            days = pd.to_datetime(days.astype(str))
+        return pd.Series(days.take(dates.cat.codes.to_numpy(), allow_fill=True, fill_value=pd.NaT),
+                         index=dates.index, name='Date')
+    return pd.to_datetime(dates)
+
+
+def select_timeframe(df, timeframe, periods_back=0):
+    """Rows of ``df`` inside the window ending at its latest date (the notebook's get_timeframe_data)"""
+    if df.empty or timeframe not in TIMEFRAMES:
+        return df
+    dates = trade_dates(df)
+    today = dates.max()
+    if timeframe == 'daily':
+        return _rows(df, (dates == today - timedelta(days=periods_back)).to_numpy())
+    if timeframe == '15days':
+        start, end = today - timedelta(days=15 + periods_back * 15), today - timedelta(days=periods_back * 15)
+    elif timeframe == 'weekly':
+        start, end = today - timedelta(weeks=1 + periods_back), today - timedelta(weeks=periods_back)
+    elif timeframe == 'monthly':
+        start, end = today - pd.DateOffset(months=1 + periods_back), today - pd.DateOffset(months=periods_back)
+    elif timeframe == 'quarterly':
+        start, end = today - pd.DateOffset(months=3 + periods_back * 3), today - pd.DateOffset(months=periods_back * 3)
+    else:
+        start, end = today - pd.DateOffset(years=1 + periods_back), today - pd.DateOffset(years=periods_back)
+    return _rows(df, ((dates >= start) & (dates <= end)).to_numpy())
+
+
+def _rows(df, mask):
+    return df if mask.all() else df[mask]
+
+
+def _window(df, stock_symbol, timeframe):
+    data = df[(df['Stock Symbol'] == stock_symbol).to_numpy()] if stock_symbol else df
+    return select_timeframe(data, timeframe)
+
+
+def _weights(quantity):
+    """(quantity as float weights with missing values as 0, 1.0 where a quantity is present)"""
+    values = quantity.to_numpy(dtype=np.float64, na_value=np.nan)
+    present = ~np.isnan(values)
+    return np.where(present, values, 0.0), present.astype(np.float64)
+
+
+def _cast_sums(sums, dtype):
+    # Share counts and paisa summed as float64 are exact well past any floor sheet's totals
+    return sums.astype(dtype) if pd.api.types.is_integer_dtype(dtype) else sums
+
+
+def _side_volume(symbol_codes, symbol_count, brokers, weights, present, dtype):
+    """(symbol codes, brokers, volumes, trades) per symbol and broker on one side, brokers ascending within a symbol"""
+    broker_codes, broker_values = pd.factorize(brokers, sort=True)
+    width = max(len(broker_values), 1)
+    key = symbol_codes.astype(np.int64) * width + broker_codes
+    keep = (symbol_codes >= 0) & (broker_codes >= 0)
+    if not keep.all():
+        key, weights, present = key[keep], weights[keep], present[keep]
+    size = symbol_count * width
+    keys = np.flatnonzero(np.bincount(key, minlength=size))
+    volume = np.bincount(key, weights=weights, minlength=size)[keys]
+    trades = np.bincount(key, weights=present, minlength=size)[keys].astype(np.int64)
+    return keys // width, broker_values.take(keys % width), _cast_sums(volume, dtype), trades
+
+
+def broker_dominance(df, stock_symbol=None, timeframe='daily', threshold=60):
+    """Buyer and seller share of each symbol's volume per broker, as (results, summary)
+
+    Matches the notebook's analyze_broker_dominance: one row per symbol, side
+    and broker with Broker, Volume, Trades, Percentage, Side, Stock, Suspicious
+    and Total_Stock_Volume, sorted by Percentage descending, plus the same
+    summary dict. Both sides of every symbol come from one grouped pass.
+    """
+    if df.empty:
+        return pd.DataFrame(), {}
+    columns = ['Stock Symbol', 'Buyer', 'Seller', 'Quantity', 'Date']
+    data = _window(df[[c for c in columns if c in df.columns]], stock_symbol, timeframe)
+    if data.empty:
+        return pd.DataFrame(), {}
+
+    # Symbols are numbered in order of appearance, which is the notebook's output order
+    symbol_codes, symbols = pd.factorize(data['Stock Symbol'])
+    dtype = data['Quantity'].dtype
+    weights, present = _weights(data['Quantity'])
+    listed = symbol_codes >= 0
+    totals = _cast_sums(np.bincount(symbol_codes[listed], weights=weights[listed], minlength=len(symbols)), dtype)
+
+    sides = []
+    for side in ('Buyer', 'Seller'):
+        codes, brokers, volume, trades = _side_volume(symbol_codes, len(symbols), data[side].to_numpy(),
+                                                      weights, present, dtype)
+        sides.append((codes, pd.DataFrame({
+            'Broker': brokers,
+            'Volume': volume,
+            'Trades': trades,
+            'Percentage': (volume / totals[codes]) * 100,
+            'Side': side,
+            'Stock': symbols.take(codes),
+            'Total_Stock_Volume': totals[codes],
+        })))
+    results = pd.concat([frame for _, frame in sides], ignore_index=True)
+    if results.empty:
+        return pd.DataFrame(), {}
+    results['Suspicious'] = results['Percentage'] >= threshold
+    results = results[['Broker', 'Volume', 'Trades', 'Percentage', 'Side', 'Stock', 'Suspicious', 'Total_Stock_Volume']]
+
+    summary = {
+        'total_records': len(results),
+        'suspicious_brokers': int(results['Suspicious'].sum()),
+        'max_dominance': results['Percentage'].max(),
+        'avg_dominance': results['Percentage'].mean(),
+        'stocks_analyzed': results['Stock'].nunique(),
+    }
+    # Percentage descending; ties keep the notebook's symbol, side, broker order
+    symbol_order = np.concatenate([codes for codes, _ in sides])
+    side_order = np.repeat([0, 1], [len(frame) for _, frame in sides])
+    order = np.lexsort((np.arange(len(results)), side_order, symbol_order, -results['Percentage'].to_numpy()))
+    return results.iloc[order].reset_index(drop=True), summary
+
+
+def _broker_codes(buyers, sellers):
+    """Buyer and seller codes in one space numbered in order of the broker ids as text, and those ids"""
+    buyer_codes, buyer_ids = pd.factorize(buyers)
+    seller_codes, seller_ids = pd.factorize(sellers)
+    buyer_ids = np.asarray(pd.Index(buyer_ids).astype(str), dtype=object)
+    seller_ids = np.asarray(pd.Index(seller_ids).astype(str), dtype=object)
+    ids = np.unique(np.concatenate([buyer_ids, seller_ids]))
+    # Missing brokers keep code -1
+    buyer_map = np.append(np.searchsorted(ids, buyer_ids), -1)
+    seller_map = np.append(np.searchsorted(ids, seller_ids), -1)
+    return buyer_map[buyer_codes], seller_map[seller_codes], ids
+
+
+def _pair_codes(symbol_codes, buyers, sellers, broker_count, ordered):
+    """(row code, keep mask, sorted pair keys) for each row's symbol and broker pair
+
+    A key is (symbol * brokers + first) * brokers + second, where an unordered
+    pair puts the smaller code first and an ordered one puts the buyer first.
+    """
+    first, second = (buyers, sellers) if ordered else (np.minimum(buyers, sellers), np.maximum(buyers, sellers))
+    keep = (symbol_codes >= 0) & (buyers >= 0) & (sellers >= 0)
+    key = (symbol_codes.astype(np.int64) * broker_count + first) * broker_count + second
+    if not keep.all():
+        key = key[keep]
+    codes, keys = pd.factorize(key)
+    # Renumber codes in key order so pairs come out sorted by symbol, then pair
+    order = np.argsort(keys)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return rank[codes], keep, keys[order]
+
+
+def _pair_labels(keys, ids, broker_count):
+    """(symbol codes, 'first-second' labels) of pair keys"""
+    first, second = (keys // broker_count) % broker_count, keys % broker_count
+    return keys // (broker_count * broker_count), ids[first] + '-' + ids[second]
+
+
+def _pair_sums(codes, keep, values, size):
+    """(sums, non-missing counts) of ``values`` per pair code"""
+    weights, present = _weights(values)
+    if not keep.all():
+        weights, present = weights[keep], present[keep]
+    return (np.bincount(codes, weights=weights, minlength=size),
+            np.bincount(codes, weights=present, minlength=size).astype(np.int64))
+
+
+def wash_trading(df, stock_symbol=None, timeframe='daily', ordered=False, min_trades=5, volume_quantile=0.9):
+    """Same-broker crosses and recurring broker pairs, as (same_broker_trades, suspicious_pairs, summary)
+
+    Matches the notebook's detect_wash_trading: same_broker_trades are the
+    window's rows where buyer and seller are the same broker; pairs with at
+    least ``min_trades`` trades or a total volume at the window's
+    ``volume_quantile`` trade size are suspicious, with Stock, Broker_Pair,
+    Total_Volume, Trade_Count, Total_Amount and Avg_Rate, most trades first.
+    Pairs are unordered ('12-58' covers both directions) unless ``ordered``,
+    when Broker_Pair is 'buyer-seller'. ``timeframe`` may span many days.
+    """
+    if df.empty:
+        return pd.DataFrame(), pd.DataFrame(), {}
+    data = _window(df, stock_symbol, timeframe)
+    if data.empty:
+        return pd.DataFrame(), pd.DataFrame(), {}
+
+    symbol_codes, symbols = pd.factorize(data['Stock Symbol'], sort=True)
+    buyers, sellers, ids = _broker_codes(data['Buyer'], data['Seller'])
+    broker_count = max(len(ids), 1)
+    codes, keep, keys = _pair_codes(symbol_codes, buyers, sellers, broker_count, ordered)
+    volume, trades = _pair_sums(codes, keep, data['Quantity'], len(keys))
+    amount, _ = _pair_sums(codes, keep, data['Amount (Rs)'], len(keys))
+    rate, rates = _pair_sums(codes, keep, data['Rate (Rs)'], len(keys))
+    symbol_codes, labels = _pair_labels(keys, ids, broker_count)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        average_rate = np.where(rates > 0, rate / rates, np.nan)
+    # Broker ids are digits, so key order is the order of the 'first-second' labels
+    pair_counts = pd.DataFrame({
+        'Stock': symbols.take(symbol_codes),
+        'Broker_Pair': pd.array(labels, dtype=pd.StringDtype(na_value=np.nan)),
+        'Total_Volume': _cast_sums(volume, data['Quantity'].dtype),
+        'Trade_Count': trades,
+        'Total_Amount': _cast_sums(amount, data['Amount (Rs)'].dtype),
+        'Avg_Rate': average_rate,
+    })
+    suspicious = (pair_counts['Trade_Count'] >= min_trades) | \
+        (pair_counts['Total_Volume'] >= data['Quantity'].quantile(volume_quantile))
+    suspicious_pairs = pair_counts[suspicious].sort_values('Trade_Count', ascending=False, kind='stable')
+    same_broker_trades = data[(buyers == sellers) & (buyers >= 0)]
+
+    summary = {
+        'same_broker_trades': len(same_broker_trades),
+        'suspicious_pairs': len(suspicious_pairs),
+        'total_broker_pairs': len(pair_counts),
+        'max_pair_trades': pair_counts['Trade_Count'].max() if not pair_counts.empty else 0,
+    }
+    return same_broker_trades, suspicious_pairs, summary
+
+
+def recurring_pairs(df, window=5, min_days=3, stock_symbol=None, timeframe=None, ordered=False):
+    """Broker pairs trading a symbol on at least ``min_days`` of some ``window`` consecutive trading days
+
+    Trading days are the distinct dates in ``df`` across every symbol, so
+    filtering by ``stock_symbol`` still counts the days that symbol did not
+    trade. Returns one row per such pair with Stock, Broker_Pair, Active_Days
+    (over the whole timeframe), First_Date, Last_Date, Trade_Count and
+    Total_Volume, most active first.
+    """
+    columns = ['Stock', 'Broker_Pair', 'Active_Days', 'First_Date', 'Last_Date', 'Trade_Count', 'Total_Volume']
+    data = _window(df, stock_symbol, timeframe) if not df.empty else df
+    if data.empty:
+        return pd.DataFrame(columns=columns)
+
+    symbol_codes, symbols = pd.factorize(data['Stock Symbol'], sort=True)
+    buyers, sellers, ids = _broker_codes(data['Buyer'], data['Seller'])
+    broker_count = max(len(ids), 1)
+    codes, keep, keys = _pair_codes(symbol_codes, buyers, sellers, broker_count, ordered)
+    day_codes, days = pd.factorize(trade_dates(data), sort=True)
+    if stock_symbol:
+        # Market days the symbol sat out still count toward the window
+        days = pd.DatetimeIndex(trade_dates(df).unique()).sort_values()
+        day_codes = days.get_indexer(trade_dates(data))
+    if not keep.all():
+        day_codes = day_codes[keep]
+
+    # Each (pair, day) once, sorted by pair then day
+    active = np.sort(pd.unique(codes.astype(np.int64) * len(days) + day_codes))
+    pair, day = active // len(days), active % len(days)
+    span = min_days - 1
+    if span > 0:
+        hit = (pair[span:] == pair[:-span]) & (day[span:] - day[:-span] < window)
+        flagged = pair[:-span][hit]
+    else:
+        flagged = pair
+    flagged = flagged[np.r_[True, flagged[1:] != flagged[:-1]]] if len(flagged) else flagged
+
+    starts = np.searchsorted(pair, flagged)
+    ends = np.searchsorted(pair, flagged, side='right')
+    volume, trades = _pair_sums(codes, keep, data['Quantity'], len(keys))
+    symbol_codes, labels = _pair_labels(keys[flagged], ids, broker_count)
+    result = pd.DataFrame({
+        'Stock': symbols.take(symbol_codes),
+        'Broker_Pair': pd.array(labels, dtype=pd.StringDtype(na_value=np.nan)),
+        'Active_Days': ends - starts,
+        'First_Date': days.take(day[starts]),
+        'Last_Date': days.take(day[ends - 1]),
+        'Trade_Count': trades[flagged],
+        'Total_Volume': _cast_sums(volume[flagged], data['Quantity'].dtype),
+    }, columns=columns)
+    return result.sort_values(['Active_Days', 'Trade_Count'], ascending=False, kind='stable').reset_index(drop=True)
+
+
+SURGE_COLUMNS = ['Broker', 'Volume', 'Side', 'Date', 'Stock', 'Volume_Ratio', 'Total_Day_Volume',
+                 'Broker_Percentage', 'New_Broker']
+
+
+class VolumeSurgeEngine:
+    """Rolling volume surge detector fed one trading day at a time
+
+    Keeps, per symbol, its last ``window`` daily volumes in a ring buffer and,
+    per symbol and broker on each side, the day the broker last traded it.
+    ``update`` folds in one new day and returns that day's surge events (the
+    rows of the notebook's analyze_volume_surge) from the day's trades alone,
+    so the cost of a day does not grow with history. A surge is a day whose
+    volume is at least ``surge_threshold`` times the mean of the symbol's last
+    ``window`` trading days including itself; a broker is new if it did not
+    trade the symbol on the same side in the previous ``lookback_days``
+    calendar days. ``save`` and ``load`` carry that state across processes.
+    """
+
+    def __init__(self, surge_threshold=2.0, window=10, lookback_days=10):
+        self.surge_threshold = surge_threshold
+        self.window = window
+        self.lookback_days = lookback_days
+        self.symbols = []
+        self.brokers = []
+        self._symbol_codes = {}
+        self._broker_codes = {}
+        self._volumes = np.zeros((0, window))  # ring buffer of each symbol's recent daily volumes
+        self._days_traded = np.zeros(0, dtype=np.int64)
+        self._last_seen = np.zeros((2, 0, 0), dtype=np.int32)  # (side, symbol, broker) -> day number
+        self.last_date = None
+
+    def save(self, path):
+        """Write the settings, code maps and rolling state to ``path`` as an .npz file"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, surge_threshold=self.surge_threshold, window=self.window, lookback_days=self.lookback_days,
+                     symbols=np.array(self.symbols, dtype=str), brokers=np.asarray(self.brokers),
+                     volumes=self._volumes, days_traded=self._days_traded, last_seen=self._last_seen,
+                     last_date=np.datetime64(self.last_date if self.last_date is not None else 'NaT', 'ns'))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """An engine restored from a ``save`` file, ready for the day after its last one"""
+        with np.load(path, allow_pickle=False) as state:
+            engine = cls(float(state['surge_threshold']), int(state['window']), int(state['lookback_days']))
+            engine.symbols = state['symbols'].tolist()
+            engine.brokers = state['brokers'].tolist()
+            engine._volumes = state['volumes']
+            engine._days_traded = state['days_traded']
+            engine._last_seen = state['last_seen']
+            last_date = state['last_date'][()]
+        engine._symbol_codes = {symbol: code for code, symbol in enumerate(engine.symbols)}
+        engine._broker_codes = {broker: code for code, broker in enumerate(engine.brokers)}
+        engine.last_date = None if np.isnat(last_date) else pd.Timestamp(last_date)
+        return engine
+
+    def _codes(self, values, known, names):
+        """Engine codes of a column's values, registering values seen for the first time"""
+        codes, uniques = pd.factorize(values)
+        for value in uniques.tolist():
+            if value not in known:
+                known[value] = len(names)
+                names.append(value)
+        return np.append([known[value] for value in uniques.tolist()], -1).astype(np.int64)[codes]
+
+    def _grow(self):
+        symbols, brokers = len(self.symbols), len(self.brokers)
+        missing = symbols - len(self._days_traded)
+        if missing:
+            self._volumes = np.vstack([self._volumes, np.zeros((missing, self.window))])
+            self._days_traded = np.append(self._days_traded, np.zeros(missing, dtype=np.int64))
+        _, known_symbols, known_brokers = self._last_seen.shape
+        if (known_symbols, known_brokers) != (symbols, brokers):
+            never = np.iinfo(np.int32).min
+            self._last_seen = np.pad(self._last_seen, ((0, 0), (0, symbols - known_symbols),
+                                                       (0, brokers - known_brokers)), constant_values=never)
+
+    def update(self, day, date):
+        """Fold in one day's trades (published layout) and return its surge events"""
+        date = pd.Timestamp(date)
+        if self.last_date is not None and date <= self.last_date:
+            raise ValueError(f"Days must be added in order: {date.date()} is not after {self.last_date.date()}")
+        self.last_date = date
+        if day.empty:
+            return pd.DataFrame(columns=SURGE_COLUMNS)
+        day_number = int((date - pd.Timestamp(0)).days)
+
+        symbol_codes = self._codes(day['Stock Symbol'], self._symbol_codes, self.symbols)
+        sides = [self._codes(day[side], self._broker_codes, self.brokers) for side in ('Buyer', 'Seller')]
+        self._grow()
+        dtype = day['Quantity'].dtype
+        weights, _ = _weights(day['Quantity'])
+
+        # Today's volume joins each traded symbol's ring buffer; the ratio is against the buffer's mean
+        listed = symbol_codes >= 0
+        traded = np.flatnonzero(np.bincount(symbol_codes[listed], minlength=len(self.symbols)))
+        volume = np.bincount(symbol_codes[listed], weights=weights[listed], minlength=len(self.symbols))[traded]
+        self._volumes[traded, self._days_traded[traded] % self.window] = volume
+        self._days_traded[traded] += 1
+        average = self._volumes[traded].sum(axis=1) / np.minimum(self._days_traded[traded], self.window)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ratio = volume / average
+        surging = ratio >= self.surge_threshold
+
+        events = []
+        if surging.any():
+            surge_ratio = np.zeros(len(self.symbols))
+            surge_ratio[traded[surging]] = ratio[surging]
+            day_volume = np.zeros(len(self.symbols))
+            day_volume[traded[surging]] = volume[surging]
+            rows = listed & (surge_ratio[np.where(listed, symbol_codes, 0)] > 0)
+            rank = np.argsort(np.argsort(np.asarray(self.brokers)))
+            for side_index, (side, brokers) in enumerate(zip(('Buyer', 'Seller'), sides)):
+                events.append(self._side_events(side, side_index, symbol_codes, brokers, rows, weights, dtype,
+                                                 surge_ratio, day_volume, rank, date, day_number))
+
+        # Only now record today's brokers, so "new" compares against earlier days
+        for side_index, brokers in enumerate(sides):
+            seen = listed & (brokers >= 0)
+            self._last_seen[side_index, symbol_codes[seen], brokers[seen]] = day_number
+        if not events:
+            return pd.DataFrame(columns=SURGE_COLUMNS)
+        events = pd.concat(events, ignore_index=True)
+        # Buyers then sellers for each surging symbol, as the notebook lists them
+        order = np.lexsort((events['_rank'].to_numpy(), events['_side'].to_numpy(), events['_symbol'].to_numpy()))
+        return events.iloc[order][SURGE_COLUMNS].reset_index(drop=True)
+
+    def _side_events(self, side, side_index, symbol_codes, brokers, rows, weights, dtype,
+                     surge_ratio, day_volume, rank, date, day_number):
+        width = max(len(self.brokers), 1)
+        rows = rows & (brokers >= 0)
+        key = symbol_codes[rows] * width + brokers[rows]
+        keys = pd.unique(key)
+        codes = pd.Index(keys).get_indexer(key)
+        volume = np.bincount(codes, weights=weights[rows], minlength=len(keys))
+        symbols, broker_codes = keys // width, keys % width
+        last_seen = self._last_seen[side_index, symbols, broker_codes]
+        return pd.DataFrame({
+            'Broker': np.asarray(self.brokers)[broker_codes],
+            'Volume': _cast_sums(volume, dtype),
+            'Side': side,
+            'Date': date,
+            'Stock': np.asarray(self.symbols, dtype=object)[symbols],
+            'Volume_Ratio': surge_ratio[symbols],
+            'Total_Day_Volume': _cast_sums(day_volume[symbols], dtype),
+            'Broker_Percentage': (volume / day_volume[symbols]) * 100,
+            'New_Broker': last_seen < day_number - self.lookback_days,
+            '_symbol': symbols,
+            '_side': side_index,
+            '_rank': rank[broker_codes],
+        })
+
+
+def trading_days(df):
+    """(date, rows of that date) for each date in ``df``, oldest first, from one sort of the dates"""
+    dates = trade_dates(df)
+    codes, days = pd.factorize(dates, sort=True)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(1, len(days)))
+    for date, positions in zip(days, np.split(order, bounds)):
+        yield date, df.iloc[positions]
+
+
+def volume_surge(df, stock_symbol=None, surge_threshold=2.0, window=10, lookback_days=10):
+    """Volume surges and the brokers behind them, as (results, summary)
+
+    Matches the notebook's analyze_volume_surge by feeding every day through a
+    VolumeSurgeEngine; to follow new days as they land, keep an engine and
+    call its ``update`` instead of recomputing.
+    """
+    if df.empty:
+        return pd.DataFrame(), {}
+    data = df[(df['Stock Symbol'] == stock_symbol).to_numpy()] if stock_symbol else df
+    if data.empty:
+        return pd.DataFrame(), {}
+    engine = VolumeSurgeEngine(surge_threshold, window, lookback_days)
+    events = [engine.update(day, date) for date, day in trading_days(data)]
+    events = [frame for frame in events if not frame.empty]
+    if not events:
+        return pd.DataFrame(), {}
+    results = pd.concat(events, ignore_index=True)
+    # The notebook lists symbols in order of first appearance, each one's surge days oldest first
+    appearance = pd.Index(pd.unique(data['Stock Symbol']))
+    results = results.iloc[np.argsort(appearance.get_indexer(results['Stock']), kind='stable')].reset_index(drop=True)
+    summary = {
+        'surge_days': len(results['Date'].unique()),
+        'avg_surge_ratio': results['Volume_Ratio'].mean(),
+        'max_surge_ratio': results['Volume_Ratio'].max(),
+        'new_brokers_count': int(results['New_Broker'].sum()),
+        'stocks_with_surges': results['Stock'].nunique(),
+    }
+    return results, summary
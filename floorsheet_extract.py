@@ -0,0 +1,107 @@
+"""
+Floor sheet table extractors
+Turn the rendered floor sheet page into rows of cell text, one tuple per <tr>.
+"""
+
+import html
+import io
+import re
+
+from bs4 import BeautifulSoup
+from lxml import etree
+
+# Runs in the browser and returns only the first table's cells, so the whole DOM
+# never has to be serialized through page_source and re-parsed in Python
+TABLE_CELLS_JS = """
+const table = document.querySelector('table');
+if (!table) { return null; }
+const rows = [];
+for (const tr of table.rows) {
+    const cells = [];
+    for (const cell of tr.cells) { cells.push(cell.textContent.trim()); }
+    if (cells.length) { rows.push(cells); }
+}
+return rows;
+"""
+
+_TABLE_RE = re.compile(r'<table\b.*?</table\s*>', re.IGNORECASE | re.DOTALL)
+_ROW_RE = re.compile(r'<tr\b[^>]*>(.*?)(?=<tr\b|</tbody|</thead|</tfoot|</table)', re.IGNORECASE | re.DOTALL)
+_CELL_RE = re.compile(r'<t[dh]\b[^>]*>(.*?)(?=<t[dh]\b|</tr|$)', re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r'<[^>]+>')
+
+
+def _cell_text(fragments):
+    # Same normalization as BeautifulSoup's get_text(strip=True)
+    return ''.join(part.strip() for part in fragments)
+
+
+def extract_rows_bs4(page_html):
+    """Reference extractor: BeautifulSoup with the pure-Python html.parser"""
+    soup = BeautifulSoup(page_html, 'html.parser')
+    table = soup.find("table")
+    if not table:
+        return []
+    rows = []
+    for row in table.find_all("tr"):
+        cells = row.find_all(["th", "td"])
+        row_data = tuple(cell.get_text(strip=True) for cell in cells)
+        if row_data:
+            rows.append(row_data)
+    return rows
+
+
+def extract_rows_lxml(page_html):
+    """Stream the page through lxml's C parser and stop at the end of the first table"""
+    if isinstance(page_html, str):
+        page_html = page_html.encode('utf-8')
+    rows = []
+    in_table = False
+    context = etree.iterparse(io.BytesIO(page_html), events=('start', 'end'),
+                              tag=('table', 'tr'), html=True, recover=True)
+    for event, element in context:
+        if element.tag == 'table':
+            if event == 'start':
+                in_table = True
+                continue
+            break
+        if event == 'end' and in_table:
+            cells = tuple(_cell_text(cell.itertext()) for cell in element
+                          if cell.tag in ('td', 'th'))
+            if cells:
+                rows.append(cells)
+            element.clear()
+    return rows
+
+
+def extract_rows_regex(page_html):
+    """Regex scan of the first table; fastest, but assumes plain, well-formed markup"""
+    match = _TABLE_RE.search(page_html)
+    if not match:
+        return []
+    rows = []
+    for row_html in _ROW_RE.findall(match.group(0)):
+        cells = tuple(html.unescape(_cell_text(_TAG_RE.split(cell)))
+                      for cell in _CELL_RE.findall(row_html.split('</tr', 1)[0]))
+        if cells:
+            rows.append(cells)
+    return rows
+
+
+def extract_rows_js(driver):
+    """Ask the browser for the table cells directly; returns None if the script fails"""
+    try:
+        rows = driver.execute_script(TABLE_CELLS_JS)
+    except Exception as e:
+        print(f"In-browser table extraction failed: {str(e)}")
+        return None
+    if rows is None:
+        return None
+    return [tuple(row) for row in rows]
+
+
+# Extractors that work on an HTML string (the 'js' extractor needs a live driver)
+HTML_EXTRACTORS = {
+    'bs4': extract_rows_bs4,
+    'lxml': extract_rows_lxml,
+    'regex': extract_rows_regex,
+}
@@ -0,0 +1,217 @@
+"""
+Direct HTTP/JSON backend for the NEPSE floor sheet
+Talks to the paginated JSON endpoint behind https://www.nepalstock.com/floor-sheet
+instead of driving a browser, so a full day is a few hundred pooled requests.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from floorsheet_schema import FLOORSHEET_COLUMNS
+
+NEPSE_API_URL = os.environ.get(
+    'NEPSE_API_URL', "https://www.nepalstock.com/api/nots/nepse-data/floorsheet"
+)
+NEPSE_API_TOKEN = os.environ.get('NEPSE_API_TOKEN')  # Salter token from the site's auth handshake
+NEPSE_API_PAGE_SIZE = int(os.environ.get('NEPSE_API_PAGE_SIZE', 500))
+FLOORSHEET_WORKERS = int(os.environ.get('FLOORSHEET_WORKERS', 8))
+FLOORSHEET_RATE_LIMIT = float(os.environ.get('FLOORSHEET_RATE_LIMIT', 20))  # requests per second, 0 = unlimited
+
+# JSON field for each floor sheet column (SN is derived from the page position)
+CONTRACT_FIELDS = {
+    'Contract No.': 'contractId',
+    'Stock Symbol': 'stockSymbol',
+    'Buyer': 'buyerMemberId',
+    'Seller': 'sellerMemberId',
+    'Quantity': 'contractQuantity',
+    'Rate (Rs)': 'contractRate',
+    'Amount (Rs)': 'contractAmount',
+}
+
+
+def make_session(pool_size=10, retries=3):
+    """Create a pooled requests session with retry/backoff on transient errors"""
+    session = requests.Session()
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=None,  # the floor sheet endpoint is read-only even when POSTed
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({
+        'Accept': 'application/json',
+        'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36',
+    })
+    if NEPSE_API_TOKEN:
+        session.headers['Authorization'] = f'Salter {NEPSE_API_TOKEN}'
+    return session
+
+
+def parse_floorsheet_page(payload):
+    """Return (contracts, total_pages) from a floor sheet API response"""
+    page = payload.get('floorsheets', payload)
+    contracts = page.get('content') or []
+    total_pages = page.get('totalPages')
+    return contracts, total_pages
+
+
+def contract_to_row(contract, sn):
+    """One contract JSON object as the cell strings the HTML table shows, in FLOORSHEET_COLUMNS order"""
+    values = [contract.get(CONTRACT_FIELDS[column]) for column in FLOORSHEET_COLUMNS[1:]]
+    return [str(sn)] + ['' if value is None else str(value) for value in values]
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing calls at most ``rate`` per second (0 disables it)"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class HttpFetcher:
+    """Fetch floor sheet pages from the JSON endpoint using a pooled session
+
+    With ``workers`` > 1 page indices are requested in parallel through a
+    bounded thread pool and handed back strictly in page order.
+    """
+
+    name = 'http'
+
+    def __init__(self, base_url=None, page_size=NEPSE_API_PAGE_SIZE, timeout=30, session=None, payload=None,
+                 workers=1, rate_limit=0, page_retries=3):
+        self.base_url = base_url or NEPSE_API_URL
+        self.page_size = page_size
+        self.timeout = timeout
+        self.payload = payload
+        self.session = session
+        self.workers = max(1, workers)
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.page_retries = page_retries
+        self.total_pages = None
+        self._owns_session = session is None
+
+    def open(self):
+        if self.session is None:
+            self.session = make_session(pool_size=max(10, self.workers))
+
+    def close(self):
+        if self.session is not None and self._owns_session:
+            self.session.close()
+            self.session = None
+
+    def fetch_page(self, page_index):
+        """Fetch one page (0-based) and return (rows, total_pages)"""
+        if self.session is None:
+            self.open()
+        self.rate_limiter.acquire()
+        params = {'page': page_index, 'size': self.page_size, 'sort': 'contractId,desc'}
+        if self.payload is not None:
+            response = self.session.post(self.base_url, params=params, json=self.payload, timeout=self.timeout)
+        else:
+            response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+
+        contracts, total_pages = parse_floorsheet_page(response.json())
+        first_sn = page_index * self.page_size + 1
+        rows = [contract_to_row(contract, first_sn + i) for i, contract in enumerate(contracts)]
+        return rows, total_pages
+
+    def fetch_page_with_retry(self, page_index):
+        """Fetch one page, retrying just that page on failure"""
+        for attempt in range(self.page_retries + 1):
+            try:
+                return self.fetch_page(page_index)
+            except (requests.RequestException, ValueError) as e:
+                if attempt == self.page_retries:
+                    raise
+                print(f"Page {page_index + 1} failed ({str(e)}), retrying...")
+                time.sleep(min(0.5 * 2 ** attempt, 8))
+
+    def iter_pages(self, start_page=0):
+        """Yield the rows of every page in order from ``start_page`` until the last page"""
+        if self.workers > 1:
+            return self._iter_pages_concurrent(start_page)
+        return self._iter_pages_serial(start_page)
+
+    def _iter_pages_serial(self, start_page=0):
+        page_index = start_page
+        while True:
+            rows, total_pages = self.fetch_page_with_retry(page_index)
+            if total_pages is not None:
+                self.total_pages = total_pages
+            print(f"Fetched page {page_index + 1}"
+                  f"{f'/{self.total_pages}' if self.total_pages else ''} ({len(rows)} rows)")
+            if not rows:
+                break
+            yield rows
+            page_index += 1
+            if self.total_pages is not None and page_index >= self.total_pages:
+                break
+            if self.total_pages is None and len(rows) < self.page_size:
+                break
+
+    def _iter_pages_concurrent(self, start_page=0):
+        # The first page tells us how many pages there are, so the rest can be
+        # requested up front instead of probing "next" one page at a time
+        rows, total_pages = self.fetch_page_with_retry(start_page)
+        self.total_pages = total_pages
+        print(f"Fetched page {start_page + 1}{f'/{total_pages}' if total_pages else ''} ({len(rows)} rows)")
+        if not rows:
+            return
+        yield rows
+        if total_pages is not None and total_pages <= start_page + 1:
+            return
+        if total_pages is None and len(rows) < self.page_size:
+            return
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = {}
+            next_page = start_page + 1     # next page index to submit
+            next_yield = start_page + 1    # next page index to hand back
+            exhausted = False
+            try:
+                while True:
+                    # Keep at most 2x workers pages in flight or buffered
+                    while (not exhausted and len(pending) < self.workers * 2
+                           and (total_pages is None or next_page < total_pages)):
+                        pending[next_page] = pool.submit(self.fetch_page_with_retry, next_page)
+                        next_page += 1
+                    if next_yield not in pending:
+                        break
+
+                    rows, _ = pending.pop(next_yield).result()
+                    label = f'/{total_pages}' if total_pages else ''
+                    print(f"Fetched page {next_yield + 1}{label} ({len(rows)} rows)")
+                    next_yield += 1
+                    if rows:
+                        yield rows
+                    if total_pages is None and len(rows) < self.page_size:
+                        # Unknown page count: a short page marks the end, drop speculative requests
+                        exhausted = True
+                        for future in pending.values():
+                            future.cancel()
+                        pending.clear()
+            finally:
+                for future in pending.values():
+                    future.cancel()
@@ -0,0 +1,159 @@
+"""
+Floor sheet loader
+Loads the daily nepal_stock_floorsheet_<date>.csv files for analysis with
+compact dtypes: symbols as categoricals, broker ids as int32 and the trade date,
+taken from each file name, as an ordered categorical of dates. Only the
+requested columns are parsed, files outside the date range are never opened,
+and symbol filters run on each file before anything is concatenated, so peak
+memory follows the result rather than the whole history. Replaces the
+notebook's load_floorsheet_data and preprocess_data.
+"""
+
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from floorsheet_store import DATA_DIR, date_from_filename
+
+# Published columns and the dtypes they load as; Date is always added
+DTYPES = {
+    'SN': 'int32',
+    'Contract No.': 'int64',
+    'Stock Symbol': 'category',
+    'Buyer': 'int32',
+    'Seller': 'int32',
+    'Quantity': 'int64',
+    'Rate (Rs)': 'float64',
+    'Amount (Rs)': 'float64',
+}
+# What the analyses in floorsheet_analytics read
+ANALYSIS_COLUMNS = ['Stock Symbol', 'Buyer', 'Seller', 'Quantity', 'Rate (Rs)', 'Amount (Rs)']
+# Rows missing any of these are dropped, as in the notebook
+KEY_COLUMNS = ['Stock Symbol', 'Buyer', 'Seller']
+CALENDAR_COLUMNS = ['Year', 'Quarter', 'Month', 'Week', 'DayOfYear', 'YearQuarter', 'YearMonth', 'YearWeek']
+
+
+def list_files(data_path=None, start=None, end=None):
+    """[(date, path)] of the daily CSV files in ``data_path`` within an inclusive date range, oldest first"""
+    files = []
+    for path in glob.glob(os.path.join(data_path or DATA_DIR, 'nepal_stock_floorsheet_*.csv')):
+        date = date_from_filename(path)
+        if date and (not start or date >= str(start)) and (not end or date <= str(end)):
+            files.append((date, path))
+    return sorted(files)
+
+
+def _empty(columns):
+    dtypes = dict(DTYPES, **{'Stock Symbol': pd.CategoricalDtype(pd.Index([], dtype=str))})
+    return pd.DataFrame({column: pd.Series(dtype=dtypes[column]) for column in columns})
+
+
+def read_file(path, columns=None, symbols=None):
+    """One daily CSV as the requested columns in their compact dtypes, keeping only ``symbols``
+
+    Numbers that do not parse become NaN (their column then stays float) and
+    rows missing a symbol or broker are dropped, as the notebook's
+    preprocess_data does.
+    """
+    columns = list(columns or ANALYSIS_COLUMNS)
+    wanted = set(columns) | set(KEY_COLUMNS)
+    try:
+        frame = pd.read_csv(path, usecols=lambda name: name.strip() in wanted,
+                            dtype={'Stock Symbol': 'category'}, thousands=',')
+    except pd.errors.EmptyDataError:
+        return _empty(columns)
+    frame.columns = frame.columns.str.strip()
+    if symbols is not None:
+        frame = frame[frame['Stock Symbol'].isin(symbols).to_numpy()]
+    for column in frame.columns.drop('Stock Symbol'):
+        if not pd.api.types.is_numeric_dtype(frame[column]):
+            frame[column] = pd.to_numeric(frame[column], errors='coerce')
+    frame = frame.dropna(subset=KEY_COLUMNS)
+    dtypes = {column: DTYPES[column] for column in columns if column in frame.columns}
+    # An integer column with unparseable cells keeps its NaNs as float64
+    dtypes = {column: dtype for column, dtype in dtypes.items()
+              if dtype == 'category' or dtype.startswith('float') or frame[column].notna().all()}
+    frame = frame.astype(dtypes)
+    frame['Stock Symbol'] = frame['Stock Symbol'].cat.remove_unused_categories()
+    return frame[columns].reset_index(drop=True)
+
+
+def _read(job):
+    return read_file(*job)
+
+
+def load_trades(data_path=None, columns=None, start=None, end=None, symbols=None, workers=None):
+    """Daily floor sheet CSVs as one compact frame with a Date column
+
+    ``columns`` picks published columns (default: the ones the analytics
+    read), ``start``/``end`` bound the dates (YYYY-MM-DD, inclusive) and
+    ``symbols`` keeps only those symbols. ``workers`` > 1 parses files in a
+    process pool of that size. Returns an empty frame when no file matches.
+    """
+    columns = [column for column in (columns or ANALYSIS_COLUMNS) if column != 'Date']
+    for column in columns:
+        if column not in DTYPES:
+            raise ValueError(f"Unknown column '{column}'. Use one of: {', '.join(DTYPES)}")
+    symbols = sorted({s.upper() for s in symbols}) if symbols else None
+    files = list_files(data_path, start, end)
+    if not files:
+        return pd.DataFrame()
+
+    jobs = [(path, columns, symbols) for _, path in files]
+    if workers and workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            frames = list(pool.map(_read, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    else:
+        frames = [_read(job) for job in jobs]
+
+    lengths = np.array([len(frame) for frame in frames])
+    if 'Stock Symbol' in columns:
+        # Concatenating categoricals with different categories would fall back to object
+        symbol = union_categoricals([frame['Stock Symbol'] for frame in frames], sort_categories=True)
+        frames = [frame.drop(columns='Stock Symbol') for frame in frames]
+    result = pd.concat(frames, ignore_index=True)
+    if 'Stock Symbol' in columns:
+        result['Stock Symbol'] = symbol
+    # Every row of a file shares its date, so the codes are the file positions repeated
+    dates = pd.DatetimeIndex([date for date, _ in files])
+    result['Date'] = pd.Categorical.from_codes(np.repeat(np.arange(len(files), dtype=np.int16), lengths),
+                                               categories=dates, ordered=True)
+    return result[columns + ['Date']]
+
+
+def add_calendar_columns(df, columns=None):
+    """Add the notebook's calendar columns (Year, Quarter, ..., YearWeek) to ``df`` in place
+
+    Each is computed once per distinct date and spread to the rows by the
+    Date codes, as small integers or categoricals rather than strings.
+    """
+    if df.empty:
+        return df
+    dates = df['Date']
+    if isinstance(dates.dtype, pd.CategoricalDtype):
+        days, codes = pd.DatetimeIndex(dates.cat.categories), dates.cat.codes.to_numpy()
+    else:
+        codes, days = pd.factorize(dates, sort=True)
+        days = pd.DatetimeIndex(days)
+    quarters = [f'{year}-Q{quarter}' for year, quarter in zip(days.year, days.quarter)]
+    values = {
+        'Year': days.year.to_numpy().astype(np.int16),
+        'Quarter': days.quarter.to_numpy().astype(np.int8),
+        'Month': days.month.to_numpy().astype(np.int8),
+        'Week': days.isocalendar().week.to_numpy().astype(np.int8),
+        'DayOfYear': days.dayofyear.to_numpy().astype(np.int16),
+        'YearQuarter': pd.Categorical(quarters),
+        'YearMonth': pd.Categorical(days.to_period('M').astype(str)),
+        'YearWeek': pd.Categorical(days.to_period('W').astype(str)),
+    }
+    for column in columns or CALENDAR_COLUMNS:
+        per_day = values[column]
+        if isinstance(per_day, pd.Categorical):
+            df[column] = pd.Categorical.from_codes(per_day.codes[codes], per_day.categories)
+        else:
+            df[column] = per_day[codes]
+    return df
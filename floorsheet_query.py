@@ -0,0 +1,186 @@
+"""
+Floor sheet query surface
+Column projection, symbol and buyer/seller broker filters, quantity/rate/amount
+ranges and sort keys read from request parameters, evaluated as one vectorized
+mask over a parsed day or pushed down into the Parquet store as an Arrow filter.
+
+Parameters (all optional):
+    columns=contract,symbol,quantity     published columns or their short names
+    stock=NABIL,NICA                     symbols (also ``symbol``)
+    buyer=58  seller=34  broker=58,34    broker ids; ``broker`` matches either side
+    min_quantity, max_quantity, min_rate, max_rate, min_amount, max_amount
+    sort=-amount,contract                '-' sorts descending
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+from floorsheet_schema import FLOORSHEET_COLUMNS, PAISA_COLUMNS
+
+# Short names accepted wherever a column is named
+FIELDS = {
+    'sn': 'SN',
+    'contract': 'Contract No.',
+    'symbol': 'Stock Symbol',
+    'buyer': 'Buyer',
+    'seller': 'Seller',
+    'quantity': 'Quantity',
+    'rate': 'Rate (Rs)',
+    'amount': 'Amount (Rs)',
+    'date': 'Date',  # day of each row in multi-day results
+}
+RANGE_FIELDS = ['quantity', 'rate', 'amount']
+
+
+class QueryError(ValueError):
+    """A query parameter that cannot be understood"""
+
+
+def resolve_column(name):
+    """Published column for a short name or a column name in any case"""
+    key = name.strip().lower()
+    if key in FIELDS:
+        return FIELDS[key]
+    for column in FLOORSHEET_COLUMNS + ['Date']:
+        if column.lower() == key:
+            return column
+    raise QueryError(f"Unknown column '{name}'. Use one of: {', '.join(FIELDS)}")
+
+
+def _split(value):
+    return [part.strip() for part in value.split(',') if part.strip()] if value else []
+
+
+def _bound(args, name):
+    value = args.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise QueryError(f"{name} must be a number")
+
+
+def _matches(series, values):
+    """Vectorized membership of a symbol or broker column in upper-cased ``values``"""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.isin([int(v) for v in values if v.isdigit()]).to_numpy()
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Test each category once, then look the answers up by code
+        hits = np.append(series.cat.categories.astype(str).str.upper().isin(values), False)
+        return hits[series.cat.codes.to_numpy()]
+    return series.astype(str).str.upper().isin(values).to_numpy()
+
+
+class FloorsheetQuery:
+    """Filters, projection and ordering for rows of the published floor sheet layout"""
+
+    def __init__(self, columns=None, symbols=None, buyers=None, sellers=None, brokers=None, ranges=None, sort=None):
+        self.columns = [resolve_column(c) for c in columns] if columns else None
+        self.symbols = [s.upper() for s in symbols] if symbols else None
+        self.buyers = [str(b).upper() for b in buyers] if buyers else None
+        self.sellers = [str(s).upper() for s in sellers] if sellers else None
+        self.brokers = [str(b).upper() for b in brokers] if brokers else None
+        self.ranges = {field: bounds for field, bounds in (ranges or {}).items() if bounds != (None, None)}
+        self.sort = [(resolve_column(c), ascending) for c, ascending in sort] if sort else None
+        for field in self.ranges:
+            if field not in RANGE_FIELDS:
+                raise QueryError(f"Unknown range '{field}'. Use one of: {', '.join(RANGE_FIELDS)}")
+
+    @classmethod
+    def from_args(cls, args):
+        """Build a query from request parameters; raises QueryError for ones that do not parse"""
+        sort = [(key[1:], False) if key.startswith('-') else (key, True) for key in _split(args.get('sort'))]
+        return cls(
+            columns=_split(args.get('columns')),
+            symbols=_split(args.get('stock')) + _split(args.get('symbol')),
+            buyers=_split(args.get('buyer')),
+            sellers=_split(args.get('seller')),
+            brokers=_split(args.get('broker')),
+            ranges={field: (_bound(args, f'min_{field}'), _bound(args, f'max_{field}')) for field in RANGE_FIELDS},
+            sort=sort,
+        )
+
+    @property
+    def filters(self):
+        """Whether the query drops any rows"""
+        return bool(self.symbols or self.buyers or self.sellers or self.brokers or self.ranges)
+
+    def is_empty(self):
+        return not (self.filters or self.columns or self.sort)
+
+    def index_key(self):
+        """('symbol' or 'broker', key) that every matching row must carry, for reading an index; else None"""
+        if self.symbols and len(self.symbols) == 1:
+            return 'symbol', self.symbols[0]
+        for brokers in (self.buyers, self.sellers, self.brokers):
+            if brokers and len(brokers) == 1:
+                return 'broker', brokers[0]
+        return None
+
+    def mask(self, df):
+        """Boolean array of the rows of ``df`` that pass every filter"""
+        keep = np.ones(len(df), dtype=bool)
+        if self.symbols:
+            keep &= _matches(df['Stock Symbol'], self.symbols)
+        if self.buyers:
+            keep &= _matches(df['Buyer'], self.buyers)
+        if self.sellers:
+            keep &= _matches(df['Seller'], self.sellers)
+        if self.brokers:
+            keep &= _matches(df['Buyer'], self.brokers) | _matches(df['Seller'], self.brokers)
+        for field, (low, high) in self.ranges.items():
+            values = df[FIELDS[field]].to_numpy()
+            if low is not None:
+                keep &= values >= low
+            if high is not None:
+                keep &= values <= high
+        return keep
+
+    def apply(self, df, filtered=False):
+        """Rows of ``df`` matching the query, sorted and projected; ``filtered`` skips the row filters
+
+        Raises QueryError when a sort or projected column is not one of ``df``'s
+        (``date`` exists only in multi-day results).
+        """
+        if self.filters and not filtered:
+            df = df[self.mask(df)]
+        if self.sort:
+            columns = [column for column, _ in self.sort]
+            missing = [column for column in columns if column not in df.columns]
+            if missing:
+                raise QueryError(f"Cannot sort by '{missing[0]}'")
+            df = df.sort_values(columns, ascending=[ascending for _, ascending in self.sort], kind='stable')
+        if self.columns:
+            missing = [column for column in self.columns if column not in df.columns]
+            if missing:
+                raise QueryError(f"Cannot select '{missing[0]}'")
+            df = df[self.columns]
+        return df.reset_index(drop=True) if self.filters or self.sort else df
+
+    def arrow_filter(self):
+        """The row filters as an Arrow expression over stored columns (money in paisa), or None"""
+        parts = []
+        if self.symbols:
+            parts.append(ds.field('Stock Symbol').isin(self.symbols))
+        if self.buyers:
+            parts.append(ds.field('Buyer').isin(self.buyers))
+        if self.sellers:
+            parts.append(ds.field('Seller').isin(self.sellers))
+        if self.brokers:
+            parts.append(ds.field('Buyer').isin(self.brokers) | ds.field('Seller').isin(self.brokers))
+        for field, (low, high) in self.ranges.items():
+            column = FIELDS[field]
+            stored, scale = (PAISA_COLUMNS[column], 100) if column in PAISA_COLUMNS else (column, 1)
+            # Stored values are whole paisa or shares, so bounds round inwards
+            if low is not None:
+                parts.append(ds.field(stored) >= math.ceil(round(low * scale, 6)))
+            if high is not None:
+                parts.append(ds.field(stored) <= math.floor(round(high * scale, 6)))
+        expression = None
+        for part in parts:
+            expression = part if expression is None else expression & part
+        return expression
@@ -0,0 +1,163 @@
+"""
+Typed floor sheet schema
+Parses raw floor sheet cell text into fixed dtypes in a single pass through
+pandas' C CSV parser, with counters for everything that was rejected.
+"""
+
+import csv
+import io
+
+import numpy as np
+import pandas as pd
+
+FLOORSHEET_COLUMNS = ['SN', 'Contract No.', 'Stock Symbol', 'Buyer', 'Seller', 'Quantity', 'Rate (Rs)', 'Amount (Rs)']
+
+# Typed layout: money is fixed-point paise (1/100 rupee) so sums are exact
+SCHEMA = {
+    'SN': 'int64',
+    'Contract No.': 'int64',
+    'Stock Symbol': 'category',
+    'Buyer': 'category',
+    'Seller': 'category',
+    'Quantity': 'int64',
+    'Rate (paisa)': 'int64',
+    'Amount (paisa)': 'int64',
+}
+
+INTEGER_COLUMNS = ['SN', 'Contract No.', 'Quantity']
+PAISA_COLUMNS = {'Rate (Rs)': 'Rate (paisa)', 'Amount (Rs)': 'Amount (paisa)'}
+CATEGORY_COLUMNS = ['Stock Symbol', 'Buyer', 'Seller']
+
+
+class ParseStats:
+    """Validation counters collected while parsing a floor sheet"""
+
+    def __init__(self):
+        self.rows_in = 0
+        self.header_rows = 0
+        self.malformed_rows = 0
+        self.duplicate_rows = 0
+        self.rejected_cells = {}
+        self.rows_out = 0
+
+    def reject(self, column, count):
+        if count:
+            self.rejected_cells[column] = self.rejected_cells.get(column, 0) + count
+
+    def as_dict(self):
+        return {
+            'rows_in': self.rows_in,
+            'header_rows': self.header_rows,
+            'malformed_rows': self.malformed_rows,
+            'duplicate_rows': self.duplicate_rows,
+            'rejected_cells': dict(self.rejected_cells),
+            'rows_out': self.rows_out,
+        }
+
+    def summary(self):
+        rejected = ', '.join(f"{column}: {count}" for column, count in self.rejected_cells.items()) or 'none'
+        return (f"Parsed {self.rows_out}/{self.rows_in} rows "
+                f"(headers: {self.header_rows}, malformed: {self.malformed_rows}, "
+                f"duplicates: {self.duplicate_rows}, rejected cells: {rejected})")
+
+
+def empty_floorsheet():
+    """A zero-row frame with the typed schema"""
+    return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in SCHEMA.items()})
+
+
+def _coerce_numeric(values, column, stats):
+    """Slow path for a column the C parser could not type: strip separators and coerce"""
+    cleaned = values.astype(str).str.replace(',', '', regex=False).str.replace('Rs', '', regex=False).str.strip()
+    numeric = pd.to_numeric(cleaned, errors='coerce')
+    stats.reject(column, int((numeric.isna() & values.notna()).sum()))
+    return numeric
+
+
+def read_floorsheet_csv(source, stats=None):
+    """Read raw floor sheet rows (CSV without header, as spooled by the scraper) into typed columns
+
+    Repeated table header rows, short rows and rows with unparseable numbers
+    are dropped and counted in ``stats``; duplicate contracts keep their first row.
+    """
+    stats = stats if stats is not None else ParseStats()
+    # Header cells read as NaN, so a header row can never poison a numeric column
+    header_tokens = {column: [column, ''] for column in FLOORSHEET_COLUMNS}
+    try:
+        raw = pd.read_csv(
+            source,
+            header=None,
+            names=FLOORSHEET_COLUMNS,
+            usecols=range(len(FLOORSHEET_COLUMNS)),
+            thousands=',',
+            na_values=header_tokens,
+            keep_default_na=False,
+            dtype={column: 'category' for column in CATEGORY_COLUMNS},
+            skip_blank_lines=True,
+        )
+    except pd.errors.EmptyDataError:
+        return empty_floorsheet()
+    stats.rows_in += len(raw)
+    if raw.empty:
+        return empty_floorsheet()
+
+    is_header = raw['SN'].isna() & raw['Contract No.'].isna() & raw['Stock Symbol'].isna()
+    stats.header_rows += int(is_header.sum())
+    raw = raw[~is_header]
+
+    # Short rows leave trailing cells empty
+    incomplete = raw[FLOORSHEET_COLUMNS].isna().any(axis=1) & raw['Amount (Rs)'].isna()
+    stats.malformed_rows += int(incomplete.sum())
+    raw = raw[~incomplete]
+
+    typed = {}
+    valid = pd.Series(True, index=raw.index)
+    for column in INTEGER_COLUMNS + list(PAISA_COLUMNS):
+        values = raw[column]
+        if not pd.api.types.is_numeric_dtype(values):
+            values = _coerce_numeric(values, column, stats)
+        else:
+            stats.reject(column, int(values.isna().sum()))
+        valid &= values.notna()
+        typed[column] = values
+    for column in CATEGORY_COLUMNS:
+        values = raw[column]
+        missing = values.isna()
+        stats.reject(column, int(missing.sum()))
+        valid &= ~missing
+        typed[column] = values
+
+    frame = pd.DataFrame({
+        'SN': typed['SN'][valid].astype('int64'),
+        'Contract No.': typed['Contract No.'][valid].astype('int64'),
+        'Stock Symbol': typed['Stock Symbol'][valid],
+        'Buyer': typed['Buyer'][valid],
+        'Seller': typed['Seller'][valid],
+        'Quantity': typed['Quantity'][valid].astype('int64'),
+        'Rate (paisa)': np.rint(typed['Rate (Rs)'][valid].to_numpy(dtype='float64') * 100).astype('int64'),
+        'Amount (paisa)': np.rint(typed['Amount (Rs)'][valid].to_numpy(dtype='float64') * 100).astype('int64'),
+    })
+
+    duplicated = frame['Contract No.'].duplicated(keep='first')
+    stats.duplicate_rows += int(duplicated.sum())
+    frame = frame[~duplicated].reset_index(drop=True)
+    for column in CATEGORY_COLUMNS:
+        frame[column] = frame[column].cat.remove_unused_categories()
+    stats.rows_out += len(frame)
+    return frame
+
+
+def parse_rows(rows, stats=None):
+    """Parse an iterable of raw cell rows (lists or tuples of text) into the typed schema"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    return read_floorsheet_csv(buffer, stats)
+
+
+def to_rupees(frame):
+    """Convert a typed floor sheet back to the published CSV layout (rupee amounts)"""
+    output = frame.rename(columns={paisa: rupees for rupees, paisa in PAISA_COLUMNS.items()})
+    for rupees in PAISA_COLUMNS:
+        output[rupees] = output[rupees] / 100
+    return output[FLOORSHEET_COLUMNS]
@@ -0,0 +1,504 @@
+"""
+Columnar floor sheet storage
+Date-partitioned Parquet (data/parquet/date=YYYY-MM-DD/) with dictionary-encoded
+symbol/broker columns and row-group statistics, so readers can project columns
+and skip data by date and symbol instead of re-parsing whole CSV files.
+
+The symbol and broker indexes (_symbols/symbol=XYZ/YYYY-MM.parquet and
+_brokers/broker=N/YYYY-MM.parquet) hold copies of each symbol's and broker's
+trades clustered by month, so those queries never open unrelated data.
+_broker_summary/YYYY-MM.parquet keeps per-day broker totals for aggregates.
+
+Usage:
+    python floorsheet_store.py migrate [csv_dir] [parquet_root]
+    python floorsheet_store.py index [parquet_root]
+"""
+
+import glob
+import os
+import re
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from floorsheet_schema import CATEGORY_COLUMNS, PAISA_COLUMNS, SCHEMA, ParseStats, read_floorsheet_csv, to_rupees
+
+DATA_DIR = os.environ.get('FLOORSHEET_DATA_DIR', 'data')
+PARQUET_ROOT = os.environ.get('FLOORSHEET_PARQUET_ROOT', os.path.join(DATA_DIR, 'parquet'))
+ROW_GROUP_SIZE = 16384
+# Underscored directories are ignored by the date-partitioned dataset
+INDEX_DIRS = {'symbol': '_symbols', 'broker': '_brokers'}
+BROKER_SUMMARY_DIR = '_broker_summary'
+INDEX_KEY_RE = re.compile(r'[A-Z0-9][A-Z0-9._-]*')
+
+CSV_NAME_RE = re.compile(r'nepal_stock_floorsheet_(\d{4}-\d{2}-\d{2})\.csv$')
+
+ARROW_SCHEMA = pa.schema([
+    ('SN', pa.int64()),
+    ('Contract No.', pa.int64()),
+    ('Stock Symbol', pa.string()),
+    ('Buyer', pa.string()),
+    ('Seller', pa.string()),
+    ('Quantity', pa.int64()),
+    ('Rate (paisa)', pa.int64()),
+    ('Amount (paisa)', pa.int64()),
+])
+
+INDEX_SCHEMA = ARROW_SCHEMA.append(pa.field('date', pa.string()))
+
+BROKER_SUMMARY_SCHEMA = pa.schema([
+    ('date', pa.string()),
+    ('broker', pa.string()),
+    ('side', pa.string()),
+    ('symbol', pa.string()),
+    ('trades', pa.int64()),
+    ('quantity', pa.int64()),
+    ('amount', pa.int64()),
+])
+
+
+def date_from_filename(filename):
+    """Extract YYYY-MM-DD from a nepal_stock_floorsheet_<date>.csv name, or None"""
+    match = CSV_NAME_RE.search(os.path.basename(filename))
+    return match.group(1) if match else None
+
+
+def partition_path(date, root=None):
+    return os.path.join(root or PARQUET_ROOT, f"date={date}", "part-0.parquet")
+
+
+def write_day(frame, date, root=None):
+    """Write one day's typed floor sheet as its own partition, replacing any previous copy
+
+    Rows are ordered by symbol then contract so each row group covers a narrow
+    symbol range and its min/max statistics let readers skip it.
+    """
+    path = partition_path(date, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    frame = frame.assign(**{column: frame[column].astype(str) for column in CATEGORY_COLUMNS})
+    frame = frame.sort_values(['Stock Symbol', 'Contract No.'])
+    table = pa.table({field.name: pa.array(frame[field.name].to_numpy(), type=field.type)
+                      for field in ARROW_SCHEMA}, schema=ARROW_SCHEMA)
+
+    tmp_path = path + '.tmp'
+    pq.write_table(
+        table,
+        tmp_path,
+        row_group_size=ROW_GROUP_SIZE,
+        use_dictionary=CATEGORY_COLUMNS,
+        compression='zstd',
+        write_statistics=True,
+    )
+    os.replace(tmp_path, path)
+    return path
+
+
+def list_dates(root=None):
+    """All stored dates, oldest first"""
+    pattern = os.path.join(root or PARQUET_ROOT, 'date=*', 'part-0.parquet')
+    return sorted(os.path.basename(os.path.dirname(path))[len('date='):] for path in glob.glob(pattern))
+
+
+def dataset(root=None):
+    return ds.dataset(
+        root or PARQUET_ROOT,
+        format='parquet',
+        partitioning=ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive'),
+    )
+
+
+def build_filter(start=None, end=None, symbols=None, brokers=None):
+    """Arrow filter expression for an inclusive date range, symbols and buyer/seller brokers"""
+    expression = None
+
+    def combine(part):
+        nonlocal expression
+        expression = part if expression is None else expression & part
+
+    if start:
+        combine(ds.field('date') >= str(start))
+    if end:
+        combine(ds.field('date') <= str(end))
+    if symbols:
+        combine(ds.field('Stock Symbol').isin([s.upper() for s in symbols]))
+    if brokers:
+        brokers = [str(b) for b in brokers]
+        combine(ds.field('Buyer').isin(brokers) | ds.field('Seller').isin(brokers))
+    return expression
+
+
+def _empty_result(rupees=False):
+    frame = pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in SCHEMA.items()})
+    frame['date'] = pd.Series(dtype=str)
+    return to_rupees(frame).assign(date=frame['date']) if rupees else frame
+
+
+def _stored_columns(columns, rupees):
+    if columns is not None and rupees:
+        columns = [PAISA_COLUMNS.get(c, c) for c in columns]
+    return columns
+
+
+def _to_frame(table, rupees):
+    frame = table.to_pandas()
+    for column in CATEGORY_COLUMNS:
+        if column in frame.columns:
+            frame[column] = frame[column].astype('category')
+    if rupees:
+        renames = {paisa: published for published, paisa in PAISA_COLUMNS.items() if paisa in frame.columns}
+        frame = frame.assign(**{paisa: frame[paisa] / 100 for paisa in renames}).rename(columns=renames)
+    return frame
+
+
+def read_floorsheet(root=None, columns=None, start=None, end=None, symbols=None, brokers=None, rupees=False):
+    """Read stored floor sheets with column projection and date/symbol/broker pushdown
+
+    Partitions outside the date range are never opened, and row groups whose
+    symbol statistics cannot match are skipped. ``columns`` may include 'date'.
+    With ``rupees=True`` money columns come back in the published CSV layout.
+    """
+    root = root or PARQUET_ROOT
+    if not os.path.isdir(root) or not list_dates(root):
+        return _empty_result(rupees)
+
+    table = dataset(root).to_table(columns=_stored_columns(columns, rupees),
+                                   filter=build_filter(start, end, symbols, brokers))
+    return _to_frame(table, rupees)
+
+
+def symbol_runs(symbols):
+    """(values, row starts, row counts) for each run of equal values in a sorted column"""
+    values = np.asarray(symbols, dtype=object)
+    if not len(values):
+        return values, np.empty(0, dtype='int64'), np.empty(0, dtype='int64')
+    starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+    counts = np.diff(np.r_[starts, len(values)])
+    return values[starts], starts.astype('int64'), counts.astype('int64')
+
+
+def index_dir(kind, key, root=None):
+    """Directory of one symbol's or broker's monthly partitions, or None for keys that are not plain names"""
+    key = str(key).upper()
+    if not INDEX_KEY_RE.fullmatch(key):
+        return None
+    return os.path.join(root or PARQUET_ROOT, INDEX_DIRS[kind], f"{kind}={key}")
+
+
+def _write_index_month(table, kind, key, month, root=None):
+    path = os.path.join(index_dir(kind, key, root), f"{month}.parquet")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    pq.write_table(table, tmp_path, compression='zstd', use_dictionary=CATEGORY_COLUMNS + ['date'])
+    os.replace(tmp_path, path)
+
+
+def _read_day_table(date, root=None):
+    table = pq.read_table(partition_path(date, root), schema=ARROW_SCHEMA)
+    return table.append_column('date', pa.array([date] * table.num_rows, type=pa.string()))
+
+
+def read_partition(date, root=None, columns=None, filter=None, rupees=False):
+    """One stored day with column projection and a row filter, without discovering the rest of the store
+
+    Returns None if the day is not stored.
+    """
+    path = partition_path(date, root)
+    if not os.path.exists(path):
+        return None
+    table = ds.dataset(path, schema=ARROW_SCHEMA, format='parquet').to_table(
+        columns=_stored_columns(columns, rupees), filter=filter)
+    return _to_frame(table, rupees)
+
+
+def read_day(date, root=None):
+    """One stored day as a typed frame with its 'date' column"""
+    return _to_frame(_read_day_table(date, root), rupees=False)
+
+
+def _keyed_rows(table, kind):
+    """Yield (key, rows) for every symbol or broker in a table of trades
+
+    A broker's rows are the trades it bought or sold; a trade crossed by one
+    broker with itself is listed once.
+    """
+    if kind == 'symbol':
+        keyed = table.append_column('_key', table.column('Stock Symbol'))
+    else:
+        crossed = table.filter(pc.not_equal(table.column('Buyer'), table.column('Seller')))
+        keyed = pa.concat_tables([table.append_column('_key', table.column('Buyer')),
+                                  crossed.append_column('_key', crossed.column('Seller'))])
+    keyed = keyed.sort_by([('_key', 'ascending'), ('date', 'ascending'), ('SN', 'ascending')])
+    keys, starts, counts = symbol_runs(keyed.column('_key').to_numpy(zero_copy_only=False))
+    keyed = keyed.drop_columns(['_key'])
+    for key, start, count in zip(keys, starts, counts):
+        if index_dir(kind, key) is not None:
+            yield key, keyed.slice(start, count)
+
+
+def has_index(kind, root=None):
+    return os.path.isdir(os.path.join(root or PARQUET_ROOT, INDEX_DIRS[kind]))
+
+
+def update_index(kind, date, root=None):
+    """Fold one stored day into the symbol or broker partitions of its month
+
+    Each month file is rewritten with the day's rows replacing any earlier
+    copy of that day, so re-ingesting a day is safe.
+    """
+    month = date[:7]
+    seen = set()
+    for key, rows in _keyed_rows(_read_day_table(date, root), kind):
+        seen.add(key)
+        path = os.path.join(index_dir(kind, key, root), f"{month}.parquet")
+        if os.path.exists(path):
+            existing = pq.read_table(path, schema=INDEX_SCHEMA)
+            existing = existing.filter(pc.not_equal(existing.column('date'), date))
+            rows = pa.concat_tables([existing, rows]).sort_by([('date', 'ascending'), ('SN', 'ascending')])
+        _write_index_month(rows, kind, key, month, root)
+    # A key that vanished from a re-ingested day keeps no stale rows
+    pattern = os.path.join(root or PARQUET_ROOT, INDEX_DIRS[kind], f"{kind}=*", f"{month}.parquet")
+    for path in glob.glob(pattern):
+        key = os.path.basename(os.path.dirname(path))[len(kind) + 1:]
+        if key not in seen:
+            existing = pq.read_table(path, schema=INDEX_SCHEMA)
+            kept = existing.filter(pc.not_equal(existing.column('date'), date))
+            if kept.num_rows < existing.num_rows:
+                _write_index_month(kept, kind, key, month, root)
+
+
+def rebuild_index(kind, root=None):
+    """Rebuild all symbol or broker partitions from the date partitions, one month at a time"""
+    root = root or PARQUET_ROOT
+    shutil.rmtree(os.path.join(root, INDEX_DIRS[kind]), ignore_errors=True)
+    dates = list_dates(root)
+    files = 0
+    for month in sorted({date[:7] for date in dates}):
+        table = pa.concat_tables([_read_day_table(date, root) for date in dates if date.startswith(month)])
+        for key, rows in _keyed_rows(table, kind):
+            _write_index_month(rows, kind, key, month, root)
+            files += 1
+    print(f"Indexed {len(dates)} dates into {files} {kind}-month partitions")
+    return files
+
+
+def _date_filter(start=None, end=None):
+    expression = None
+    if start:
+        expression = ds.field('date') >= str(start)
+    if end:
+        upper = ds.field('date') <= str(end)
+        expression = upper if expression is None else expression & upper
+    return expression
+
+
+def _month_files(directory, start=None, end=None):
+    paths = sorted(glob.glob(os.path.join(directory, '*.parquet'))) if directory else []
+    return [path for path in paths
+            if (not start or os.path.basename(path)[:7] >= str(start)[:7])
+            and (not end or os.path.basename(path)[:7] <= str(end)[:7])]
+
+
+def read_index(kind, key, start=None, end=None, root=None, columns=None, rupees=False, filter=None):
+    """Read one symbol's or broker's trades over an inclusive date range from its own partitions
+
+    Only the month files overlapping the range are opened, so cost follows the
+    number of matching rows rather than the length of the history. ``filter``
+    is an extra Arrow expression. Returns None when the store has no such index.
+    A 'date' column is always included.
+    """
+    root = root or PARQUET_ROOT
+    if not has_index(kind, root):
+        return None
+    paths = _month_files(index_dir(kind, key, root), start, end)
+    if not paths:
+        frame = _empty_result(rupees)
+        return frame if columns is None else frame[[c for c in list(columns) + ['date'] if c in frame.columns]]
+
+    stored = _stored_columns(columns, rupees)
+    stored = None if stored is None else [c for c in stored if c != 'date'] + ['date']
+    expression = _date_filter(start, end)
+    if filter is not None:
+        expression = filter if expression is None else expression & filter
+    table = ds.dataset(paths, schema=INDEX_SCHEMA, format='parquet').to_table(columns=stored, filter=expression)
+    return _to_frame(table, rupees)
+
+
+def read_symbol(symbol, start=None, end=None, root=None, columns=None, rupees=False):
+    """Read one symbol's trades over an inclusive date range through the symbol index
+
+    Falls back to a pushed-down scan of the date partitions when the store has
+    no symbol index yet.
+    """
+    frame = read_index('symbol', symbol, start, end, root, columns, rupees)
+    if frame is None:
+        frame = read_floorsheet(root, columns=None if columns is None else list(columns) + ['date'],
+                                start=start, end=end, symbols=[symbol], rupees=rupees)
+        if 'SN' in frame.columns:
+            frame = frame.sort_values(['date', 'SN']).reset_index(drop=True)
+    return frame
+
+
+def read_broker(broker, start=None, end=None, side=None, symbols=None, root=None, columns=None, rupees=False):
+    """Read the trades a broker bought (``side='buy'``), sold ('sell') or both, through the broker index
+
+    Falls back to a pushed-down scan when the store has no broker index yet.
+    """
+    broker = str(broker)
+    if side not in (None, 'buy', 'sell'):
+        raise ValueError(f"Unknown side '{side}'. Use 'buy' or 'sell'.")
+    expression = None
+    if side:
+        expression = ds.field('Buyer' if side == 'buy' else 'Seller') == broker
+    if symbols:
+        by_symbol = ds.field('Stock Symbol').isin([s.upper() for s in symbols])
+        expression = by_symbol if expression is None else expression & by_symbol
+    frame = read_index('broker', broker, start, end, root, columns, rupees, filter=expression)
+    if frame is None:
+        frame = read_floorsheet(root, columns=None if columns is None else list(columns) + ['date'],
+                                start=start, end=end, symbols=symbols, brokers=[broker], rupees=rupees)
+        if side:
+            frame = frame[frame['Buyer' if side == 'buy' else 'Seller'] == broker]
+        if 'SN' in frame.columns:
+            frame = frame.sort_values(['date', 'SN']).reset_index(drop=True)
+    return frame
+
+
+def broker_day_summary(day, date):
+    """Per broker, side and symbol totals (trades, quantity, paisa amount) of one typed day"""
+    sides = []
+    for side, column in (('buy', 'Buyer'), ('sell', 'Seller')):
+        grouped = day.groupby([column, 'Stock Symbol'], observed=True, sort=False).agg(
+            trades=('Quantity', 'size'), quantity=('Quantity', 'sum'), amount=('Amount (paisa)', 'sum'))
+        grouped = grouped.reset_index().rename(columns={column: 'broker', 'Stock Symbol': 'symbol'})
+        grouped['side'] = side
+        sides.append(grouped)
+    summary = pd.concat(sides, ignore_index=True)
+    summary['broker'] = summary['broker'].astype(str)
+    summary['symbol'] = summary['symbol'].astype(str)
+    summary['date'] = date
+    return summary[BROKER_SUMMARY_SCHEMA.names].sort_values(['broker', 'side', 'symbol']).reset_index(drop=True)
+
+
+def _write_summary_month(summary, month, root=None):
+    path = os.path.join(root or PARQUET_ROOT, BROKER_SUMMARY_DIR, f"{month}.parquet")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pa.Table.from_pandas(summary, schema=BROKER_SUMMARY_SCHEMA, preserve_index=False)
+    tmp_path = path + '.tmp'
+    pq.write_table(table, tmp_path, compression='zstd', use_dictionary=['date', 'broker', 'side', 'symbol'])
+    os.replace(tmp_path, path)
+
+
+def update_broker_summary(date, root=None):
+    """Replace one day's rows in its month of per-day broker summaries"""
+    month = date[:7]
+    summary = broker_day_summary(read_day(date, root), date)
+    path = os.path.join(root or PARQUET_ROOT, BROKER_SUMMARY_DIR, f"{month}.parquet")
+    if os.path.exists(path):
+        existing = pq.read_table(path).to_pandas()
+        summary = pd.concat([existing[existing['date'] != date], summary], ignore_index=True)
+    _write_summary_month(summary, month, root)
+
+
+def rebuild_broker_summary(root=None):
+    root = root or PARQUET_ROOT
+    shutil.rmtree(os.path.join(root, BROKER_SUMMARY_DIR), ignore_errors=True)
+    dates = list_dates(root)
+    for month in sorted({date[:7] for date in dates}):
+        summaries = [broker_day_summary(read_day(date, root), date) for date in dates if date.startswith(month)]
+        _write_summary_month(pd.concat(summaries, ignore_index=True), month, root)
+    print(f"Summarized brokers for {len(dates)} dates")
+
+
+def read_broker_summary(broker=None, start=None, end=None, side=None, symbols=None, root=None):
+    """Per-day broker summaries (date, broker, side, symbol, trades, quantity, amount in paisa)
+
+    Returns None when the store has no broker summaries.
+    """
+    root = root or PARQUET_ROOT
+    directory = os.path.join(root, BROKER_SUMMARY_DIR)
+    if not os.path.isdir(directory):
+        return None
+    paths = _month_files(directory, start, end)
+    if not paths:
+        return BROKER_SUMMARY_SCHEMA.empty_table().to_pandas()
+    expression = _date_filter(start, end)
+    for part in (ds.field('broker') == str(broker) if broker is not None else None,
+                 ds.field('side') == side if side else None,
+                 ds.field('symbol').isin([s.upper() for s in symbols]) if symbols else None):
+        if part is not None:
+            expression = part if expression is None else expression & part
+    return ds.dataset(paths, schema=BROKER_SUMMARY_SCHEMA, format='parquet').to_table(filter=expression).to_pandas()
+
+
+def update_indexes(date, root=None):
+    """Bring every ingest-time index and summary up to date with one stored day"""
+    import floorsheet_summary
+
+    for kind in INDEX_DIRS:
+        update_index(kind, date, root)
+    update_broker_summary(date, root)
+    floorsheet_summary.update_day(date, root)
+
+
+def rebuild_indexes(root=None):
+    """Rebuild every ingest-time index and summary from the stored days"""
+    import floorsheet_summary
+
+    for kind in INDEX_DIRS:
+        rebuild_index(kind, root)
+    rebuild_broker_summary(root)
+    floorsheet_summary.rebuild(root)
+
+
+def ingest_day(frame, date, root=None, index=True):
+    """Store a freshly scraped, typed day and fold it into the indexes"""
+    path = write_day(frame, date, root)
+    if index:
+        update_indexes(date, root)
+    print(f"Stored {len(frame)} rows in {path}")
+    return path
+
+
+def migrate_csvs(csv_dir=None, root=None, overwrite=False):
+    """One-shot conversion of existing daily CSV files into the Parquet store"""
+    csv_dir = csv_dir or DATA_DIR
+    existing = set(list_dates(root))
+    migrated = 0
+    csv_bytes = parquet_bytes = 0
+    for path in sorted(glob.glob(os.path.join(csv_dir, 'nepal_stock_floorsheet_*.csv'))):
+        date = date_from_filename(path)
+        if not date:
+            continue
+        if date in existing and not overwrite:
+            print(f"Skipping {os.path.basename(path)} (already stored)")
+            continue
+        stats = ParseStats()
+        frame = read_floorsheet_csv(path, stats)
+        out = ingest_day(frame, date, root, index=False)
+        csv_bytes += os.path.getsize(path)
+        parquet_bytes += os.path.getsize(out)
+        migrated += 1
+        if stats.rows_out < stats.rows_in - stats.header_rows:
+            print(f"  {os.path.basename(path)}: {stats.summary()}")
+    if migrated:
+        rebuild_indexes(root)
+        print(f"Migrated {migrated} files: {csv_bytes / 2**20:.1f} MiB CSV -> {parquet_bytes / 2**20:.1f} MiB Parquet")
+    else:
+        print("Nothing to migrate")
+    return migrated
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ('migrate', 'index'):
+        print(__doc__.strip())
+        sys.exit(1)
+    if sys.argv[1] == 'migrate':
+        migrate_csvs(*sys.argv[2:4])
+    else:
+        rebuild_indexes(*sys.argv[2:3])
@@ -0,0 +1,502 @@
+"""
+Ingest-time floor sheet summaries
+Per-day totals (_daily_summary.parquet), per-symbol daily OHLCV/VWAP bars
+(_symbol_daily.parquet), a cumulative broker x symbol position ledger
+(_positions.parquet) and whole-history totals (_stats.json) kept beside the
+Parquet store and updated as each day lands, so statistics never touch raw trades.
+
+Usage:
+    python floorsheet_summary.py rebuild [parquet_root]
+"""
+
+import json
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import floorsheet_store
+
+DAILY_FILE = '_daily_summary.parquet'
+SYMBOL_DAILY_FILE = '_symbol_daily.parquet'
+STATS_FILE = '_stats.json'
+POSITIONS_FILE = '_positions.parquet'
+
+DAILY_SCHEMA = pa.schema([
+    ('date', pa.string()),
+    ('rows', pa.int64()),
+    ('turnover', pa.int64()),  # paisa
+    ('symbols', pa.list_(pa.string())),
+    ('brokers', pa.list_(pa.string())),
+])
+
+SYMBOL_DAILY_SCHEMA = pa.schema([
+    ('date', pa.string()),
+    ('symbol', pa.string()),
+    ('trades', pa.int64()),
+    ('quantity', pa.int64()),
+    ('turnover', pa.int64()),  # paisa
+    ('min_rate', pa.int64()),  # paisa
+    ('max_rate', pa.int64()),  # paisa
+    ('open', pa.int64()),  # paisa, rate of the day's first contract
+    ('close', pa.int64()),  # paisa, rate of the day's last contract
+    ('vwap', pa.float64()),  # paisa
+])
+
+# Running totals per broker and symbol through 'date', one row for each day the broker traded the symbol
+POSITIONS_SCHEMA = pa.schema([
+    ('broker', pa.string()),
+    ('symbol', pa.string()),
+    ('date', pa.string()),
+    ('buy_trades', pa.int64()),
+    ('buy_quantity', pa.int64()),
+    ('buy_amount', pa.int64()),  # paisa
+    ('sell_trades', pa.int64()),
+    ('sell_quantity', pa.int64()),
+    ('sell_amount', pa.int64()),  # paisa
+])
+POSITION_TOTALS = POSITIONS_SCHEMA.names[3:]
+
+# Published OHLC bar columns and the summary column each comes from
+OHLC_COLUMNS = {
+    'date': 'date',
+    'open': 'open',
+    'high': 'max_rate',
+    'low': 'min_rate',
+    'close': 'close',
+    'vwap': 'vwap',
+    'volume': 'quantity',
+    'turnover': 'turnover',
+    'trades': 'trades',
+}
+PAISA_FIELDS = ['open', 'high', 'low', 'close', 'vwap', 'turnover']
+
+
+class SchemaChanged(Exception):
+    """A stored summary was written with an older layout, or is missing from an existing store, and needs a rebuild"""
+
+
+def _path(name, root=None):
+    return os.path.join(root or floorsheet_store.PARQUET_ROOT, name)
+
+
+def summarize_day(day, date):
+    """(daily summary row, per-symbol aggregates) of one typed day
+
+    Open and close follow contract order, which is the order trades matched.
+    """
+    day = day.sort_values('Contract No.', kind='stable')
+    symbols = day['Stock Symbol'].astype(str)
+    brokers = pd.concat([day['Buyer'].astype(str), day['Seller'].astype(str)])
+    daily = {
+        'date': date,
+        'rows': len(day),
+        'turnover': int(day['Amount (paisa)'].sum()),
+        'symbols': sorted(symbols.unique()),
+        'brokers': sorted(brokers.unique(), key=lambda b: (len(b), b)),
+    }
+    per_symbol = day.groupby(symbols, sort=True).agg(
+        trades=('Quantity', 'size'),
+        quantity=('Quantity', 'sum'),
+        turnover=('Amount (paisa)', 'sum'),
+        min_rate=('Rate (paisa)', 'min'),
+        max_rate=('Rate (paisa)', 'max'),
+        open=('Rate (paisa)', 'first'),
+        close=('Rate (paisa)', 'last'),
+    )
+    per_symbol['vwap'] = per_symbol['turnover'] / per_symbol['quantity'].where(per_symbol['quantity'] > 0)
+    per_symbol = per_symbol.rename_axis('symbol').reset_index()
+    per_symbol.insert(0, 'date', date)
+    return daily, per_symbol
+
+
+def _write(table, name, root=None):
+    path = _path(name, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    pq.write_table(table, tmp_path, compression='zstd')
+    os.replace(tmp_path, path)
+
+
+def _replace_day(name, schema, rows, date, root=None):
+    """Swap one day's rows in a summary table and write it back, ordered by date"""
+    table = pa.Table.from_pandas(rows, schema=schema, preserve_index=False)
+    path = _path(name, root)
+    if os.path.exists(path):
+        if not pq.read_schema(path).equals(schema):
+            raise SchemaChanged(path)
+        existing = pq.read_table(path, schema=schema)
+        existing = existing.filter(pc.not_equal(existing.column('date'), date))
+        table = pa.concat_tables([existing, table])
+    table = table.sort_by([('date', 'ascending')] + ([('symbol', 'ascending')] if 'symbol' in schema.names else []))
+    _write(table, name, root)
+    return table
+
+
+def position_changes(day, date):
+    """Per broker and symbol buy/sell trades, quantity and paisa amount of one typed day"""
+    summary = floorsheet_store.broker_day_summary(day, date)
+    sides = [summary[summary['side'] == side].set_index(['broker', 'symbol'])[['trades', 'quantity', 'amount']]
+             .add_prefix(f'{side}_') for side in ('buy', 'sell')]
+    changes = pd.concat(sides, axis=1).fillna(0).astype('int64').reset_index()
+    changes.insert(2, 'date', date)
+    return changes[POSITIONS_SCHEMA.names]
+
+
+def accumulate_positions(changes):
+    """Running totals per broker and symbol from per-day changes"""
+    positions = changes.sort_values(['broker', 'symbol', 'date'], kind='stable').reset_index(drop=True)
+    positions[POSITION_TOTALS] = positions.groupby(['broker', 'symbol'], sort=False)[POSITION_TOTALS].cumsum()
+    return positions
+
+
+def _position_changes_of(positions):
+    """Per-day changes recovered from sorted running totals (the inverse of accumulate_positions)"""
+    totals = positions[POSITION_TOTALS].to_numpy()
+    keys = positions[['broker', 'symbol']].to_numpy(dtype=object)
+    first = np.r_[True, (keys[1:] != keys[:-1]).any(axis=1)]
+    changes = positions.copy()
+    changes[POSITION_TOTALS] = np.where(first[:, None], totals, totals - np.roll(totals, 1, axis=0))
+    return changes
+
+
+def _positions_table(positions):
+    return pa.Table.from_pandas(positions[POSITIONS_SCHEMA.names], schema=POSITIONS_SCHEMA, preserve_index=False)
+
+
+def update_positions(changes, date, root=None):
+    """Fold one day's per-broker changes into the position ledger
+
+    A day after every stored one only adds rows: each pair's latest totals
+    plus the day's changes. Replacing or backfilling an earlier day shifts
+    every later total, so the ledger is unwound into per-day changes and
+    accumulated again, still without reading any trades.
+    """
+    path = _path(POSITIONS_FILE, root)
+    if not os.path.exists(path):
+        # A store summarized before the ledger existed needs every day in it, not just this one
+        daily_path = _path(DAILY_FILE, root)
+        if os.path.exists(daily_path):
+            dates = pq.read_table(daily_path, columns=['date']).column('date')
+            if pc.any(pc.not_equal(dates, date)).as_py():
+                raise SchemaChanged(path)
+        return _write(_positions_table(accumulate_positions(changes)), POSITIONS_FILE, root)
+    if not pq.read_schema(path).equals(POSITIONS_SCHEMA):
+        raise SchemaChanged(path)
+    stored = pq.read_table(path, schema=POSITIONS_SCHEMA)
+    if stored.num_rows and date <= pc.max(stored.column('date')).as_py():
+        positions = _position_changes_of(stored.to_pandas())
+        positions = accumulate_positions(pd.concat([positions[positions['date'] != date], changes], ignore_index=True))
+        return _write(_positions_table(positions), POSITIONS_FILE, root)
+
+    # The stored rows are sorted by pair, so each pair's latest totals are the last row of its run
+    brokers, symbols = stored.column('broker').combine_chunks(), stored.column('symbol').combine_chunks()
+    last = pc.or_(pc.not_equal(brokers[1:], brokers[:-1]), pc.not_equal(symbols[1:], symbols[:-1]))
+    last = pa.concat_arrays([last, pa.array([True])]) if stored.num_rows else pa.array([], pa.bool_())
+    latest = stored.filter(last).to_pandas().set_index(['broker', 'symbol'])[POSITION_TOTALS]
+    added = changes.set_index(['broker', 'symbol'])
+    added[POSITION_TOTALS] = added[POSITION_TOTALS] + latest.reindex(added.index, fill_value=0)
+    table = pa.concat_tables([stored, _positions_table(added.reset_index())])
+    return _write(table.sort_by([('broker', 'ascending'), ('symbol', 'ascending'), ('date', 'ascending')]),
+                  POSITIONS_FILE, root)
+
+
+def history_stats(daily):
+    """Whole-history totals from the daily summary table"""
+    if daily.num_rows == 0:
+        return {'days': 0, 'total_records': 0, 'total_turnover': 0.0, 'first_date': None, 'last_date': None,
+                'unique_stocks': 0, 'unique_brokers': 0, 'stocks': [], 'brokers': []}
+    dates = daily.column('date').to_pylist()
+    stocks = sorted(pc.unique(pc.list_flatten(daily.column('symbols'))).to_pylist())
+    brokers = sorted(pc.unique(pc.list_flatten(daily.column('brokers'))).to_pylist(), key=lambda b: (len(b), b))
+    return {
+        'days': daily.num_rows,
+        'total_records': int(pc.sum(daily.column('rows')).as_py()),
+        'total_turnover': int(pc.sum(daily.column('turnover')).as_py()) / 100,
+        'first_date': min(dates),
+        'last_date': max(dates),
+        'unique_stocks': len(stocks),
+        'unique_brokers': len(brokers),
+        'stocks': stocks,
+        'brokers': brokers,
+    }
+
+
+def _write_stats(daily, root=None):
+    stats = history_stats(daily)
+    stats['updated'] = datetime.now().isoformat(timespec='seconds')
+    path = _path(STATS_FILE, root)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(stats, f)
+    os.replace(tmp_path, path)
+    return stats
+
+
+def update_day(date, root=None):
+    """Fold one stored day into the summaries and refresh the history totals"""
+    day = floorsheet_store.read_day(date, root)
+    daily, per_symbol = summarize_day(day, date)
+    try:
+        daily_table = _replace_day(DAILY_FILE, DAILY_SCHEMA, pd.DataFrame([daily]), date, root)
+        _replace_day(SYMBOL_DAILY_FILE, SYMBOL_DAILY_SCHEMA, per_symbol, date, root)
+        update_positions(position_changes(day, date), date, root)
+    except SchemaChanged as e:
+        print(f"{os.path.basename(str(e))} has an older layout, rebuilding summaries")
+        return rebuild(root)
+    return _write_stats(daily_table, root)
+
+
+def rebuild(root=None):
+    """Recompute every summary from the stored days (for backfills and repairs)"""
+    dailies, per_symbols, changes = [], [], []
+    for date in floorsheet_store.list_dates(root):
+        day = floorsheet_store.read_day(date, root)
+        daily, per_symbol = summarize_day(day, date)
+        dailies.append(daily)
+        per_symbols.append(per_symbol)
+        changes.append(position_changes(day, date))
+    daily_table = pa.Table.from_pandas(pd.DataFrame(dailies, columns=DAILY_SCHEMA.names),
+                                       schema=DAILY_SCHEMA, preserve_index=False)
+    symbol_table = pa.Table.from_pandas(
+        pd.concat(per_symbols, ignore_index=True) if per_symbols else pd.DataFrame(columns=SYMBOL_DAILY_SCHEMA.names),
+        schema=SYMBOL_DAILY_SCHEMA, preserve_index=False)
+    os.makedirs(root or floorsheet_store.PARQUET_ROOT, exist_ok=True)
+    _write(daily_table, DAILY_FILE, root)
+    _write(symbol_table, SYMBOL_DAILY_FILE, root)
+    _write(_positions_table(accumulate_positions(
+        pd.concat(changes, ignore_index=True) if changes else pd.DataFrame(columns=POSITIONS_SCHEMA.names))),
+        POSITIONS_FILE, root)
+    stats = _write_stats(daily_table, root)
+    print(f"Summarized {stats['days']} days, {stats['total_records']} trades")
+    return stats
+
+
+_STATS_CACHE = {}
+
+
+def load_stats(root=None):
+    """Whole-history totals, re-read only when the stats file changes; None if there are none"""
+    path = _path(STATS_FILE, root)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _STATS_CACHE.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path) as f:
+            cached = (mtime, json.load(f))
+        _STATS_CACHE[path] = cached
+    return cached[1]
+
+
+def _read(name, schema, start=None, end=None, symbols=None, root=None):
+    path = _path(name, root)
+    if not os.path.exists(path):
+        return None
+    expression = None
+    for part in (ds.field('date') >= str(start) if start else None,
+                 ds.field('date') <= str(end) if end else None,
+                 ds.field('symbol').isin([s.upper() for s in symbols]) if symbols else None):
+        if part is not None:
+            expression = part if expression is None else expression & part
+    return ds.dataset(path, schema=schema, format='parquet').to_table(filter=expression).to_pandas()
+
+
+def read_daily(start=None, end=None, root=None):
+    """Per-day summaries in an inclusive date range, or None if the store has none"""
+    return _read(DAILY_FILE, DAILY_SCHEMA, start, end, root=root)
+
+
+def read_symbol_daily(symbols=None, start=None, end=None, root=None):
+    """Per-symbol daily aggregates (amounts and rates in paisa), or None if the store has none"""
+    return _read(SYMBOL_DAILY_FILE, SYMBOL_DAILY_SCHEMA, start, end, symbols, root)
+
+
+class BarIndex:
+    """Per-symbol daily bars held as column arrays, sliced by binary search on date"""
+
+    def __init__(self, table):
+        frame = table.to_pandas().sort_values(['symbol', 'date'], kind='stable').reset_index(drop=True)
+        symbols, starts, counts = floorsheet_store.symbol_runs(frame['symbol'].to_numpy())
+        self._ranges = {symbol: (start, start + count) for symbol, start, count in zip(symbols, starts, counts)}
+        self._columns = {name: frame[source].to_numpy() for name, source in OHLC_COLUMNS.items()}
+        self._dates = self._columns['date']
+
+    def __contains__(self, symbol):
+        return symbol.upper() in self._ranges
+
+    def symbols(self):
+        return sorted(self._ranges)
+
+    def bars(self, symbol, start=None, end=None):
+        """{column: array} of a symbol's bars in an inclusive date range, amounts in paisa"""
+        lo, hi = self._ranges.get(symbol.upper(), (0, 0))
+        if start:
+            lo = lo + int(np.searchsorted(self._dates[lo:hi], str(start), 'left'))
+        if end:
+            hi = lo + int(np.searchsorted(self._dates[lo:hi], str(end), 'right'))
+        return {name: values[lo:hi] for name, values in self._columns.items()}
+
+
+_BAR_INDEXES = {}
+
+
+def load_bar_index(root=None):
+    """The store's BarIndex, reloaded only when the bars change; None if there are none"""
+    path = _path(SYMBOL_DAILY_FILE, root)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _BAR_INDEXES.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, BarIndex(pq.read_table(path, columns=list(set(OHLC_COLUMNS.values())) + ['symbol'])))
+        _BAR_INDEXES[path] = cached
+    return cached[1]
+
+
+def read_ohlc(symbol, start=None, end=None, root=None, rupees=True):
+    """Daily open/high/low/close/VWAP/volume/turnover/trades bars of one symbol, oldest first
+
+    Returns None if the store has no bars yet.
+    """
+    index = load_bar_index(root)
+    if index is None:
+        return None
+    frame = pd.DataFrame(index.bars(symbol, start, end))
+    if rupees:
+        for column in PAISA_FIELDS:
+            frame[column] = frame[column] / 100
+    return frame
+
+
+class PositionIndex:
+    """The position ledger held as column arrays, answering as-of queries by binary search on date
+
+    Brokers and symbols are held as integer codes; the ledger's rows are
+    sorted by broker, symbol and date, and a stable sort on symbol gives the
+    same rows grouped by symbol, then broker and date. Each row also carries
+    held_buy_quantity and held_buy_amount: what the broker bought of the
+    symbol since the last day it ended holding none.
+    """
+
+    def __init__(self, table):
+        frame = table.to_pandas()
+        self._columns = {name: frame[name].to_numpy() for name in POSITIONS_SCHEMA.names}
+        self._codes = {}
+        self._names = {}
+        for name in ('broker', 'symbol'):
+            self._codes[name], names = pd.factorize(frame[name])
+            self._names[name] = {value: code for code, value in enumerate(names)}
+        self._columns.update(self._held_buys())
+        self._by_broker = self._runs(self._codes['broker'], np.arange(len(frame)))
+        by_symbol = np.argsort(self._codes['symbol'], kind='stable')
+        self._by_symbol = self._runs(self._codes['symbol'][by_symbol], by_symbol)
+
+    def _held_buys(self):
+        """Running buy totals since each row's pair last closed the day flat or short"""
+        columns = self._columns
+        rows = np.arange(len(columns['date']))
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = (self._codes['broker'][1:] != self._codes['broker'][:-1]) | \
+            (self._codes['symbol'][1:] != self._codes['symbol'][:-1])
+        pair_start = np.maximum.accumulate(np.where(first, rows, 0)) if len(rows) else rows
+        flat = columns['buy_quantity'] <= columns['sell_quantity']
+        last_flat = np.maximum.accumulate(np.where(flat, rows, -1)) if len(rows) else rows
+        reset = np.where(last_flat >= pair_start, last_flat, -1)
+        return {f'held_buy_{total}': columns[f'buy_{total}'] - np.where(reset >= 0, columns[f'buy_{total}'][reset], 0)
+                for total in ('quantity', 'amount')}
+
+    @staticmethod
+    def _runs(codes, rows):
+        """{code: rows} for each run of equal codes"""
+        if not len(codes):
+            return {}
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        ends = np.r_[starts[1:], len(codes)]
+        return {int(codes[start]): rows[start:end] for start, end in zip(starts, ends)}
+
+    def _rows(self, kind, key):
+        runs = self._by_broker if kind == 'broker' else self._by_symbol
+        return runs.get(self._names[kind].get(key, -1), np.empty(0, dtype=np.int64))
+
+    def _latest(self, rows, group, date):
+        """Of ``rows`` (grouped by ``group``, dates ascending), the last one per group dated on or before ``date``"""
+        if date:
+            rows = rows[self._columns['date'][rows] <= str(date)]
+        groups = self._codes[group][rows]
+        return rows[np.r_[groups[1:] != groups[:-1], True]] if len(rows) else rows
+
+    def as_of(self, broker=None, symbols=None, date=None):
+        """{column: array} of running totals as of ``date`` for a broker, some symbols, or both"""
+        symbols = [s.upper() for s in symbols] if symbols else None
+        if broker is not None:
+            rows = self._latest(self._rows('broker', str(broker)), 'symbol', date)
+            if symbols:
+                rows = rows[np.isin(self._codes['symbol'][rows], [self._names['symbol'].get(s, -1) for s in symbols])]
+        elif symbols:
+            rows = np.concatenate([self._latest(self._rows('symbol', s), 'broker', date) for s in symbols])
+        else:
+            rows = np.concatenate([self._latest(rows, 'symbol', date) for rows in self._by_broker.values()] or
+                                  [np.empty(0, dtype=np.int64)])
+        return {name: values[rows] for name, values in self._columns.items()}
+
+
+_POSITION_INDEXES = {}
+
+
+def load_position_index(root=None):
+    """The store's PositionIndex, reloaded only when the ledger changes; None if there is none"""
+    path = _path(POSITIONS_FILE, root)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _POSITION_INDEXES.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, PositionIndex(pq.read_table(path, schema=POSITIONS_SCHEMA)))
+        _POSITION_INDEXES[path] = cached
+    return cached[1]
+
+
+def read_positions(broker=None, symbols=None, date=None, root=None, rupees=True):
+    """Net position of a broker (or of every broker in ``symbols``) per symbol as of ``date``
+
+    Each row carries the running buy/sell totals through the last day on or
+    before ``date`` that the broker traded the symbol ('date'), the net
+    quantity and amount, average buy and sell prices, and average_cost: the
+    weighted average buy price of the shares still held, counting buys since
+    the position was last flat (NaN unless the broker holds shares). Without
+    ``date`` the latest totals. Answered from the ledger alone; returns None
+    if the store has none.
+    """
+    index = load_position_index(root)
+    if index is None:
+        return None
+    frame = pd.DataFrame(index.as_of(broker, symbols, date))
+    held_amount, held_quantity = frame.pop('held_buy_amount'), frame.pop('held_buy_quantity')
+    frame['net_quantity'] = frame['buy_quantity'] - frame['sell_quantity']
+    frame['net_amount'] = frame['buy_amount'] - frame['sell_amount']
+    scale = 100 if rupees else 1
+    with np.errstate(invalid='ignore', divide='ignore'):
+        frame['avg_buy_price'] = frame['buy_amount'] / frame['buy_quantity'].where(frame['buy_quantity'] > 0) / scale
+        frame['avg_sell_price'] = frame['sell_amount'] / frame['sell_quantity'].where(frame['sell_quantity'] > 0) / scale
+        frame['average_cost'] = held_amount / held_quantity.where(frame['net_quantity'] > 0) / scale
+    if rupees:
+        for column in ('buy_amount', 'sell_amount', 'net_amount'):
+            frame[column] = frame[column] / 100
+    return frame
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != 'rebuild':
+        print(__doc__.strip())
+        sys.exit(1)
+    rebuild(*sys.argv[2:3])
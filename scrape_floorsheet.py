@@ -1,12 +1,17 @@
 from selenium import webdriver
 from datetime import datetime
-from bs4 import BeautifulSoup
 import pandas as pd
+from floorsheet_extract import HTML_EXTRACTORS, extract_rows_js
+from floorsheet_schema import ParseStats, parse_rows, read_floorsheet_csv, to_rupees
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
+import csv
+import hashlib
+import json
+import os
 import sys
 import time
 
@@ -89,10 +94,108 @@ def setup_driver():
         raise
 
 
-def load_page(driver):
+FLOORSHEET_URL = os.environ.get('NEPSE_FLOORSHEET_URL', "https://www.nepalstock.com/floor-sheet")
+FLOORSHEET_EXTRACTOR = os.environ.get('FLOORSHEET_EXTRACTOR', 'js')
+
+# First data row, row count and active pagination label; changes whenever a new page is rendered
+PAGE_SIGNATURE_JS = """
+const table = document.querySelector('table');
+if (!table) { return null; }
+const rows = table.querySelectorAll('tbody tr');
+const active = document.querySelector('.pagination .active, [aria-current="page"]');
+return [rows.length ? rows[0].innerText : '', rows.length, active ? active.innerText : ''];
+"""
+
+
+class PageWaitStats:
+    """Latency histogram of page transitions, used to size the next wait adaptively"""
+
+    BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+
+    def __init__(self, min_timeout=5, max_timeout=60, headroom=4):
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.headroom = headroom
+        self.samples = []
+        self.timeouts = 0
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, pct, samples=None):
+        samples = self.samples if samples is None else samples
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+    def timeout(self):
+        """Wait budget for the next page: a multiple of the recent p95, within bounds"""
+        if len(self.samples) < 5:
+            return self.max_timeout
+        p95 = self.percentile(95, self.samples[-50:])
+        return min(self.max_timeout, max(self.min_timeout, p95 * self.headroom))
+
+    def histogram(self):
+        """Return (bucket label, count) pairs, upper bounds inclusive"""
+        counts = [0] * (len(self.BUCKETS) + 1)
+        for seconds in self.samples:
+            for i, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+        labels = [f"<={bound}s" for bound in self.BUCKETS] + [f">{self.BUCKETS[-1]}s"]
+        return list(zip(labels, counts))
+
+    def summary(self):
+        if not self.samples:
+            return "No page transitions recorded"
+        lines = [f"Page transitions: {len(self.samples)}, timeouts: {self.timeouts}, "
+                 f"p50: {self.percentile(50):.2f}s, p95: {self.percentile(95):.2f}s, "
+                 f"max: {max(self.samples):.2f}s"]
+        for label, count in self.histogram():
+            if count:
+                lines.append(f"  {label:>7} {count}")
+        return "\n".join(lines)
+
+
+PAGE_WAIT_STATS = PageWaitStats()
+
+
+def page_signature(driver):
+    """Snapshot of what is currently rendered in the floor sheet table"""
+    try:
+        return driver.execute_script(PAGE_SIGNATURE_JS)
+    except Exception:
+        return None
+
+
+def wait_for_page_change(driver, before, stats=None, timeout=None):
+    """Block until the table shows something other than ``before``; returns seconds waited or None on timeout"""
+    stats = stats or PAGE_WAIT_STATS
+    timeout = timeout or stats.timeout()
+    start = time.monotonic()
+    
+    def changed(d):
+        current = page_signature(d)
+        return current is not None and current[1] > 0 and current != before
+    
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.05).until(changed)
+    except TimeoutException:
+        stats.timeouts += 1
+        return None
+    elapsed = time.monotonic() - start
+    stats.record(elapsed)
+    return elapsed
+
+
+def load_page(driver, url=FLOORSHEET_URL):
     """Load the Nepal Stock floor sheet page"""
     try:
-        driver.get("https://www.nepalstock.com/floor-sheet")
+        driver.get(url)
         # Wait for the page to load completely
         WebDriverWait(driver, 20).until(
             EC.presence_of_element_located((By.TAG_NAME, "table"))
@@ -115,8 +218,14 @@ def set_items_per_page(driver, items_count=10):
             EC.presence_of_element_located((By.NAME, "items_per_page"))
         )
         select = Select(items_dropdown)
+        if select.first_selected_option.get_attribute('value') == str(items_count):
+            print(f"Items per page already {items_count}")
+            return True
+        before = page_signature(driver)
         select.select_by_value(str(items_count))
-        time.sleep(2)  # Wait for the page to reload
+        # The first row may legitimately stay the same, so a timeout here is not an error
+        if wait_for_page_change(driver, before, timeout=10) is None:
+            print("Table did not re-render after changing items per page")
         print(f"Set items per page to {items_count}")
         return True
     except Exception as e:
@@ -124,40 +233,52 @@ def set_items_per_page(driver, items_count=10):
         return False
 
 
-def get_table_data(driver):
-    """Extract table data from the current page"""
+def check_extractor(name):
+    """Return ``name`` if it is a known extractor; raises ValueError otherwise"""
+    if name != 'js' and name not in HTML_EXTRACTORS:
+        raise ValueError(f"Unknown floor sheet extractor '{name}'. Available: js, {', '.join(HTML_EXTRACTORS)}")
+    return name
+
+
+def get_table_rows(driver, extractor=None):
+    """Extract the raw cell text of every table row on the current page
+    
+    ``extractor`` (default FLOORSHEET_EXTRACTOR) is 'js' to read the cells
+    in the browser, or one of floorsheet_extract.HTML_EXTRACTORS to parse
+    page_source; 'js' falls back to 'lxml' if the script fails. An unknown
+    extractor raises ValueError rather than reading as an empty page.
+    """
+    name = check_extractor(extractor or FLOORSHEET_EXTRACTOR)
     try:
         # Wait for table to be present
         WebDriverWait(driver, 10).until(
             EC.presence_of_element_located((By.TAG_NAME, "table"))
         )
         
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        
-        # Find the main data table
-        table = soup.find("table")
-        if not table:
-            print("No table found on the page")
-            return pd.DataFrame()
-        
-        rows = []
-        for row in table.find_all("tr"):
-            cells = row.find_all(["th", "td"])
-            row_data = [cell.get_text(strip=True) for cell in cells]
-            if row_data:  # Only add non-empty rows
-                rows.append(row_data)
+        rows = None
+        if name == 'js':
+            rows = extract_rows_js(driver)
+            name = 'lxml'
+        if rows is None:
+            rows = HTML_EXTRACTORS[name](driver.page_source)
         
         if rows:
-            df = pd.DataFrame(rows)
-            print(f"Extracted {len(df)} rows from current page")
-            return df
+            print(f"Extracted {len(rows)} rows from current page")
         else:
             print("No data rows found in table")
-            return pd.DataFrame()
+        return rows
             
     except Exception as e:
         print(f"Error extracting table data: {str(e)}")
-        return pd.DataFrame()
+        return []
+
+
+def get_table_data(driver):
+    """Extract table data from the current page"""
+    rows = get_table_rows(driver)
+    if rows:
+        return pd.DataFrame(rows)
+    return pd.DataFrame()
 
 
 def has_next_page(driver):
@@ -175,36 +296,250 @@ def has_next_page(driver):
         return False, None
 
 
-def go_to_next_page(driver):
-    """Navigate to the next page"""
+class PageLoadTimeout(Exception):
+    """The next page was requested but never rendered; the pages after it are unknown, not absent"""
+
+
+def go_to_next_page(driver, stats=None):
+    """Navigate to the next page and wait until its rows have replaced the current ones
+
+    Returns False when there is no next page; raises PageLoadTimeout when
+    there is one that did not render in time, so the run is retried rather
+    than saved short.
+    """
     try:
         has_next, next_btn = has_next_page(driver)
         if has_next and next_btn:
+            before = page_signature(driver)
             driver.execute_script("arguments[0].click();", next_btn)
-            time.sleep(3)  # Wait for page to load
+            if wait_for_page_change(driver, before, stats) is None:
+                raise PageLoadTimeout("Timed out waiting for the next page to render")
             return True
         return False
+    except PageLoadTimeout:
+        raise
     except Exception as e:
         print(f"Error navigating to next page: {str(e)}")
         return False
 
 
-def scrape_all_data(driver):
-    """Scrape data from all pages"""
-    all_data = pd.DataFrame()
+class RowBufferSink:
+    """Append-only row buffer that scraped pages are pushed into.
+
+    Each page costs a single ``list.extend`` regardless of how many rows were
+    collected before it; the DataFrame is only built once in ``to_frame``.
+    With ``typed=True`` that frame follows floorsheet_schema.SCHEMA.
+    """
+
+    def __init__(self, typed=False):
+        self.rows = []
+        self.pages = 0
+        self.typed = typed
+        self.parse_stats = None
+
+    def add_rows(self, rows):
+        """Append one page worth of rows"""
+        self.rows.extend(rows)
+        self.pages += 1
+
+    def __len__(self):
+        return len(self.rows)
+
+    def to_frame(self):
+        """Materialize the collected rows as a DataFrame"""
+        if not self.rows:
+            return pd.DataFrame()
+        if self.typed:
+            self.parse_stats = ParseStats()
+            return parse_rows(self.rows, self.parse_stats)
+        return pd.DataFrame(self.rows)
+
+    def close(self):
+        pass
+
+
+class CsvSpoolSink:
+    """Row sink that streams pages straight to a CSV spool file on disk.
+
+    Memory use stays at one page no matter how long the floorsheet is; the
+    spool is read back once by ``to_frame`` (typed per floorsheet_schema
+    when ``typed=True``).
+    """
+
+    def __init__(self, path, mode='w', typed=False):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.pages = 0
+        self.row_count = 0
+        self.width = 0
+        self.typed = typed
+        self.parse_stats = None
+        self._file = open(path, mode, newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+
+    def add_rows(self, rows):
+        """Append one page worth of rows to the spool file"""
+        self._writer.writerows(rows)
+        self._file.flush()
+        for row in rows:
+            if len(row) > self.width:
+                self.width = len(row)
+        self.row_count += len(rows)
+        self.pages += 1
+
+    def __len__(self):
+        return self.row_count
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def to_frame(self):
+        """Read the spool back as a single DataFrame"""
+        self.close()
+        if not self.row_count:
+            return pd.DataFrame()
+        if self.typed:
+            self.parse_stats = ParseStats()
+            return read_floorsheet_csv(self.path, self.parse_stats)
+        return pd.read_csv(self.path, header=None, names=list(range(self.width)),
+                           dtype=str, keep_default_na=False, na_values=[''])
+
+
+class CheckpointSink(CsvSpoolSink):
+    """CSV spool sink that journals every page so an interrupted scrape can resume.
+
+    Each committed page appends one JSON line (page index, row count, content
+    hash, spool offset) to the journal after its rows are on disk. On restart
+    the journal is replayed, any half-written tail of the spool is cut off and
+    ``next_page`` tells the backend where to pick up.
+    """
+
+    def __init__(self, checkpoint_dir, date, backend, page_size, typed=False):
+        self.journal_path = os.path.join(checkpoint_dir, f"nepal_stock_floorsheet_{date}.{backend}.journal")
+        spool_path = os.path.join(checkpoint_dir, f"nepal_stock_floorsheet_{date}.{backend}.partial.csv")
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        header = {'date': date, 'backend': backend, 'page_size': page_size}
+        
+        entries = self._load_journal(header, spool_path)
+        if entries:
+            offset = entries[-1]['offset']
+            with open(spool_path, 'r+b') as f:
+                f.truncate(offset)
+            super().__init__(spool_path, mode='a', typed=typed)
+            self.pages = len(entries)
+            self.row_count = sum(entry['rows'] for entry in entries)
+            self.width = max(entry['width'] for entry in entries)
+            print(f"Resuming from checkpoint: {self.pages} pages, {self.row_count} rows already stored")
+        else:
+            super().__init__(spool_path, typed=typed)
+        # Drop any torn or unverified tail so new entries follow the last verified one
+        self._rewrite_journal(header, entries)
+        self.next_page = self.pages
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+
+    def _rewrite_journal(self, header, entries):
+        """Atomically replace the journal with ``header`` followed by ``entries``"""
+        tmp_path = self.journal_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as journal:
+            for line in [header] + entries:
+                journal.write(json.dumps(line) + '\n')
+            journal.flush()
+            os.fsync(journal.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+    @staticmethod
+    def page_hash(rows):
+        return hashlib.sha256(json.dumps(rows, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+    def _load_journal(self, header, spool_path):
+        """Return the committed entries whose rows verify against the spool file"""
+        if not (os.path.exists(self.journal_path) and os.path.exists(spool_path)):
+            return []
+        with open(self.journal_path, encoding='utf-8') as journal:
+            lines = journal.read().splitlines()
+        try:
+            if not lines or json.loads(lines[0]) != header:
+                print("Checkpoint belongs to a different run configuration, starting over")
+                return []
+        except ValueError:
+            return []
+        
+        entries = []
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break  # torn final line from a crash mid-write
+            if entry.get('page') != len(entries):
+                break
+            entries.append(entry)
+        
+        # Re-hash the spooled rows page by page and keep the verified prefix
+        verified = []
+        with open(spool_path, newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            for entry in entries:
+                rows = [row for _, row in zip(range(entry['rows']), reader)]
+                if len(rows) != entry['rows'] or self.page_hash(rows) != entry['sha256']:
+                    print(f"Checkpoint page {entry['page'] + 1} does not match stored rows, resuming before it")
+                    break
+                verified.append(entry)
+        return verified
+
+    def add_rows(self, rows):
+        """Write one page to the spool, fsync it, then commit it to the journal"""
+        rows = [[str(cell) for cell in row] for row in rows]
+        super().add_rows(rows)
+        os.fsync(self._file.fileno())
+        entry = {
+            'page': self.next_page,
+            'rows': len(rows),
+            'sha256': self.page_hash(rows),
+            'offset': self._file.tell(),
+            'width': self.width,
+        }
+        self._journal.write(json.dumps(entry) + '\n')
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self.next_page += 1
+
+    def close(self):
+        super().close()
+        if not self._journal.closed:
+            self._journal.close()
+
+    def finish(self):
+        """Remove the journal and spool once the day's CSV has been written"""
+        self.close()
+        for path in (self.journal_path, self.path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def iter_pages(driver, start_page=0, extractor=None):
+    """Yield the rows of every page, one list per page, from ``start_page`` onwards"""
     page_count = 0
     
+    # Walk past pages that are already stored without extracting them
+    while page_count < start_page:
+        if not go_to_next_page(driver):
+            print(f"Could not reach page {start_page + 1}, only {page_count + 1} pages available")
+            return
+        page_count += 1
+    
     while True:
         page_count += 1
         print(f"Scraping page {page_count}")
         
         # Get data from current page
-        page_data = get_table_data(driver)
+        page_rows = get_table_rows(driver, extractor)
         
-        if not page_data.empty:
-            all_data = pd.concat([all_data, page_data], ignore_index=True)
-        else:
+        if not page_rows:
             print("No data found on current page")
+        yield page_rows
         
         # Try to go to next page
         if not go_to_next_page(driver):
@@ -212,10 +547,109 @@ def scrape_all_data(driver):
             break
     
     print(f"Total pages scraped: {page_count}")
+    print(PAGE_WAIT_STATS.summary())
+
+
+def scrape_all_data(driver, sink=None):
+    """Scrape data from all pages into ``sink`` and return the collected rows"""
+    if sink is None:
+        sink = RowBufferSink()
+    
+    for page_rows in iter_pages(driver):
+        sink.add_rows(page_rows)
+    
+    all_data = sink.to_frame()
     print(f"Total rows collected: {len(all_data)}")
     return all_data
 
 
+class SeleniumFetcher:
+    """Browser backend: drives headless Chrome through the floor sheet pages"""
+
+    name = 'selenium'
+
+    def __init__(self, items_per_page=10, extractor=None):
+        self.items_per_page = items_per_page
+        self.page_size = items_per_page
+        # Checked when the backends are built, before any browser starts
+        self.extractor = check_extractor(extractor or FLOORSHEET_EXTRACTOR)
+        self.driver = None
+
+    def open(self):
+        print("Initializing Chrome driver...")
+        self.driver = setup_driver()
+        
+        print("Loading Nepal Stock floor sheet page...")
+        if not load_page(self.driver):
+            raise RuntimeError("Failed to load the floor sheet page")
+        
+        # Set items per page to maximum for efficiency
+        print("Setting items per page...")
+        set_items_per_page(self.driver, self.items_per_page)
+
+    def iter_pages(self, start_page=0):
+        return iter_pages(self.driver, start_page, self.extractor)
+
+    def close(self):
+        if self.driver:
+            try:
+                self.driver.quit()
+                print("Browser closed successfully.")
+            except Exception as e:
+                print(f"Error closing browser: {str(e)}")
+            self.driver = None
+
+
+def get_backends(names=None):
+    """Build fetcher backends in fallback order from a comma separated list of names.
+    
+    Defaults to the FLOORSHEET_BACKENDS environment variable, or "http,selenium"
+    (the direct JSON fetcher with the browser kept as a fallback).
+    """
+    from floorsheet_http import FLOORSHEET_RATE_LIMIT, FLOORSHEET_WORKERS, HttpFetcher
+    
+    available = {
+        'http': lambda: HttpFetcher(workers=FLOORSHEET_WORKERS, rate_limit=FLOORSHEET_RATE_LIMIT),
+        'selenium': SeleniumFetcher,
+    }
+    names = names or os.environ.get('FLOORSHEET_BACKENDS', 'http,selenium')
+    backends = []
+    for name in names.split(','):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in available:
+            raise ValueError(f"Unknown floor sheet backend '{name}'. Available: {', '.join(available)}")
+        backends.append(available[name]())
+    return backends
+
+
+def scrape_with_backends(backends, sink_factory=None):
+    """Scrape with the first backend that produces data, falling back to the next one on failure
+    
+    ``sink_factory`` is called with each fetcher and returns the sink its pages
+    are pushed into; sinks with a ``next_page`` (checkpoints) resume from there.
+    """
+    for fetcher in backends:
+        print(f"Using '{fetcher.name}' backend...")
+        sink = sink_factory(fetcher) if sink_factory else RowBufferSink()
+        try:
+            fetcher.open()
+            for page_rows in fetcher.iter_pages(start_page=getattr(sink, 'next_page', 0)):
+                sink.add_rows(page_rows)
+            data = sink.to_frame()
+            if not data.empty:
+                print(f"Total rows collected: {len(data)}")
+                return data
+            print(f"'{fetcher.name}' backend returned no data")
+        except Exception as e:
+            print(f"'{fetcher.name}' backend failed: {str(e)}")
+        finally:
+            sink.close()
+            fetcher.close()
+    return pd.DataFrame()
+
+
 def clean_data(df):
     """Clean and process the scraped data"""
     if df.empty:
@@ -273,76 +707,58 @@ def main():
     if os.environ.get('GITHUB_ACTIONS'):
         print("Running in GitHub Actions environment")
     
-    driver = None
+    today = datetime.today().strftime('%Y-%m-%d')
+    checkpoint_dir = os.environ.get('FLOORSHEET_CHECKPOINT_DIR', os.path.join('data', '.checkpoints'))
+    sinks = []
+    
+    def checkpoint_sink(fetcher):
+        sink = CheckpointSink(checkpoint_dir, today, fetcher.name, fetcher.page_size, typed=True)
+        sinks.append(sink)
+        return sink
+    
     try:
-        # Initialize driver
-        print("Initializing Chrome driver...")
-        driver = setup_driver()
-        print("Chrome driver initialized successfully")
-        
-        # Load the main page
-        print("Loading Nepal Stock floor sheet page...")
-        if not load_page(driver):
-            print("Failed to load the main page. Exiting.")
-            return
-        
-        print("Page loaded successfully")
-        
-        # Set items per page to maximum for efficiency
-        print("Setting items per page...")
-        set_items_per_page(driver, 10)  # You can change this to 25, 50, 100 if available
-        
-        # Scrape all data
+        # Scrape all data, falling back through the configured backends;
+        # pages are journaled as they arrive so a rerun today resumes
         print("Starting data extraction...")
-        raw_data = scrape_all_data(driver)
+        floorsheet = scrape_with_backends(get_backends(), checkpoint_sink)
         
-        if raw_data.empty:
+        if floorsheet.empty:
             print("No data was scraped. Please check the website structure.")
             return
         
-        print(f"Raw data extracted. Shape: {raw_data.shape}")
-        
-        # Clean the data
-        print("Cleaning data...")
-        cleaned_data = clean_data(raw_data)
-        
-        if cleaned_data.empty:
-            print("No data remaining after cleaning.")
-            return
-        
-        print(f"Data cleaned successfully. Shape: {cleaned_data.shape}")
+        # Rows were parsed into typed columns when the spool was read back
+        if sinks and sinks[-1].parse_stats:
+            print(sinks[-1].parse_stats.summary())
+        print(f"Data parsed successfully. Shape: {floorsheet.shape}")
         
         # Save to CSV
-        today = datetime.today().strftime('%Y-%m-%d')
         filename = f"data/nepal_stock_floorsheet_{today}.csv"
         
         # Create data directory if it doesn't exist
         import os
         os.makedirs("data", exist_ok=True)
         
-        cleaned_data.to_csv(filename, index=False)
-        print(f"Data saved to {filename}")
-        print(f"Total records saved: {len(cleaned_data)}")
+        storage = [name.strip() for name in os.environ.get('FLOORSHEET_STORAGE', 'csv,parquet').split(',')]
+        if 'csv' in storage:
+            to_rupees(floorsheet).to_csv(filename, index=False, float_format='%.2f')
+            print(f"Data saved to {filename}")
+        if 'parquet' in storage:
+            from floorsheet_store import ingest_day
+            ingest_day(floorsheet, today)
+        print(f"Total records saved: {len(floorsheet)}")
+        
+        # The day is complete, drop the checkpoints
+        for sink in sinks:
+            sink.finish()
         
         # Display sample of the data
         print("\nFirst 5 rows of scraped data:")
-        print(cleaned_data.head())
+        print(floorsheet.head())
         
     except Exception as e:
         print(f"An error occurred during scraping: {str(e)}")
         import traceback
         traceback.print_exc()
-    
-    finally:
-        # Always close the driver
-        if driver:
-            try:
-                driver.quit()
-                print("Browser closed successfully.")
-            except Exception as e:
-                print(f"Error closing browser: {str(e)}")
-        else:
-            print("No browser to close.")
 
 
 if __name__ == "__main__":
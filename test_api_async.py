@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the ASGI serving mode against a local stub of the GitHub contents API
+"""
+
+import asyncio
+import os
+import time
+
+import pytest
+
+httpx = pytest.importorskip('httpx')
+pytest.importorskip('a2wsgi')
+
+import api_async
+import api_server
+from fixture_server import GitHubStub
+from conftest import DATES, write_csv_days
+
+
+@pytest.fixture
+def stub(tmp_path):
+    write_csv_days(str(tmp_path))
+    files = {name: (tmp_path / name).read_text() for name in os.listdir(tmp_path)}
+    with GitHubStub(files, latency=0.05) as server:
+        yield server
+
+
+def async_source(stub, **kwargs):
+    return api_async.AsyncGitHubDataSource(stub.base_url, **kwargs)
+
+
+def get_all(app, paths):
+    """Issue every request at once through the ASGI app and return the responses in order"""
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://testserver') as client:
+            return await asyncio.gather(*(client.get(path) for path in paths))
+    return asyncio.run(run())
+
+
+def test_routes_answer_like_the_wsgi_app(stub, monkeypatch):
+    monkeypatch.setattr(api_server, 'nepse_api', api_server.NEPSEDataAPI(api_server.GitHubDataSource(stub.base_url)))
+    paths = ['/api/files', f'/api/data/nepal_stock_floorsheet_{DATES[0]}.csv?limit=5', '/api/latest?limit=3',
+             '/api/stock/sym7', '/api/stats', '/api/data/missing.csv']
+    wsgi = api_server.app.test_client()
+    expected = [(r.status_code, r.get_json()) for r in (wsgi.get(path) for path in paths)]
+
+    source = async_source(stub)
+    try:
+        app = api_async.create_app(source)
+        responses = get_all(app, paths)
+    finally:
+        source.close()
+    assert [(r.status_code, r.json()) for r in responses] == expected
+
+
+def test_concurrent_requests_share_one_upstream_fetch_per_file(stub):
+    source = async_source(stub)
+    try:
+        app = api_async.create_app(source)
+        start = time.perf_counter()
+        responses = get_all(app, ['/api/stock/SYM7'] * 20)
+        elapsed = time.perf_counter() - start
+        metrics = api_server.nepse_api.metrics()
+    finally:
+        source.close()
+    assert {r.status_code for r in responses} == {200}
+    assert len({r.content for r in responses}) == 1
+    # One listing and one download per day, however many requests wanted them
+    assert stub.requests == {'': 1, **{f'nepal_stock_floorsheet_{d}.csv': 1 for d in DATES}}
+    assert metrics['upstream']['requests'] == 1 + len(DATES) and metrics['single_flight']['followers'] > 0
+    # The day files were downloaded side by side, not one after another
+    assert stub.max_in_flight == len(DATES)
+    assert elapsed < 20 * stub.latency
+
+
+def test_slow_upstream_fails_the_request_after_the_timeout(stub):
+    stub.latency = 2.0
+    source = async_source(stub, request_timeout=0.2)
+    try:
+        app = api_async.create_app(source)
+        start = time.perf_counter()
+        response, = get_all(app, ['/api/stock/SYM7'])
+        elapsed = time.perf_counter() - start
+        timeouts = source.stats()['timeouts']
+    finally:
+        source.close()
+    assert elapsed < 1.5
+    assert response.status_code == 504 and timeouts == 1
+    assert response.json() == {'success': False, 'error': 'Upstream data source timed out'}
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,559 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the REST API served from a local data directory
+"""
+
+import gzip
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import api_server
+import floorsheet_store
+from conftest import DATES, write_csv_days
+from fixture_server import GitHubStub
+from floorsheet_schema import read_floorsheet_csv, to_rupees
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    days = write_csv_days(str(tmp_path))
+    return str(tmp_path), days
+
+
+def client_for(monkeypatch, source):
+    monkeypatch.setattr(api_server, 'nepse_api', api_server.NEPSEDataAPI(source))
+    return api_server.app.test_client()
+
+
+@pytest.fixture
+def client(data_dir, monkeypatch):
+    directory, _ = data_dir
+    return client_for(monkeypatch, api_server.LocalDataSource(directory))
+
+
+def test_auto_source_prefers_local_files(data_dir, tmp_path_factory):
+    directory, _ = data_dir
+    assert isinstance(api_server.make_data_source('auto', directory), api_server.LocalDataSource)
+    empty = str(tmp_path_factory.mktemp('empty'))
+    assert isinstance(api_server.make_data_source('auto', empty), api_server.GitHubDataSource)
+    with pytest.raises(ValueError):
+        api_server.make_data_source('ftp')
+
+
+def test_files_are_listed_in_name_order_with_versions(client):
+    body = client.get('/api/files').get_json()
+    assert body['success'] and body['count'] == len(DATES)
+    assert [f['name'] for f in body['files']] == [f'nepal_stock_floorsheet_{d}.csv' for d in DATES]
+    assert all(f['version'] and f['size'] > 0 for f in body['files'])
+
+
+def test_data_latest_and_stock_read_from_disk(client, data_dir):
+    _, days = data_dir
+    body = client.get(f'/api/data/nepal_stock_floorsheet_{DATES[0]}.csv?limit=3').get_json()
+    assert body['records'] == 3 and body['data'][0]['Contract No.'] == int(days[DATES[0]]['Contract No.'].iloc[0])
+
+    body = client.get('/api/latest?limit=5').get_json()
+    assert body['date'] == DATES[-1] and body['records'] == 5
+
+    symbol = days[DATES[-1]]['Stock Symbol'].iloc[0]
+    body = client.get(f'/api/stock/{symbol.lower()}').get_json()
+    expected = sum(int((day['Stock Symbol'] == symbol).sum()) for day in days.values())
+    assert body['records'] == expected
+
+
+class CountingSource(api_server.LocalDataSource):
+    def __init__(self, data_dir):
+        super().__init__(data_dir)
+        self.listings = 0
+        self.reads = 0
+
+    def list_files(self):
+        self.listings += 1
+        return super().list_files()
+
+    def read_dataframe(self, filename):
+        self.reads += 1
+        return super().read_dataframe(filename)
+
+
+def test_parsed_frames_and_listing_are_cached(data_dir, monkeypatch):
+    directory, days = data_dir
+    source = CountingSource(directory)
+    api = api_server.NEPSEDataAPI(source, listing_ttl=60)
+    monkeypatch.setattr(api_server, 'nepse_api', api)
+    client = api_server.app.test_client()
+
+    for _ in range(3):
+        client.get('/api/latest')
+    assert source.reads == 1 and source.listings == 1
+
+    # A rewritten file gets a new version and is parsed again once the listing expires
+    path = os.path.join(directory, f'nepal_stock_floorsheet_{DATES[-1]}.csv')
+    days[DATES[-1]].head(7).to_csv(path, index=False)
+    os.utime(path, ns=(1, 1))
+    api.listing_ttl = api.listing_stale = 0
+    assert client.get('/api/latest?limit=100').get_json()['records'] == 7
+    assert source.reads == 2
+
+    metrics = client.get('/api/metrics').get_json()
+    assert metrics['frame_cache']['hits'] == 2 and metrics['frame_cache']['misses'] == 2
+    assert metrics['frame_cache']['entries'] == 2 and metrics['frame_cache']['bytes'] > 0
+
+
+def github_stub(directory, latency):
+    return GitHubStub({name: open(os.path.join(directory, name)).read()
+                       for name in os.listdir(directory) if name.endswith('.csv')}, latency=latency)
+
+
+def test_concurrent_cold_requests_share_one_upstream_call_per_resource(data_dir, monkeypatch):
+    directory, _ = data_dir
+    with github_stub(directory, latency=0.1) as stub:
+        client = client_for(monkeypatch, api_server.GitHubDataSource(stub.base_url))
+        with ThreadPoolExecutor(30) as pool:
+            responses = list(pool.map(lambda _: client.get('/api/latest?limit=5'), range(30)))
+    assert {r.status_code for r in responses} == {200}
+    assert all(r.get_json() == responses[0].get_json() for r in responses)
+    assert stub.requests == {'': 1, f'nepal_stock_floorsheet_{DATES[-1]}.csv': 1}
+    flights = api_server.nepse_api.metrics()['single_flight']
+    assert flights['leaders'] == 2 and flights['followers'] > 0 and flights['in_flight'] == 0
+
+
+def test_cursors_cannot_name_files_outside_the_listing(data_dir, monkeypatch):
+    directory, _ = data_dir
+    with github_stub(directory, latency=0) as stub:
+        source = api_server.GitHubDataSource(stub.base_url)
+        client = client_for(monkeypatch, source)
+        for name in ('../../../other/private-repo/contents/x.csv', 'nepal_stock_floorsheet_2030-01-01.csv'):
+            cursor = api_server.encode_cursor(name, 0)
+            assert client.get(f'/api/latest?cursor={cursor}').status_code == 400
+        assert source.read_text('../secrets/x.csv') is None
+        assert set(stub.requests) == {''}
+
+
+def test_stale_listing_is_served_while_one_refresh_runs(data_dir, monkeypatch):
+    directory, _ = data_dir
+    with github_stub(directory, latency=0.3) as stub:
+        api = api_server.NEPSEDataAPI(api_server.GitHubDataSource(stub.base_url), listing_ttl=0.05, listing_stale=60)
+        assert len(api.get_csv_files()) == len(DATES)
+        stub.files['nepal_stock_floorsheet_2025-06-25.csv'] = stub.files[f'nepal_stock_floorsheet_{DATES[-1]}.csv']
+        time.sleep(0.1)
+
+        start = time.perf_counter()
+        listings = [api.get_csv_files() for _ in range(10)]
+        assert time.perf_counter() - start < stub.latency
+        assert all(len(files) == len(DATES) for files in listings)
+
+        # The one background refresh lands and the new day shows up
+        deadline = time.monotonic() + 5
+        while len(api.get_csv_files()) == len(DATES) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert len(api.get_csv_files()) == len(DATES) + 1
+        assert stub.requests[''] == 2 and api.listing_stale_hits >= 10
+
+
+def test_failed_listing_refresh_keeps_the_last_listing(data_dir):
+    directory, _ = data_dir
+    with github_stub(directory, latency=0) as stub:
+        api = api_server.NEPSEDataAPI(api_server.GitHubDataSource(stub.base_url), listing_ttl=0.05, listing_stale=60)
+        assert len(api.get_csv_files()) == len(DATES)
+        fetched_at = api._listing_at
+        stub.listing_status = 403
+        time.sleep(0.1)
+
+        # The stale listing is served while the background refresh is rate limited
+        assert len(api.get_csv_files()) == len(DATES)
+        deadline = time.monotonic() + 5
+        while (stub.requests[''] < 2 or api.flights.stats()['in_flight']) and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert len(api.get_csv_files()) == len(DATES) and api._listing_at == fetched_at
+
+        # Past the stale window a failed fetch still answers with the last good listing
+        api.listing_stale = 0
+        assert len(api.get_csv_files()) == len(DATES)
+        assert stub.requests[''] >= 3 and api._listing_at == fetched_at
+
+        stub.listing_status = 200
+        assert len(api.get_csv_files()) == len(DATES) and api._listing_at > fetched_at
+
+
+def test_single_flight_shares_errors_with_waiting_callers():
+    flights = api_server.SingleFlight()
+    started = threading.Event()
+
+    def fail():
+        started.set()
+        time.sleep(0.1)
+        raise OSError('upstream down')
+
+    def call(func):
+        try:
+            return flights.do('key', func)
+        except OSError as e:
+            return str(e)
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(call, fail)
+        started.wait()
+        follower = pool.submit(call, lambda: 'not called')
+        assert leader.result() == follower.result() == 'upstream down'
+    assert flights.stats() == {'in_flight': 0, 'leaders': 1, 'followers': 1}
+    assert flights.do('key', lambda: 'next') == 'next'
+
+
+def test_frame_cache_evicts_least_recently_used_by_bytes(data_dir):
+    directory, _ = data_dir
+    frames = [api_server.LocalDataSource(directory).read_dataframe(f'nepal_stock_floorsheet_{d}.csv') for d in DATES]
+    size = int(frames[0].memory_usage(index=True, deep=True).sum())
+    cache = api_server.FrameCache(max_bytes=int(size * 2.5))
+    cache.put('a', frames[0])
+    cache.put('b', frames[1])
+    assert cache.get('a') is frames[0]  # 'b' is now least recently used
+    cache.put('c', frames[2])
+    assert cache.get('b') is None and cache.get('a') is frames[0] and cache.get('c') is frames[2]
+    assert cache.evictions == 1 and cache.bytes <= cache.max_bytes
+
+
+def test_stock_queries_use_the_symbol_index(data_dir, monkeypatch):
+    directory, days = data_dir
+    scanned = client_for(monkeypatch, api_server.LocalDataSource(directory, parquet_root=os.path.join(directory, 'none')))
+    symbol = days[DATES[-1]]['Stock Symbol'].iloc[0]
+    expected = scanned.get(f'/api/stock/{symbol}').get_json()
+
+    root = os.path.join(directory, 'parquet')
+    for date in DATES:
+        floorsheet_store.ingest_day(read_floorsheet_csv(os.path.join(directory, f'nepal_stock_floorsheet_{date}.csv')),
+                                    date, root)
+    source = CountingSource(directory)
+    indexed = client_for(monkeypatch, source)
+    assert indexed.get(f'/api/stock/{symbol}').get_json() == expected
+    assert source.reads == 0
+
+    body = indexed.get(f'/api/stock/{symbol}?start={DATES[1]}&end={DATES[1]}').get_json()
+    assert {row['Date'] for row in body['data']} == {DATES[1]}
+    assert body == scanned.get(f'/api/stock/{symbol}?start={DATES[1]}&end={DATES[1]}').get_json()
+
+
+def test_broker_endpoint_answers_from_the_index(data_dir, monkeypatch):
+    directory, days = data_dir
+    assert client_for(monkeypatch, api_server.LocalDataSource(directory)).get('/api/broker/5').status_code == 404
+
+    root = os.path.join(directory, 'parquet')
+    for date in DATES:
+        floorsheet_store.ingest_day(read_floorsheet_csv(os.path.join(directory, f'nepal_stock_floorsheet_{date}.csv')),
+                                    date, root)
+    client = client_for(monkeypatch, api_server.LocalDataSource(directory))
+    trades = pd.concat([day.assign(Date=date) for date, day in days.items()])
+    buyer, seller = trades['Buyer'].astype(str), trades['Seller'].astype(str)
+    bought = trades[buyer == '5']
+    sold = trades[seller == '5']
+
+    body = client.get('/api/broker/5?limit=3').get_json()
+    assert body['totals']['buy']['quantity'] == int(bought['Quantity'].sum())
+    assert body['totals']['sell']['trades'] == len(sold)
+    assert body['totals']['net_quantity'] == int(bought['Quantity'].sum() - sold['Quantity'].sum())
+    assert body['total_records'] == len(trades[(buyer == '5') | (seller == '5')])
+    assert body['records'] == 3 and body['data'][0]['Date'] == DATES[-1]
+    assert sum(row['buy_quantity'] for row in body['by_symbol']) == body['totals']['buy']['quantity']
+
+    body = client.get(f'/api/broker/5?side=sell&start={DATES[1]}&end={DATES[1]}').get_json()
+    expected = sold[sold['Date'] == DATES[1]]
+    assert body['totals']['buy']['trades'] == 0 and body['totals']['sell']['trades'] == len(expected)
+    assert sorted(row['Contract No.'] for row in body['data']) == sorted(expected['Contract No.'].tolist())
+    assert client.get('/api/broker/5?side=both').status_code == 400
+
+
+def test_positions_endpoint_answers_from_the_ledger(data_dir, monkeypatch):
+    directory, days = data_dir
+    assert client_for(monkeypatch, api_server.LocalDataSource(directory)).get('/api/positions/5').status_code == 404
+
+    root = os.path.join(directory, 'parquet')
+    for date in DATES:
+        floorsheet_store.ingest_day(read_floorsheet_csv(os.path.join(directory, f'nepal_stock_floorsheet_{date}.csv')),
+                                    date, root)
+    source = CountingSource(directory)
+    client = client_for(monkeypatch, source)
+    trades = pd.concat([day.assign(Date=date) for date, day in days.items() if date <= DATES[1]])
+    bought = trades[trades['Buyer'].astype(str) == '5']
+    sold = trades[trades['Seller'].astype(str) == '5']
+
+    body = client.get(f'/api/positions/5?date={DATES[1]}').get_json()
+    assert source.reads == 0 and source.listings == 0
+    assert body['as_of'] == DATES[1] and body['records'] == len(set(bought['Stock Symbol']) | set(sold['Stock Symbol']))
+    assert body['totals']['net_quantity'] == int(bought['Quantity'].sum() - sold['Quantity'].sum())
+    gross = [row['buy_amount'] + row['sell_amount'] for row in body['data']]
+    assert gross == sorted(gross, reverse=True)
+    row = body['data'][0]
+    assert row['last_trade_date'] <= DATES[1] and row['net_quantity'] == row['buy_quantity'] - row['sell_quantity']
+    symbol_trades = bought[bought['Stock Symbol'] == row['symbol']]
+    assert row['buy_quantity'] == symbol_trades['Quantity'].sum()
+    assert row['buy_amount'] == pytest.approx(symbol_trades['Amount (Rs)'].sum())
+
+    one = client.get(f"/api/positions/5?symbol={row['symbol'].lower()}&date={DATES[1]}").get_json()
+    assert one['data'] == [row]
+    holders = client.get('/api/positions?symbol=SYM7').get_json()
+    assert {r['symbol'] for r in holders['data']} == {'SYM7'} and holders['totals']['net_quantity'] == 0
+    assert client.get('/api/positions').status_code == 400
+    assert client.get('/api/positions/5?date=June').status_code == 400
+    table = pa.ipc.open_stream(client.get('/api/positions/5?format=arrow').data).read_all()
+    assert 'average_cost' in table.column_names
+
+
+def test_streamed_responses_match_plain_json(client, monkeypatch):
+    monkeypatch.setattr(api_server, 'STREAM_BATCH_ROWS', 64)
+    url = f'/api/data/nepal_stock_floorsheet_{DATES[0]}.csv'
+    plain = client.get(url).get_json()
+
+    response = client.get(url + '?format=ndjson')
+    assert response.is_streamed and response.mimetype == 'application/x-ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line) for line in lines] == plain['data']
+    assert response.headers['X-Total-Records'] == str(plain['total_records'])
+
+    response = client.get(url + '?stream=1')
+    assert response.is_streamed
+    assert json.loads(response.get_data(as_text=True)) == plain
+
+    response = client.get(url + '?limit=10', headers={'Accept': 'application/x-ndjson'})
+    assert len(response.get_data(as_text=True).splitlines()) == 10 and 'X-Next-Cursor' in response.headers
+
+
+def test_cursor_pagination_walks_a_whole_day(client, data_dir):
+    _, days = data_dir
+    seen = []
+    body = client.get('/api/latest?limit=70').get_json()
+    while True:
+        assert body['date'] == DATES[-1]
+        seen.extend(row['Contract No.'] for row in body['data'])
+        if not body['next_cursor']:
+            break
+        body = client.get(f"/api/latest?limit=70&cursor={body['next_cursor']}").get_json()
+    assert seen == days[DATES[-1]]['Contract No.'].tolist()
+
+    page = client.get(f'/api/data/nepal_stock_floorsheet_{DATES[0]}.csv?offset=295&limit=10').get_json()
+    assert page['records'] == 5 and page['offset'] == 295 and page['next_cursor'] is None
+    assert client.get('/api/latest?cursor=not-a-cursor').status_code == 400
+    cursor = api_server.encode_cursor(f'nepal_stock_floorsheet_{DATES[1]}.csv', 0)
+    assert client.get(f'/api/data/nepal_stock_floorsheet_{DATES[0]}.csv?cursor={cursor}').status_code == 400
+
+
+def test_binary_formats_round_trip(client, data_dir):
+    directory, days = data_dir
+    filename = f'nepal_stock_floorsheet_{DATES[0]}.csv'
+    plain = pd.DataFrame(client.get(f'/api/data/{filename}?limit=40').get_json()['data'])
+
+    response = client.get(f'/api/data/{filename}?limit=40&format=arrow')
+    assert response.mimetype == 'application/vnd.apache.arrow.stream'
+    pd.testing.assert_frame_equal(pa.ipc.open_stream(response.data).read_pandas(), plain, check_like=True)
+
+    response = client.get(f'/api/data/{filename}?limit=40', headers={'Accept': 'application/vnd.apache.parquet'})
+    pd.testing.assert_frame_equal(pq.read_table(io.BytesIO(response.data)).to_pandas(), plain, check_like=True)
+
+    # Unfiltered CSV is the stored file itself; filtered CSV is re-serialized
+    response = client.get(f'/api/data/{filename}?format=csv')
+    with open(os.path.join(directory, filename), 'rb') as f:
+        assert response.get_data() == f.read()
+    symbol = days[DATES[0]]['Stock Symbol'].iloc[0]
+    response = client.get(f'/api/data/{filename}?format=csv&stock={symbol}')
+    assert len(pd.read_csv(io.BytesIO(response.data))) == int((days[DATES[0]]['Stock Symbol'] == symbol).sum())
+
+    response = client.get(f'/api/stock/{symbol}?format=arrow')
+    stock = pa.ipc.open_stream(response.data).read_pandas()
+    assert len(stock) == client.get(f'/api/stock/{symbol}').get_json()['records']
+    assert client.get(f'/api/data/{filename}', headers={'Accept': '*/*'}).mimetype == 'application/json'
+
+
+def test_responses_are_compressed_when_accepted(client):
+    url = f'/api/data/nepal_stock_floorsheet_{DATES[0]}.csv'
+    plain = client.get(url).get_data()
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip' and 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.get_data()) == plain
+
+    response = client.get(url + '?format=csv', headers={'Accept-Encoding': 'zstd, gzip;q=0.5'})
+    assert response.headers['Content-Encoding'] == 'zstd'
+    with open(os.path.join(api_server.nepse_api.source.data_dir, f'nepal_stock_floorsheet_{DATES[0]}.csv'), 'rb') as f:
+        expected = f.read()
+    assert pa.CompressedInputStream(pa.BufferReader(response.get_data()), 'zstd').read() == expected
+
+    assert 'Content-Encoding' not in client.get('/health', headers={'Accept-Encoding': 'gzip'}).headers
+
+    response = client.get(url + '?format=ndjson', headers={'Accept-Encoding': 'gzip'})
+    assert response.is_streamed and response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.get_data()) == client.get(url + '?format=ndjson').get_data()
+
+
+def test_stats_come_from_the_summary_store(data_dir, monkeypatch):
+    directory, days = data_dir
+    sampled = client_for(monkeypatch, api_server.LocalDataSource(directory)).get('/api/stats').get_json()
+    assert sampled['source'] == 'sample'
+
+    root = os.path.join(directory, 'parquet')
+    for date in DATES:
+        floorsheet_store.ingest_day(read_floorsheet_csv(os.path.join(directory, f'nepal_stock_floorsheet_{date}.csv')),
+                                    date, root)
+    source = CountingSource(directory)
+    body = client_for(monkeypatch, source).get('/api/stats').get_json()
+    assert body['source'] == 'summary' and source.reads == 0 and source.listings == 0
+    for field in ('total_files', 'total_records', 'latest_date', 'oldest_date', 'unique_stocks'):
+        assert body[field] == sampled[field]
+    assert body['total_turnover'] == round(sum(day['Amount (Rs)'].sum() for day in days.values()), 2)
+
+
+def test_ohlc_endpoint(data_dir, monkeypatch):
+    directory, days = data_dir
+    assert client_for(monkeypatch, api_server.LocalDataSource(directory)).get('/api/ohlc/SYM7').status_code == 404
+
+    root = os.path.join(directory, 'parquet')
+    for date in DATES:
+        floorsheet_store.ingest_day(read_floorsheet_csv(os.path.join(directory, f'nepal_stock_floorsheet_{date}.csv')),
+                                    date, root)
+    client = client_for(monkeypatch, api_server.LocalDataSource(directory))
+    body = client.get(f'/api/ohlc/sym7?start={DATES[1]}').get_json()
+    assert body['stock_symbol'] == 'SYM7' and [bar['date'] for bar in body['data']] == DATES[1:]
+    trades = days[DATES[1]][days[DATES[1]]['Stock Symbol'] == 'SYM7']
+    assert body['data'][0]['high'] == trades['Rate (Rs)'].max()
+    assert body['data'][0]['volume'] == trades['Quantity'].sum()
+
+
+def test_conditional_requests_do_no_parsing(data_dir, monkeypatch):
+    directory, days = data_dir
+    source = CountingSource(directory)
+    client = client_for(monkeypatch, source)
+    api = api_server.nepse_api
+    path = f'/api/data/nepal_stock_floorsheet_{DATES[0]}.csv?limit=5'
+
+    first = client.get(path)
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and 'immutable' in first.headers['Cache-Control']
+    assert first.headers['Last-Modified'] and 'Accept' in first.headers['Vary']
+    api.frames.clear()
+
+    for headers in ({'If-None-Match': etag}, {'If-Modified-Since': first.headers['Last-Modified']}):
+        response = client.get(path, headers=headers)
+        assert response.status_code == 304 and response.data == b''
+        assert response.headers['ETag'] == etag and response.headers['Cache-Control'] == first.headers['Cache-Control']
+    assert source.reads == 1
+
+    # Other parameters or formats are other representations
+    assert client.get(path.replace('limit=5', 'limit=6'), headers={'If-None-Match': etag}).status_code == 200
+    assert client.get(path + '&format=arrow', headers={'If-None-Match': etag}).headers['ETag'] != etag
+
+    # A compressed body has its own tag, and that tag revalidates too
+    gzipped = client.get(path.replace('limit=5', 'limit=500'), headers={'Accept-Encoding': 'gzip'})
+    assert gzipped.headers['Content-Encoding'] == 'gzip' and gzipped.headers['ETag'].endswith('-gzip"')
+    reads = source.reads
+    assert client.get(path.replace('limit=5', 'limit=500'), headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': gzipped.headers['ETag']}).status_code == 304
+    assert source.reads == reads
+
+    # Rewriting the file changes its content hash
+    days[DATES[0]].head(3).to_csv(os.path.join(directory, f'nepal_stock_floorsheet_{DATES[0]}.csv'), index=False)
+    api.listing_ttl = api.listing_stale = 0
+    response = client.get(path, headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.get_json()['records'] == 3
+
+
+def test_cache_control_is_short_for_today_and_listings(data_dir, monkeypatch):
+    directory, days = data_dir
+    today = time.strftime('%Y-%m-%d')
+    days[DATES[-1]].to_csv(os.path.join(directory, f'nepal_stock_floorsheet_{today}.csv'), index=False)
+    source = CountingSource(directory)
+    client = client_for(monkeypatch, source)
+
+    for path in ('/api/latest', f'/api/data/nepal_stock_floorsheet_{today}.csv', '/api/files', '/api/stats',
+                 '/api/stock/SYM7'):
+        response = client.get(path)
+        assert response.status_code == 200 and response.headers['Cache-Control'] == 'public, max-age=60', path
+        reads = source.reads
+        assert client.get(path, headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+        assert source.reads == reads
+    assert 'immutable' in client.get(f'/api/stock/SYM7?end={DATES[-1]}').headers['Cache-Control']
+
+    # A past day that is not stored yet, or an end that is not a date, may still change
+    os.remove(os.path.join(directory, f'nepal_stock_floorsheet_{today}.csv'))
+    api_server.nepse_api.listing_ttl = api_server.nepse_api.listing_stale = 0
+    for end in ('2025-06-25', '0', 'yesterday'):
+        assert client.get(f'/api/stock/SYM7?end={end}').headers['Cache-Control'] == 'public, max-age=60', end
+    assert 'immutable' in client.get(f'/api/stock/SYM7?end={DATES[-2]}').headers['Cache-Control']
+
+
+QUERIES = [
+    'stock=SYM7,sym8&columns=contract,symbol,quantity',
+    'buyer=12&seller=78,14',
+    'broker=5&min_quantity=100&max_quantity=300&sort=-amount,contract',
+    'min_rate=500.5&max_amount=200000&columns=Rate (Rs),amount&sort=rate',
+    'min_amount=1e9',
+]
+
+
+def test_query_parameters_filter_project_and_sort(client, data_dir):
+    _, days = data_dir
+    day = days[DATES[0]].assign(Buyer=lambda d: d['Buyer'].astype(int), Seller=lambda d: d['Seller'].astype(int))
+    path = f'/api/data/nepal_stock_floorsheet_{DATES[0]}.csv'
+
+    body = client.get(f'{path}?{QUERIES[0]}').get_json()
+    expected = day[day['Stock Symbol'].isin(['SYM7', 'SYM8'])]
+    assert body['total_records'] == len(expected) > 0
+    assert {tuple(sorted(row)) for row in body['data']} == {('Contract No.', 'Quantity', 'Stock Symbol')}
+
+    body = client.get(f'{path}?{QUERIES[2]}&limit=1000').get_json()
+    rows = day[((day['Buyer'] == 5) | (day['Seller'] == 5)) & day['Quantity'].between(100, 300)]
+    rows = rows.sort_values(['Amount (Rs)', 'Contract No.'], ascending=[False, True])
+    assert [r['Contract No.'] for r in body['data']] == rows['Contract No.'].tolist() and len(rows) > 0
+
+    # Paging walks the filtered rows
+    first = client.get(f'{path}?buyer=12&limit=2').get_json()
+    rest = client.get(f"{path}?buyer=12&cursor={first['next_cursor']}").get_json()
+    assert first['data'] + rest['data'] == client.get(f'{path}?buyer=12').get_json()['data']
+
+    for bad in ('columns=price', 'min_rate=cheap', 'sort=-volume', 'sort=date', 'stock=SYM7&sort=-date',
+                'columns=date'):
+        response = client.get(f'{path}?{bad}')
+        assert response.status_code == 400 and response.get_json()['success'] is False, bad
+    # A single day has no date column, a range of days does
+    assert client.get('/api/latest?columns=symbol,date').status_code == 400
+    body = client.get(f'/api/stock/SYM7?start={DATES[0]}&sort=-date&columns=date,contract').get_json()
+    assert body['records'] > 0 and body['data'][0]['Date'] == DATES[-1]
+
+
+def test_queries_push_down_into_the_store(data_dir, monkeypatch):
+    directory, _ = data_dir
+    in_memory = client_for(monkeypatch, api_server.LocalDataSource(directory, parquet_root=os.path.join(directory, 'none')))
+    path = f'/api/data/nepal_stock_floorsheet_{DATES[1]}.csv'
+    expected = [in_memory.get(f'{path}?{query}&format=ndjson').data for query in QUERIES]
+
+    root = os.path.join(directory, 'parquet')
+    for date in DATES:
+        floorsheet_store.ingest_day(read_floorsheet_csv(os.path.join(directory, f'nepal_stock_floorsheet_{date}.csv')),
+                                    date, root)
+    source = CountingSource(directory)
+    pushed = client_for(monkeypatch, source)
+    assert [pushed.get(f'{path}?{query}&format=ndjson').data for query in QUERIES] == expected
+    assert source.reads == 0
+    arrow = pa.ipc.open_stream(pushed.get(f'{path}?{QUERIES[1]}&format=arrow').data).read_all()
+    assert arrow.schema.field('Buyer').type == pa.int64()
+
+    # A file rewritten after it was stored is read from the file again
+    day = read_floorsheet_csv(os.path.join(directory, f'nepal_stock_floorsheet_{DATES[1]}.csv')).head(10)
+    to_rupees(day).to_csv(os.path.join(directory, f'nepal_stock_floorsheet_{DATES[1]}.csv'), index=False)
+    api_server.nepse_api.listing_ttl = api_server.nepse_api.listing_stale = 0
+    assert pushed.get(f'{path}?min_quantity=0').get_json()['total_records'] == 10 and source.reads == 1
+
+
+def test_missing_and_unsafe_names_are_not_found(client):
+    assert client.get('/api/data/nepal_stock_floorsheet_1999-01-01.csv').status_code == 404
+    assert client.get('/api/data/..%2Frequirements.txt').status_code == 404
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-q']))
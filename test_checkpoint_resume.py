@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Offline tests for resumable, checkpointed scraping
+Kills scrape_floorsheet.py mid-run against a local page fixture server and checks the rerun resumes.
+"""
+
+import glob
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks import synthetic_api_page
+from fixture_server import FixtureServer
+from scrape_floorsheet import CheckpointSink
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+PAGE_SIZE = 20
+TOTAL_PAGES = 12
+
+
+def scraper_env(server):
+    env = dict(os.environ)
+    env.update({
+        'PYTHONPATH': REPO_DIR,
+        'FLOORSHEET_BACKENDS': 'http',
+        'NEPSE_API_URL': server.url,
+        'NEPSE_API_PAGE_SIZE': str(PAGE_SIZE),
+        'FLOORSHEET_WORKERS': '1',
+        'FLOORSHEET_RATE_LIMIT': '0',
+    })
+    env.pop('GITHUB_ACTIONS', None)
+    return env
+
+
+def committed_pages(workdir):
+    journals = glob.glob(os.path.join(workdir, 'data', '.checkpoints', '*.journal'))
+    if not journals:
+        return 0
+    with open(journals[0], encoding='utf-8') as f:
+        return max(0, len(f.read().splitlines()) - 1)
+
+
+def test_killed_scrape_resumes_from_last_committed_page(tmp_path):
+    pages = [synthetic_api_page(i, TOTAL_PAGES, PAGE_SIZE) for i in range(TOTAL_PAGES)]
+    script = os.path.join(REPO_DIR, 'scrape_floorsheet.py')
+    workdir = str(tmp_path)
+
+    with FixtureServer(pages, latency=0.1) as server:
+        env = scraper_env(server)
+        proc = subprocess.Popen([sys.executable, script], cwd=workdir, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.time() + 30
+        while committed_pages(workdir) < 4 and time.time() < deadline:
+            time.sleep(0.02)
+        proc.send_signal(signal.SIGKILL)
+        proc.wait()
+
+        done_before_kill = committed_pages(workdir)
+        assert 4 <= done_before_kill < TOTAL_PAGES
+        assert not glob.glob(os.path.join(workdir, 'data', '*.csv'))
+
+        first_run_requests = dict(server.requests)
+        subprocess.run([sys.executable, script], cwd=workdir, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    # Committed pages were not fetched again on the rerun
+    for page_index in range(done_before_kill):
+        assert server.requests[page_index] == first_run_requests[page_index] == 1
+
+    outputs = glob.glob(os.path.join(workdir, 'data', 'nepal_stock_floorsheet_*.csv'))
+    assert len(outputs) == 1
+    saved = pd.read_csv(outputs[0], dtype={'Contract No.': str})
+    expected = [str(c['contractId']) for page in pages for c in page['floorsheets']['content']]
+    assert saved['Contract No.'].tolist() == expected
+
+    # Checkpoints are removed once the day's CSV is written
+    assert not os.listdir(os.path.join(workdir, 'data', '.checkpoints'))
+
+
+def test_torn_tail_is_discarded_on_resume(tmp_path):
+    checkpoint_dir = str(tmp_path)
+    sink = CheckpointSink(checkpoint_dir, '2025-06-24', 'http', PAGE_SIZE)
+    sink.add_rows([['1', 'A'], ['2', 'B']])
+    sink.add_rows([['3', 'C']])
+    sink.close()
+
+    # Simulate a crash after the spool write but before the journal commit
+    with open(sink.path, 'a', encoding='utf-8') as f:
+        f.write('4,D\n5,')
+    with open(sink.journal_path, 'a', encoding='utf-8') as f:
+        f.write('{"page": 2, "rows"')
+
+    resumed = CheckpointSink(checkpoint_dir, '2025-06-24', 'http', PAGE_SIZE)
+    assert resumed.next_page == 2
+    resumed.add_rows([['4', 'D'], ['5', 'E']])
+    frame = resumed.to_frame()
+    assert frame[0].tolist() == ['1', '2', '3', '4', '5']
+
+
+def test_resuming_twice_after_a_torn_write_keeps_every_commit(tmp_path):
+    checkpoint_dir = str(tmp_path)
+    sink = CheckpointSink(checkpoint_dir, '2025-06-24', 'http', PAGE_SIZE)
+    sink.add_rows([['1', 'A']])
+    sink.add_rows([['2', 'B']])
+    sink.close()
+    with open(sink.journal_path, 'a', encoding='utf-8') as f:
+        f.write('{"page": 2, "rows"')
+
+    resumed = CheckpointSink(checkpoint_dir, '2025-06-24', 'http', PAGE_SIZE)
+    assert resumed.next_page == 2
+    resumed.add_rows([['3', 'C']])
+    resumed.add_rows([['4', 'D']])
+    resumed.close()
+
+    again = CheckpointSink(checkpoint_dir, '2025-06-24', 'http', PAGE_SIZE)
+    assert again.next_page == 4
+    with open(again.journal_path, encoding='utf-8') as f:
+        assert [json.loads(line).get('page') for line in f.read().splitlines()] == [None, 0, 1, 2, 3]
+    assert again.to_frame()[0].tolist() == ['1', '2', '3', '4']
+
+
+def test_corrupted_page_is_refetched(tmp_path):
+    checkpoint_dir = str(tmp_path)
+    sink = CheckpointSink(checkpoint_dir, '2025-06-24', 'http', PAGE_SIZE)
+    sink.add_rows([['1', 'A']])
+    sink.add_rows([['2', 'B']])
+    sink.close()
+
+    with open(sink.path, 'r+', encoding='utf-8') as f:
+        f.seek(len('1,A\n'))
+        f.write('2,X')
+
+    resumed = CheckpointSink(checkpoint_dir, '2025-06-24', 'http', PAGE_SIZE)
+    assert resumed.next_page == 1
+
+    # A different backend or page size never reuses the journal
+    other = CheckpointSink(checkpoint_dir, '2025-06-24', 'http', PAGE_SIZE * 2)
+    assert other.next_page == 0
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, '-q']))
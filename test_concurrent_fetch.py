@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Offline tests for concurrent floor sheet page fetching
+A local fake server injects latency and errors; pages must come back complete and in order.
+"""
+
+import time
+
+from benchmarks import synthetic_api_page
+from fixture_server import FixtureServer
+from floorsheet_http import HttpFetcher, RateLimiter, make_session
+
+PAGE_SIZE = 20
+TOTAL_PAGES = 24
+
+
+def make_pages(total_pages=TOTAL_PAGES):
+    return [synthetic_api_page(i, total_pages, PAGE_SIZE) for i in range(total_pages)]
+
+
+def fetch_all(server, **kwargs):
+    # No transport-level retries so injected errors reach the per-page retry
+    fetcher = HttpFetcher(base_url=server.url, page_size=PAGE_SIZE,
+                          session=make_session(pool_size=16, retries=0), **kwargs)
+    return [rows for rows in fetcher.iter_pages()]
+
+
+def expected_contracts(pages):
+    return [str(c['contractId']) for page in pages for c in page['floorsheets']['content']]
+
+
+def test_concurrent_pages_are_reassembled_in_order():
+    pages = make_pages()
+    with FixtureServer(pages, latency=0.02) as server:
+        fetched = fetch_all(server, workers=8)
+
+    rows = [row for page in fetched for row in page]
+    assert [row[1] for row in rows] == expected_contracts(pages)
+    assert [row[0] for row in rows] == [str(i) for i in range(1, len(rows) + 1)]
+    assert server.max_in_flight <= 8
+
+
+def test_failed_pages_are_retried_individually():
+    pages = make_pages()
+    failures = {3: 1, 7: 2, TOTAL_PAGES - 1: 1}
+    with FixtureServer(pages, failures=failures) as server:
+        fetched = fetch_all(server, workers=6, page_retries=3)
+
+    rows = [row for page in fetched for row in page]
+    assert [row[1] for row in rows] == expected_contracts(pages)
+    for page_index in range(TOTAL_PAGES):
+        assert server.requests[page_index] == 1 + failures.get(page_index, 0)
+
+
+def test_last_page_known_without_probing_past_the_end():
+    pages = make_pages()
+    with FixtureServer(pages) as server:
+        fetch_all(server, workers=8)
+    assert sorted(server.requests) == list(range(TOTAL_PAGES))
+
+
+def test_unknown_page_count_stops_at_short_page():
+    pages = make_pages(5)
+    for page in pages:
+        del page['floorsheets']['totalPages']
+    pages[-1]['floorsheets']['content'] = pages[-1]['floorsheets']['content'][:7]
+    with FixtureServer(pages) as server:
+        fetched = fetch_all(server, workers=4)
+    assert sum(len(rows) for rows in fetched) == 4 * PAGE_SIZE + 7
+
+
+def test_concurrent_fetch_is_faster_under_latency():
+    pages = make_pages()
+    with FixtureServer(pages, latency=0.05) as server:
+        start = time.perf_counter()
+        fetch_all(server, workers=1)
+        serial = time.perf_counter() - start
+    with FixtureServer(pages, latency=0.05) as server:
+        start = time.perf_counter()
+        fetch_all(server, workers=8)
+        concurrent = time.perf_counter() - start
+    assert serial / concurrent > 3
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(50)
+    start = time.perf_counter()
+    for _ in range(11):
+        limiter.acquire()
+    assert time.perf_counter() - start >= 0.19
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, '-q']))
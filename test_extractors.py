@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the floor sheet table extractors
+Every fast extractor must return exactly what the BeautifulSoup reference returns.
+"""
+
+import glob
+import os
+
+import pytest
+
+from floorsheet_extract import HTML_EXTRACTORS, extract_rows_bs4, extract_rows_js
+
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                         'fixtures', 'floorsheet_html', '*.html')))
+
+
+@pytest.mark.parametrize('path', FIXTURES, ids=os.path.basename)
+@pytest.mark.parametrize('name', sorted(HTML_EXTRACTORS))
+def test_extractors_match_reference(name, path):
+    with open(path, encoding='utf-8') as f:
+        page_html = f.read()
+    assert HTML_EXTRACTORS[name](page_html) == extract_rows_bs4(page_html)
+
+
+@pytest.mark.parametrize('name', sorted(HTML_EXTRACTORS))
+def test_only_first_table_and_entities(name):
+    page_html = """<html><body><p>Floor Sheet</p>
+    <table><tr><th>SN</th><th>Stock Symbol</th></tr>
+    <tr><td> 1 </td><td><a href="#">M&amp;S</a> <span>Ltd</span></td></tr>
+    <tr></tr></table>
+    <table><tr><td>other</td></tr></table></body></html>"""
+    assert HTML_EXTRACTORS[name](page_html) == [('SN', 'Stock Symbol'), ('1', 'M&SLtd')]
+
+
+@pytest.mark.parametrize('name', sorted(HTML_EXTRACTORS))
+def test_no_table(name):
+    assert HTML_EXTRACTORS[name]("<html><body><p>Loading...</p></body></html>") == []
+
+
+def test_js_extractor_returns_tuples_and_none_on_failure():
+    class Driver:
+        def __init__(self, result):
+            self.result = result
+
+        def execute_script(self, script):
+            if isinstance(self.result, Exception):
+                raise self.result
+            return self.result
+
+    assert extract_rows_js(Driver([['1', 'NABIL']])) == [('1', 'NABIL')]
+    assert extract_rows_js(Driver(None)) is None
+    assert extract_rows_js(Driver(RuntimeError('stale'))) is None
+
+
+def test_unknown_extractor_fails_before_scraping(monkeypatch):
+    import scrape_floorsheet
+
+    monkeypatch.setattr(scrape_floorsheet, 'FLOORSHEET_EXTRACTOR', 'lxmll')
+    with pytest.raises(ValueError, match="Unknown floor sheet extractor 'lxmll'"):
+        scrape_floorsheet.get_backends('selenium')
+    with pytest.raises(ValueError):
+        scrape_floorsheet.get_table_rows(driver=None)
+    assert scrape_floorsheet.SeleniumFetcher(extractor='regex').extractor == 'regex'
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the vectorized floor sheet analytics against the notebook's own functions
+"""
+
+import pandas as pd
+import pytest
+
+from benchmarks import notebook_functions, synthetic_trades
+import floorsheet_analytics
+
+KEYS = ['Stock', 'Side', 'Broker']
+
+
+@pytest.fixture(scope='module')
+def notebook():
+    return notebook_functions()
+
+
+@pytest.fixture(scope='module')
+def trades():
+    return synthetic_trades(days=40, rows_per_day=3000, symbols=60, brokers=30)
+
+
+def by_key(frame, keys):
+    return frame.sort_values(keys).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('timeframe', ['daily', '15days', 'weekly', 'monthly', 'quarterly', 'yearly', 'all'])
+@pytest.mark.parametrize('stock_symbol', [None, 'SYM3'])
+def test_broker_dominance_matches_the_notebook(notebook, trades, timeframe, stock_symbol):
+    expected, expected_summary = notebook['analyze_broker_dominance'](trades, stock_symbol, timeframe, threshold=20)
+    results, summary = floorsheet_analytics.broker_dominance(trades, stock_symbol, timeframe, threshold=20)
+
+    assert list(results.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(by_key(results, KEYS), by_key(expected, KEYS))
+    assert summary == pytest.approx(expected_summary)
+    assert results['Percentage'].is_monotonic_decreasing and results.index.is_monotonic_increasing
+    assert summary['suspicious_brokers'] > 0
+
+
+def test_broker_dominance_reads_typed_frames(trades):
+    typed = trades.astype({'Stock Symbol': 'category', 'Buyer': 'category', 'Seller': 'category'})
+    typed['Date'] = typed['Date'].dt.strftime('%Y-%m-%d').astype('category')
+    results, summary = floorsheet_analytics.broker_dominance(typed, timeframe='monthly')
+    expected, expected_summary = floorsheet_analytics.broker_dominance(trades, timeframe='monthly')
+
+    results = results.astype({'Stock': str, 'Broker': 'int64'})
+    pd.testing.assert_frame_equal(by_key(results, KEYS), by_key(expected, KEYS))
+    assert summary == expected_summary
+
+
+def test_broker_dominance_without_matching_rows(trades):
+    for frame, stock_symbol in ((trades.head(0), None), (trades, 'NOPE')):
+        results, summary = floorsheet_analytics.broker_dominance(frame, stock_symbol)
+        assert results.empty and summary == {}
+
+
+@pytest.mark.parametrize('timeframe', ['daily', 'weekly', 'monthly', 'all'])
+@pytest.mark.parametrize('stock_symbol', [None, 'SYM3'])
+def test_wash_trading_matches_the_notebook(notebook, trades, timeframe, stock_symbol):
+    # The notebook adds a Broker_Pair column to the frame it is given
+    expected = notebook['detect_wash_trading'](trades.copy(), stock_symbol, timeframe)
+    same_broker, pairs, summary = floorsheet_analytics.wash_trading(trades, stock_symbol, timeframe)
+
+    pd.testing.assert_frame_equal(same_broker, expected[0])
+    assert list(pairs.columns) == list(expected[1].columns)
+    pd.testing.assert_frame_equal(pairs.sort_index(), expected[1].sort_index())
+    assert pairs['Trade_Count'].is_monotonic_decreasing
+    assert summary == expected[2] and summary['same_broker_trades'] > 0
+    assert 'Broker_Pair' not in trades.columns
+
+
+def test_ordered_pairs_split_each_direction(trades):
+    _, unordered, _ = floorsheet_analytics.wash_trading(trades, timeframe='monthly', min_trades=1)
+    _, ordered, _ = floorsheet_analytics.wash_trading(trades, timeframe='monthly', min_trades=1, ordered=True)
+    assert len(ordered) > len(unordered)
+    assert ordered['Trade_Count'].sum() == unordered['Trade_Count'].sum()
+
+    window = floorsheet_analytics.select_timeframe(trades, 'monthly')
+    pair = window[(window['Stock Symbol'] == 'SYM0') & (window['Buyer'] == 1) & (window['Seller'] == 12)]
+    row = ordered[(ordered['Stock'] == 'SYM0') & (ordered['Broker_Pair'] == '1-12')].iloc[0]
+    assert row['Trade_Count'] == len(pair) and row['Total_Volume'] == pair['Quantity'].sum()
+
+
+def test_recurring_pairs_need_enough_days_inside_one_window():
+    days = pd.bdate_range('2025-06-02', periods=10)
+
+    def trades_on(indexes, buyer, seller, symbol='ABC'):
+        return [{'Date': days[i], 'Stock Symbol': symbol, 'Buyer': buyer, 'Seller': seller, 'Quantity': 10}
+                for i in indexes]
+
+    rows = (trades_on([0, 1, 2], 4, 9)          # three days in a row
+            + trades_on([3, 4], 9, 4)           # the same pair the other way round, two more days
+            + trades_on([0, 4, 8], 5, 6)        # three days, but never three within five
+            + trades_on([6, 7, 7, 9], 1, 2, 'XYZ')
+            + [{'Date': d, 'Stock Symbol': 'XYZ', 'Buyer': 3, 'Seller': 8, 'Quantity': 1} for d in days])
+    frame = pd.DataFrame(rows)
+
+    result = floorsheet_analytics.recurring_pairs(frame, window=5, min_days=3)
+    assert list(zip(result['Stock'], result['Broker_Pair'], result['Active_Days'])) == [
+        ('XYZ', '3-8', 10), ('ABC', '4-9', 5), ('XYZ', '1-2', 3)]
+    assert result['First_Date'].tolist()[1:] == [days[0], days[6]]
+    assert result['Trade_Count'].tolist() == [10, 5, 4] and result['Total_Volume'].tolist() == [10, 50, 40]
+
+    ordered = floorsheet_analytics.recurring_pairs(frame, window=5, min_days=3, ordered=True)
+    assert '4-9' in set(ordered['Broker_Pair']) and '9-4' not in set(ordered['Broker_Pair'])
+    assert floorsheet_analytics.recurring_pairs(frame, window=2, min_days=3, stock_symbol='ABC').empty
+    # ABC does not trade on days 5-7, which XYZ does, so 5-6 never has three days within six
+    wide = floorsheet_analytics.recurring_pairs(frame, window=6, min_days=3)
+    alone = floorsheet_analytics.recurring_pairs(frame, window=6, min_days=3, stock_symbol='ABC')
+    assert '5-6' not in set(alone['Broker_Pair'])
+    pd.testing.assert_frame_equal(alone, wide[wide['Stock'] == 'ABC'].reset_index(drop=True))
+
+
+@pytest.mark.parametrize('stock_symbol, surge_threshold', [(None, 2.0), (None, 1.5), ('SYM24', 1.5)])
+def test_volume_surge_matches_the_notebook(notebook, trades, stock_symbol, surge_threshold):
+    expected, expected_summary = notebook['analyze_volume_surge'](trades, stock_symbol, surge_threshold)
+    results, summary = floorsheet_analytics.volume_surge(trades, stock_symbol, surge_threshold)
+
+    pd.testing.assert_frame_equal(results, expected)
+    assert summary == expected_summary and summary['new_brokers_count'] > 0
+
+
+def test_surge_engine_updates_one_day_at_a_time(trades):
+    results, _ = floorsheet_analytics.volume_surge(trades, surge_threshold=1.5)
+    engine = floorsheet_analytics.VolumeSurgeEngine(surge_threshold=1.5)
+    days = list(floorsheet_analytics.trading_days(trades))
+    for date, day in days:
+        events = engine.update(day, date)
+        expected = results[results['Date'] == date]
+        expected = expected.sort_values('Stock', key=lambda s: s.map(engine.symbols.index), kind='stable')
+        pd.testing.assert_frame_equal(events, expected.reset_index(drop=True), check_dtype=len(events) > 0)
+
+    with pytest.raises(ValueError):
+        engine.update(days[-1][1], days[-1][0])
+
+
+def test_saved_surge_engine_carries_on_after_a_restart(trades, tmp_path):
+    days = list(floorsheet_analytics.trading_days(trades))
+    engine = floorsheet_analytics.VolumeSurgeEngine(surge_threshold=1.5, window=4)
+    for date, day in days[:len(days) // 2]:
+        engine.update(day, date)
+    path = str(tmp_path / 'surge.npz')
+    engine.save(path)
+
+    restored = floorsheet_analytics.VolumeSurgeEngine.load(path)
+    assert (restored.window, restored.last_date) == (4, engine.last_date)
+    with pytest.raises(ValueError):
+        restored.update(*days[len(days) // 2 - 1][::-1])
+    for date, day in days[len(days) // 2:]:
+        pd.testing.assert_frame_equal(restored.update(day, date), engine.update(day, date))
+    assert restored.symbols == engine.symbols and restored.brokers == engine.brokers
+
+
+def test_surge_brokers_are_new_after_the_lookback():
+    def day(volume, buyer, seller=2):
+        return pd.DataFrame({'Stock Symbol': ['ABC'], 'Buyer': [buyer], 'Seller': [seller], 'Quantity': [volume]})
+
+    engine = floorsheet_analytics.VolumeSurgeEngine(surge_threshold=1.5, window=3, lookback_days=10)
+    assert engine.update(day(100, 1), '2025-06-02').empty
+    assert engine.update(day(100, 1), '2025-06-03').empty
+    # Volume 400 against a mean of (100 + 100 + 400) / 3: a surge, bought by a broker never seen before
+    events = engine.update(day(400, 7), '2025-06-04')
+    assert events[['Broker', 'Side', 'New_Broker']].values.tolist() == [[7, 'Buyer', True], [2, 'Seller', False]]
+    assert events['Volume_Ratio'].tolist() == [2.0, 2.0] and events['Broker_Percentage'].tolist() == [100.0, 100.0]
+    # Broker 1 last bought on 06-03, more than ten days before this surge
+    events = engine.update(day(2000, 1), '2025-06-16')
+    assert events.loc[events['Side'] == 'Buyer', 'New_Broker'].tolist() == [True]
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the compact multi-file floor sheet loader
+"""
+
+import pandas as pd
+import pytest
+
+from benchmarks import notebook_functions, synthetic_trades, write_daily_csvs
+import floorsheet_analytics
+import floorsheet_loader
+
+
+@pytest.fixture(scope='module')
+def data_dir(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('data')
+    write_daily_csvs(synthetic_trades(days=12, rows_per_day=500, symbols=20, brokers=15), str(directory))
+    return str(directory)
+
+
+@pytest.fixture(scope='module')
+def notebook_frame(data_dir):
+    notebook = notebook_functions()
+    return notebook['preprocess_data'](notebook['load_floorsheet_data'](data_dir))
+
+
+def comparable(frame):
+    """Rows in a fixed order with plain dtypes"""
+    frame = frame.astype({column: str if column == 'Stock Symbol' else 'int64'
+                          for column in ('Stock Symbol', 'Buyer', 'Seller', 'SN') if column in frame.columns})
+    frame['Date'] = floorsheet_analytics.trade_dates(frame)
+    return frame.sort_values(['Date', 'Contract No.']).reset_index(drop=True)
+
+
+def test_loads_the_same_trades_as_the_notebook(data_dir, notebook_frame):
+    loaded = floorsheet_loader.load_trades(data_dir, columns=list(floorsheet_loader.DTYPES))
+
+    assert list(loaded.columns) == list(floorsheet_loader.DTYPES) + ['Date']
+    assert loaded.dtypes.astype(str).to_dict() == dict(floorsheet_loader.DTYPES, Date='category')
+    assert loaded['Date'].cat.ordered and loaded['Date'].is_monotonic_increasing
+    expected = notebook_frame[loaded.columns]
+    pd.testing.assert_frame_equal(comparable(loaded), comparable(expected), check_dtype=False)
+    assert loaded.memory_usage(deep=True).sum() < expected.memory_usage(deep=True).sum() * 0.7
+
+
+def test_filters_dates_and_symbols_per_file(data_dir, notebook_frame):
+    dates = sorted(notebook_frame['Date'].unique())
+    start, end = dates[3].strftime('%Y-%m-%d'), dates[7].strftime('%Y-%m-%d')
+    loaded = floorsheet_loader.load_trades(data_dir, columns=['Contract No.', 'Quantity'], start=start, end=end,
+                                           symbols=['sym3', 'SYM5'])
+
+    expected = notebook_frame[notebook_frame['Date'].between(dates[3], dates[7])
+                              & notebook_frame['Stock Symbol'].isin(['SYM3', 'SYM5'])]
+    assert list(loaded.columns) == ['Contract No.', 'Quantity', 'Date']
+    assert list(loaded['Date'].cat.categories) == dates[3:8]
+    pd.testing.assert_frame_equal(comparable(loaded), comparable(expected[loaded.columns]), check_dtype=False)
+
+    assert floorsheet_loader.load_trades(data_dir, start='2030-01-01').empty
+    with pytest.raises(ValueError):
+        floorsheet_loader.load_trades(data_dir, columns=['Volume'])
+
+
+def test_process_pool_matches_a_serial_load(data_dir):
+    serial = floorsheet_loader.load_trades(data_dir)
+    pooled = floorsheet_loader.load_trades(data_dir, workers=2)
+    pd.testing.assert_frame_equal(pooled, serial)
+
+
+def test_skips_bad_rows_like_the_notebook(tmp_path):
+    path = tmp_path / 'nepal_stock_floorsheet_2025-06-24.csv'
+    path.write_text('SN,Contract No.,Stock Symbol,Buyer,Seller,Quantity,Rate (Rs),Amount (Rs)\n'
+                    '1,11,ABC,58,34,"1,000",100.00,"100,000.00"\n'
+                    '2,12,ABC,,34,10,100.00,1000.00\n'
+                    '3,13,XYZ,7,9,n/a,50.00,0.00\n')
+    (tmp_path / 'nepal_stock_floorsheet_2025-06-25.csv').write_text('')
+    (tmp_path / 'notes.csv').write_text('not,a,floor,sheet\n')
+
+    loaded = floorsheet_loader.load_trades(str(tmp_path))
+    assert loaded['Stock Symbol'].tolist() == ['ABC', 'XYZ'] and loaded['Buyer'].dtype == 'int32'
+    assert loaded['Quantity'].tolist()[0] == 1000 and pd.isna(loaded['Quantity'].tolist()[1])
+    assert loaded['Amount (Rs)'].tolist() == [100000.0, 0.0]
+    assert list(loaded['Date'].cat.categories.strftime('%Y-%m-%d')) == ['2025-06-24', '2025-06-25']
+
+
+def test_calendar_columns_match_preprocess_data(data_dir, notebook_frame):
+    loaded = floorsheet_loader.add_calendar_columns(floorsheet_loader.load_trades(data_dir, columns=['Contract No.']))
+    expected = notebook_frame.sort_values(['Date', 'Contract No.']).reset_index(drop=True)
+    loaded = loaded.sort_values(['Date', 'Contract No.']).reset_index(drop=True)
+    for column in floorsheet_loader.CALENDAR_COLUMNS:
+        assert loaded[column].astype(str).tolist() == expected[column].astype(str).tolist(), column
+
+
+def test_loaded_frames_feed_the_analytics(data_dir, notebook_frame):
+    loaded = floorsheet_loader.load_trades(data_dir)
+    for analysis in (floorsheet_analytics.broker_dominance, floorsheet_analytics.volume_surge):
+        results, summary = analysis(loaded)
+        expected, expected_summary = analysis(notebook_frame)
+        assert len(results) == len(expected) and summary == pytest.approx(expected_summary)
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the typed floor sheet schema parser
+"""
+
+import io
+
+import pandas as pd
+
+from benchmarks import synthetic_page
+from floorsheet_schema import SCHEMA, ParseStats, parse_rows, read_floorsheet_csv, to_rupees
+from scrape_floorsheet import clean_data
+
+HEADER = ('SN', 'Contract No.', 'Stock Symbol', 'Buyer', 'Seller', 'Quantity', 'Rate (Rs)', 'Amount (Rs)')
+
+
+def test_typed_dtypes_and_fixed_point_money():
+    frame = parse_rows([HEADER, ('1', '2025062403007134', 'ALBSL', '44', '22', '1,042', '805.05', '838,862.10')])
+    assert dict(frame.dtypes.astype(str)) == SCHEMA
+    row = frame.iloc[0]
+    assert row['Contract No.'] == 2025062403007134
+    assert row['Quantity'] == 1042
+    assert row['Rate (paisa)'] == 80505
+    assert row['Amount (paisa)'] == 83886210
+
+
+def test_rejections_are_counted():
+    rows = [
+        HEADER,
+        ('1', '2025062403007134', 'ALBSL', '44', '22', '42', '805.00', '33,810.00'),
+        HEADER,
+        ('1', '2025062403007134', 'ALBSL', '44', '22', '42', '805.00', '33,810.00'),
+        ('2', '2025062403007133', 'NABIL'),
+        ('3', '2025062403007132', 'NICA', '5', '6', 'abc', '10.00', '100.00'),
+        ('4', '2025062403007131', 'NICA', '5', '6', '10', 'Rs 10.00', '100.00'),
+    ]
+    stats = ParseStats()
+    frame = parse_rows(rows, stats)
+    assert frame['SN'].tolist() == [1, 4]
+    assert frame['Rate (paisa)'].tolist() == [80500, 1000]
+    assert stats.as_dict() == {
+        'rows_in': 7,
+        'header_rows': 2,
+        'malformed_rows': 1,
+        'duplicate_rows': 1,
+        'rejected_cells': {'Quantity': 1},
+        'rows_out': 2,
+    }
+
+
+def test_matches_clean_data_on_synthetic_pages():
+    rows = [HEADER] + [row for i in range(20) for row in synthetic_page(i)]
+    legacy = clean_data(pd.DataFrame(rows))
+    typed = parse_rows(rows)
+    published = to_rupees(typed)
+
+    assert list(published.columns) == list(HEADER)
+    assert published['Quantity'].tolist() == legacy['Quantity'].tolist()
+    assert published['Rate (Rs)'].tolist() == legacy['Rate (Rs)'].tolist()
+    assert published['Amount (Rs)'].tolist() == legacy['Amount (Rs)'].tolist()
+    assert published['Stock Symbol'].astype(str).tolist() == legacy['Stock Symbol'].tolist()
+
+
+def test_empty_input_keeps_schema():
+    for frame in (read_floorsheet_csv(io.StringIO('')), parse_rows([HEADER])):
+        assert frame.empty
+        assert list(frame.columns) == list(SCHEMA)
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the date-partitioned Parquet floor sheet store
+"""
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from conftest import DATES, make_day, write_csv_days
+import floorsheet_store
+
+
+def test_write_and_read_round_trip(tmp_path):
+    root = str(tmp_path / 'parquet')
+    day = make_day(0)
+    floorsheet_store.write_day(day, DATES[0], root)
+
+    stored = floorsheet_store.read_floorsheet(root)
+    assert floorsheet_store.list_dates(root) == [DATES[0]]
+    assert len(stored) == len(day)
+    assert str(stored['Stock Symbol'].dtype) == 'category'
+    assert stored.sort_values('Contract No.')['Amount (paisa)'].tolist() == \
+        day.sort_values('Contract No.')['Amount (paisa)'].tolist()
+
+
+def test_symbol_and_broker_columns_are_dictionary_encoded_with_stats(tmp_path):
+    root = str(tmp_path / 'parquet')
+    path = floorsheet_store.write_day(make_day(0), DATES[0], root)
+    metadata = pq.ParquetFile(path).metadata
+    names = [metadata.schema.column(i).name for i in range(metadata.num_columns)]
+    for name in ('Stock Symbol', 'Buyer', 'Seller'):
+        column = metadata.row_group(0).column(names.index(name))
+        assert 'RLE_DICTIONARY' in column.encodings or 'PLAIN_DICTIONARY' in column.encodings
+        assert column.statistics.has_min_max
+
+
+def test_migration_and_pushdown(tmp_path):
+    csv_dir = str(tmp_path)
+    root = str(tmp_path / 'parquet')
+    days = write_csv_days(csv_dir)
+
+    assert floorsheet_store.migrate_csvs(csv_dir, root) == len(DATES)
+    assert floorsheet_store.migrate_csvs(csv_dir, root) == 0  # already stored
+
+    frame = floorsheet_store.read_floorsheet(root, columns=['date', 'Stock Symbol', 'Quantity', 'Rate (Rs)'],
+                                             start=DATES[1], symbols=['sym7'], rupees=True)
+    assert list(frame.columns) == ['date', 'Stock Symbol', 'Quantity', 'Rate (Rs)']
+    assert set(frame['date']) == set(DATES[1:])
+    assert set(frame['Stock Symbol'].astype(str)) == {'SYM7'}
+    expected = sum(int((days[d]['Stock Symbol'] == 'SYM7').sum()) for d in DATES[1:])
+    assert len(frame) == expected
+
+    by_broker = floorsheet_store.read_floorsheet(root, end=DATES[0], brokers=[5])
+    assert len(by_broker) and ((by_broker['Buyer'] == '5') | (by_broker['Seller'] == '5')).all()
+
+
+def test_symbol_index_partitions(tmp_path):
+    root = str(tmp_path / 'parquet')
+    days = {date: make_day(index) for index, date in enumerate(DATES)}
+    for date, day in days.items():
+        floorsheet_store.ingest_day(day, date, root)
+
+    # Index files live beside the date partitions without leaking into full reads
+    assert len(floorsheet_store.read_floorsheet(root)) == sum(len(day) for day in days.values())
+    for symbol in ('SYM7', 'SYM120'):
+        frame = floorsheet_store.read_symbol(symbol.lower(), start=DATES[1], root=root)
+        expected = pd.concat([days[d][days[d]['Stock Symbol'] == symbol] for d in DATES[1:]])
+        assert frame['Contract No.'].tolist() == expected['Contract No.'].tolist()
+        assert set(frame['date']) == set(DATES[1:]) and set(frame['Stock Symbol'].astype(str)) == {symbol}
+
+    assert floorsheet_store.read_symbol('NOPE', root=root).empty
+    assert floorsheet_store.read_symbol('../x', root=root).empty
+    projected = floorsheet_store.read_symbol('SYM7', end=DATES[0], root=root, columns=['Rate (Rs)'], rupees=True)
+    assert list(projected.columns) == ['Rate (Rs)', 'date'] and set(projected['date']) == {DATES[0]}
+
+    # Re-ingesting a day replaces its rows; a full rebuild gives the same answer
+    floorsheet_store.ingest_day(days[DATES[1]].head(20), DATES[1], root)
+    short = floorsheet_store.read_symbol('SYM7', DATES[1], DATES[1], root=root)
+    assert len(short) == int((days[DATES[1]].head(20)['Stock Symbol'] == 'SYM7').sum())
+    assert floorsheet_store.read_symbol('SYM120', DATES[1], DATES[1], root=root).empty
+    floorsheet_store.ingest_day(days[DATES[1]], DATES[1], root)
+    incremental = floorsheet_store.read_symbol('SYM7', root=root)
+    floorsheet_store.rebuild_index('symbol', root)
+    pd.testing.assert_frame_equal(incremental, floorsheet_store.read_symbol('SYM7', root=root))
+
+
+def test_broker_index_and_summaries(tmp_path):
+    root = str(tmp_path / 'parquet')
+    days = {date: make_day(index) for index, date in enumerate(DATES)}
+    for date, day in days.items():
+        floorsheet_store.ingest_day(day, date, root)
+    trades = pd.concat([day.assign(date=date) for date, day in days.items()])
+    buyer, seller = trades['Buyer'].astype(str), trades['Seller'].astype(str)
+
+    frame = floorsheet_store.read_broker(5, start=DATES[1], root=root)
+    expected = trades[((buyer == '5') | (seller == '5')) & (trades['date'] >= DATES[1])]
+    assert sorted(frame['Contract No.']) == sorted(expected['Contract No.'])
+    sold = floorsheet_store.read_broker('5', side='sell', symbols=['sym40'], root=root)
+    assert sorted(sold['Contract No.']) == \
+        sorted(trades[(seller == '5') & (trades['Stock Symbol'] == 'SYM40')]['Contract No.'])
+
+    summary = floorsheet_store.read_broker_summary('5', root=root)
+    bought = trades[buyer == '5']
+    assert summary[summary['side'] == 'buy']['quantity'].sum() == bought['Quantity'].sum()
+    assert summary[summary['side'] == 'buy']['amount'].sum() == bought['Amount (paisa)'].sum()
+    assert summary[summary['side'] == 'sell']['trades'].sum() == int((seller == '5').sum())
+
+    before = floorsheet_store.read_broker_summary(root=root)
+    floorsheet_store.rebuild_indexes(root)
+    after = floorsheet_store.read_broker_summary(root=root)
+    pd.testing.assert_frame_equal(before.sort_values(list(before.columns)).reset_index(drop=True),
+                                  after.sort_values(list(after.columns)).reset_index(drop=True))
+
+
+def test_empty_store(tmp_path):
+    frame = floorsheet_store.read_floorsheet(str(tmp_path / 'missing'))
+    assert frame.empty and 'date' in frame.columns
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, '-q']))
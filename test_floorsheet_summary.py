@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the ingest-time floor sheet summaries
+"""
+
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from conftest import DATES, ingest_days, make_day
+import floorsheet_store
+import floorsheet_summary
+
+
+def test_history_stats_track_every_ingested_day(tmp_path):
+    root = str(tmp_path / 'parquet')
+    days = ingest_days(root)
+    trades = pd.concat(days.values())
+
+    stats = floorsheet_summary.load_stats(root)
+    assert stats['days'] == len(DATES)
+    assert stats['first_date'] == DATES[0] and stats['last_date'] == DATES[-1]
+    assert stats['total_records'] == len(trades)
+    assert stats['total_turnover'] == trades['Amount (paisa)'].sum() / 100
+    assert stats['stocks'] == sorted(trades['Stock Symbol'].astype(str).unique())
+    brokers = set(trades['Buyer'].astype(str)) | set(trades['Seller'].astype(str))
+    assert stats['unique_brokers'] == len(brokers) and set(stats['brokers']) == brokers
+
+    # Re-ingesting a smaller copy of a day replaces its totals
+    floorsheet_store.ingest_day(days[DATES[1]].head(10), DATES[1], root)
+    stats = floorsheet_summary.load_stats(root)
+    assert stats['total_records'] == len(trades) - len(days[DATES[1]]) + 10
+    assert len(floorsheet_summary.read_daily(root=root)) == len(DATES)
+
+
+def test_symbol_daily_aggregates_and_rebuild(tmp_path):
+    root = str(tmp_path / 'parquet')
+    days = ingest_days(root)
+
+    per_symbol = floorsheet_summary.read_symbol_daily(['sym7'], start=DATES[1], root=root)
+    assert per_symbol['date'].tolist() == DATES[1:]
+    for _, row in per_symbol.iterrows():
+        trades = days[row['date']][days[row['date']]['Stock Symbol'] == 'SYM7']
+        assert row['trades'] == len(trades) and row['quantity'] == trades['Quantity'].sum()
+        assert row['min_rate'] == trades['Rate (paisa)'].min() and row['max_rate'] == trades['Rate (paisa)'].max()
+        assert row['turnover'] == trades['Amount (paisa)'].sum()
+
+    incremental = floorsheet_summary.read_symbol_daily(root=root)
+    before = {k: v for k, v in floorsheet_summary.load_stats(root).items() if k != 'updated'}
+    floorsheet_summary.rebuild(root)
+    after = {k: v for k, v in floorsheet_summary.load_stats(root).items() if k != 'updated'}
+    assert before == after
+    pd.testing.assert_frame_equal(incremental, floorsheet_summary.read_symbol_daily(root=root))
+
+
+def test_ohlc_bars_follow_contract_order(tmp_path):
+    root = str(tmp_path / 'parquet')
+    days = ingest_days(root)
+
+    bars = floorsheet_summary.read_ohlc('sym7', start=DATES[1], root=root)
+    assert bars['date'].tolist() == DATES[1:]
+    for _, bar in bars.iterrows():
+        trades = days[bar['date']]
+        trades = trades[trades['Stock Symbol'] == 'SYM7'].sort_values('Contract No.')
+        rates = trades['Rate (paisa)'] / 100
+        assert (bar['open'], bar['close']) == (rates.iloc[0], rates.iloc[-1])
+        assert (bar['high'], bar['low']) == (rates.max(), rates.min())
+        assert bar['volume'] == trades['Quantity'].sum() and bar['trades'] == len(trades)
+        assert bar['vwap'] == pytest.approx(trades['Amount (paisa)'].sum() / trades['Quantity'].sum() / 100)
+
+    assert floorsheet_summary.read_ohlc('SYM7', end=DATES[0], root=root)['date'].tolist() == DATES[:1]
+    assert floorsheet_summary.read_ohlc('NOPE', root=root).empty
+    paisa = floorsheet_summary.read_ohlc('SYM7', root=root, rupees=False)
+    assert paisa['high'].dtype == 'int64'
+
+
+def test_older_summary_layout_is_rebuilt_on_ingest(tmp_path):
+    root = str(tmp_path / 'parquet')
+    days = ingest_days(root)
+    path = floorsheet_summary._path(floorsheet_summary.SYMBOL_DAILY_FILE, root)
+    pq.write_table(pq.read_table(path).drop_columns(['open', 'close', 'vwap']), path)
+
+    floorsheet_store.ingest_day(days[DATES[0]], DATES[0], root)
+    assert len(floorsheet_summary.read_ohlc('SYM7', root=root)) == len(DATES)
+
+
+def test_missing_position_ledger_is_rebuilt_on_ingest(tmp_path):
+    root = str(tmp_path / 'parquet')
+    days = ingest_days(root)
+    # A store summarized before the ledger existed
+    os.remove(floorsheet_summary._path(floorsheet_summary.POSITIONS_FILE, root))
+
+    floorsheet_store.ingest_day(days[DATES[-1]], DATES[-1], root)
+    expected = positions_from_trades(days, DATES[-1])
+    latest = floorsheet_summary.read_positions(root=root, rupees=False).set_index(['broker', 'symbol']).sort_index()
+    pd.testing.assert_frame_equal(latest[expected.columns], expected.sort_index(), check_names=False)
+    assert set(latest['date']) == set(DATES)
+
+
+def positions_from_trades(days, through):
+    """Net positions per (broker, symbol) regrouped from every trade up to ``through``"""
+    trades = pd.concat([day for date, day in days.items() if date <= through])
+    sides = []
+    for side, column in (('buy', 'Buyer'), ('sell', 'Seller')):
+        grouped = trades.groupby([trades[column].astype(str), trades['Stock Symbol'].astype(str)]).agg(
+            trades=('Quantity', 'size'), quantity=('Quantity', 'sum'), amount=('Amount (paisa)', 'sum'))
+        sides.append(grouped.rename_axis(['broker', 'symbol']).add_prefix(f'{side}_'))
+    return pd.concat(sides, axis=1).fillna(0).astype('int64')
+
+
+def test_position_ledger_answers_any_date(tmp_path):
+    root = str(tmp_path / 'parquet')
+    days = ingest_days(root)
+
+    for date in DATES:
+        expected = positions_from_trades(days, date)
+        ledger = floorsheet_summary.read_positions(date=date, root=root, rupees=False)
+        ledger = ledger.set_index(['broker', 'symbol']).sort_index()
+        pd.testing.assert_frame_equal(ledger[expected.columns], expected.sort_index(), check_names=False)
+        assert (ledger['net_quantity'] == ledger['buy_quantity'] - ledger['sell_quantity']).all()
+        assert (ledger['date'] <= date).all()
+
+    broker = floorsheet_summary.read_positions('12', date=DATES[1], root=root)
+    assert set(broker['broker']) == {'12'} and len(broker) > 1
+    expected = positions_from_trades(days, DATES[1]).loc['12']
+    assert sorted(broker['symbol']) == sorted(expected.index)
+    row = broker.iloc[0]
+    held = expected.loc[row['symbol']]
+    assert row['net_amount'] == (held['buy_amount'] - held['sell_amount']) / 100
+    held = broker[broker['net_quantity'] > 0]
+    assert len(held) and (held['average_cost'] > 0).all()
+    assert broker.loc[broker['net_quantity'] <= 0, 'average_cost'].isna().all()
+
+    holders = floorsheet_summary.read_positions(symbols=['sym7'], root=root)
+    assert set(holders['symbol']) == {'SYM7'} and holders['net_quantity'].sum() == 0
+    assert floorsheet_summary.read_positions('12', date='2025-01-01', root=root).empty
+
+
+def test_average_cost_is_the_buy_price_of_the_shares_still_held(tmp_path):
+    root = str(tmp_path / 'parquet')
+
+    def day(buyer, seller, quantity, rupees):
+        return pd.DataFrame({'SN': [1], 'Contract No.': [1], 'Stock Symbol': ['ABC'], 'Buyer': [buyer],
+                             'Seller': [seller], 'Quantity': [quantity], 'Rate (paisa)': [rupees * 100],
+                             'Amount (paisa)': [quantity * rupees * 100]}).astype(
+            {'Stock Symbol': 'category', 'Buyer': 'category', 'Seller': 'category'})
+
+    # Buy 100 at Rs 10, sell 90 at Rs 20 and the last 10 at Rs 30, then buy 50 at Rs 40
+    trades = [('1', '2', 100, 10), ('3', '1', 90, 20), ('3', '1', 10, 30), ('1', '2', 50, 40)]
+    dates = ['2025-06-22', '2025-06-23', '2025-06-24', '2025-06-25']
+    for date, trade in zip(dates, trades):
+        floorsheet_store.ingest_day(day(*trade), date, root)
+
+    costs = [floorsheet_summary.read_positions('1', date=date, root=root)['average_cost'].iloc[0] for date in dates]
+    assert costs[:2] == [10.0, 10.0] and pd.isna(costs[2]) and costs[3] == 40.0
+    # Broker 3 bought 90 at Rs 20 and 10 at Rs 30
+    assert floorsheet_summary.read_positions('3', root=root)['average_cost'].tolist() == [21.0]
+    seller = floorsheet_summary.read_positions('2', root=root, rupees=False)
+    assert seller['net_quantity'].tolist() == [-150] and seller['average_cost'].isna().all()
+
+
+def test_position_ledger_handles_backfills_like_a_rebuild(tmp_path):
+    root = str(tmp_path / 'parquet')
+    days = {date: make_day(index) for index, date in enumerate(DATES)}
+    # Newest day first, then an older day re-ingested with fewer trades
+    for date in (DATES[2], DATES[0], DATES[1]):
+        floorsheet_store.ingest_day(days[date], date, root)
+    floorsheet_store.ingest_day(days[DATES[0]].head(100), DATES[0], root)
+    incremental = pq.read_table(floorsheet_summary._path(floorsheet_summary.POSITIONS_FILE, root)).to_pandas()
+
+    floorsheet_summary.rebuild(root)
+    rebuilt = pq.read_table(floorsheet_summary._path(floorsheet_summary.POSITIONS_FILE, root)).to_pandas()
+    pd.testing.assert_frame_equal(incremental, rebuilt)
+    days[DATES[0]] = days[DATES[0]].head(100)
+    expected = positions_from_trades(days, DATES[-1])
+    latest = floorsheet_summary.read_positions(root=root, rupees=False).set_index(['broker', 'symbol']).sort_index()
+    pd.testing.assert_frame_equal(latest[expected.columns], expected.sort_index(), check_names=False)
+
+
+def test_missing_summaries(tmp_path):
+    assert floorsheet_summary.load_stats(str(tmp_path)) is None
+    assert floorsheet_summary.read_daily(root=str(tmp_path)) is None
+    assert floorsheet_summary.read_positions('12', root=str(tmp_path)) is None
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-q']))
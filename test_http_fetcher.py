@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the direct HTTP/JSON floor sheet backend
+Runs the fetcher against a local stub server serving recorded page fixtures.
+"""
+
+from fixture_server import FixtureServer, load_api_fixtures
+from floorsheet_http import HttpFetcher
+from scrape_floorsheet import clean_data, scrape_with_backends
+
+
+def test_http_fetcher_reads_all_fixture_pages():
+    fixtures = load_api_fixtures()
+    expected = [c for page in fixtures for c in page['floorsheets']['content']]
+
+    with FixtureServer(fixtures) as server:
+        fetcher = HttpFetcher(base_url=server.url, page_size=4)
+        fetcher.open()
+        try:
+            pages = list(fetcher.iter_pages())
+        finally:
+            fetcher.close()
+
+    rows = [row for page in pages for row in page]
+    assert len(pages) == len(fixtures)
+    assert [row[1] for row in rows] == [str(c['contractId']) for c in expected]
+    assert [row[0] for row in rows] == [str(i) for i in range(1, len(expected) + 1)]
+    # Stops on totalPages without probing past the last page
+    assert sorted(server.requests) == list(range(len(fixtures)))
+
+
+def test_http_rows_clean_like_scraped_table():
+    with FixtureServer() as server:
+        data = scrape_with_backends([HttpFetcher(base_url=server.url, page_size=4)])
+    cleaned = clean_data(data)
+
+    assert list(cleaned.columns) == ['SN', 'Contract No.', 'Stock Symbol', 'Buyer', 'Seller',
+                                     'Quantity', 'Rate (Rs)', 'Amount (Rs)']
+    first = load_api_fixtures()[0]['floorsheets']['content'][0]
+    assert cleaned.loc[0, 'Stock Symbol'] == first['stockSymbol']
+    assert cleaned.loc[0, 'Quantity'] == first['contractQuantity']
+    assert cleaned.loc[0, 'Amount (Rs)'] == first['contractAmount']
+
+
+def test_falls_back_to_next_backend():
+    with FixtureServer() as server:
+        broken = HttpFetcher(base_url=server.url.replace('floorsheet', 'missing'), page_size=4)
+        working = HttpFetcher(base_url=server.url, page_size=4)
+        data = scrape_with_backends([broken, working])
+    assert len(data) == sum(len(p['floorsheets']['content']) for p in load_api_fixtures())
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, '-q']))
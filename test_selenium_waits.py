@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests for event-driven page-change detection in the Selenium backend
+Browser tests drive a static floor sheet fixture that re-renders after an artificial delay;
+they are skipped when Chrome/ChromeDriver is not available.
+"""
+
+import time
+
+import pytest
+
+from fixture_server import FixtureServer
+from scrape_floorsheet import (PageLoadTimeout, PageWaitStats, go_to_next_page, iter_pages, load_page,
+                               set_items_per_page, setup_driver)
+
+
+def test_histogram_buckets_and_percentiles():
+    stats = PageWaitStats()
+    for seconds in (0.05, 0.2, 0.2, 0.4, 1.5, 45):
+        stats.record(seconds)
+    counts = dict(stats.histogram())
+    assert counts['<=0.1s'] == 1
+    assert counts['<=0.25s'] == 2
+    assert counts['<=0.5s'] == 1
+    assert counts['<=2s'] == 1
+    assert counts['>30s'] == 1
+    assert stats.percentile(50) == 0.2
+    assert 'Page transitions: 6' in stats.summary()
+
+
+def test_adaptive_timeout_tracks_recent_latency():
+    stats = PageWaitStats(min_timeout=2, max_timeout=60, headroom=4)
+    assert stats.timeout() == 60  # no history yet, be generous
+    for _ in range(20):
+        stats.record(0.1)
+    assert stats.timeout() == 2  # fast pages clamp to the floor
+    for _ in range(50):
+        stats.record(5)
+    assert stats.timeout() == 20
+
+
+def test_render_timeout_is_not_the_last_page(monkeypatch):
+    import scrape_floorsheet
+
+    class Driver:
+        def execute_script(self, script, *args):
+            return None
+
+    monkeypatch.setattr(scrape_floorsheet, 'has_next_page', lambda driver: (True, object()))
+    monkeypatch.setattr(scrape_floorsheet, 'get_table_rows',
+                        lambda driver, extractor=None: [['1', '2025062401000001']])
+    monkeypatch.setattr(scrape_floorsheet, 'wait_for_page_change', lambda driver, before, stats=None: None)
+    with pytest.raises(PageLoadTimeout):
+        go_to_next_page(Driver())
+    pages = iter_pages(Driver())
+    assert next(pages) == [['1', '2025062401000001']]
+    with pytest.raises(PageLoadTimeout):
+        next(pages)
+
+
+@pytest.fixture(scope='module')
+def driver():
+    try:
+        driver = setup_driver()
+    except Exception as e:
+        pytest.skip(f"Chrome is not available: {str(e)}")
+    yield driver
+    driver.quit()
+
+
+@pytest.mark.parametrize('delay_ms', [0, 400, 1500])
+def test_waits_for_new_rows_instead_of_sleeping(driver, delay_ms):
+    with FixtureServer([]) as server:
+        assert load_page(driver, server.html_url(delay_ms, rows=23))
+        assert set_items_per_page(driver, 10)
+
+        stats = PageWaitStats()
+        start = time.monotonic()
+        pages = []
+        for rows in iter_pages(driver):
+            pages.append(rows)
+            if len(pages) == 3:
+                break
+        assert go_to_next_page(driver, stats) is False  # last page: no Next button
+        elapsed = time.monotonic() - start
+
+    contracts = [row[1] for rows in pages for row in rows if row[0].isdigit()]
+    assert len(contracts) == 23
+    assert len(set(contracts)) == 23  # never re-read a stale table
+    # Two transitions at the fixture delay, well under the old 3 s sleep each
+    assert elapsed < 2 * (delay_ms / 1000) + 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-q']))